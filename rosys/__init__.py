@@ -1,7 +1,10 @@
+from typing import TYPE_CHECKING
+
 from nicegui import background_tasks
 
-from . import analysis, automation, driving, event, geometry, hardware, pathplanning, persistence, run, system, vision
+from . import automation, driving, event, geometry, hardware, persistence, run, system
 from .config import Config
+from .helpers.lazy_import import lazy_attributes
 from .rosys import (
     NEW_NOTIFICATION,
     Notification,
@@ -24,6 +27,16 @@ from .rosys import (
 from .simulation_ui import simulation_ui
 from .version import __version__
 
+if TYPE_CHECKING:
+    from . import analysis, pathplanning, vision
+
+# NOTE: these subsystems pull in heavy libraries like OpenCV and SciPy, so they are only imported when used
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'analysis': '.analysis',
+    'pathplanning': '.pathplanning',
+    'vision': '.vision',
+})
+
 __all__ = [
     'NEW_NOTIFICATION',
     'Config',
@@ -1,17 +1,58 @@
-from .asyncio_warnings import AsyncioWarnings
-from .kpi_buckets import Day, Month, TimeBucket, Week
-from .kpi_chart import KpiChart
-from .kpi_logger import KpiLogger, date_to_str, str_to_date
-from .kpi_page_ import kpi_page
-from .legacy.asyncio_monitor import AsyncioMonitor
-from .legacy.network_monitor import NetworkMonitor, NetworkStats
-from .legacy.objgraph_page import objgraph_page
-from .logging_page import LoggingPage as logging_page
-from .memory import MemoryMiddleware
-from .profile_button_ import ProfileButton as profile_button
-from .timelapse_recorder import TimelapseRecorder
-from .tracking import track
-from .videos_page_ import VideosPage as videos_page
+from typing import TYPE_CHECKING
+
+from ..helpers.lazy_import import lazy_attributes
+
+if TYPE_CHECKING:
+    from .asyncio_warnings import AsyncioWarnings
+    from .events_page_ import EventsPage as events_page
+    from .flame_graph_ import FlameGraph as flame_graph
+    from .gc_page_ import GcPage as gc_page
+    from .kpi_buckets import Day, Month, TimeBucket, Week
+    from .kpi_chart import KpiChart
+    from .kpi_logger import KpiLogger, date_to_str, str_to_date
+    from .kpi_page_ import kpi_page
+    from .legacy.asyncio_monitor import AsyncioMonitor
+    from .legacy.network_monitor import NetworkMonitor, NetworkStats
+    from .legacy.objgraph_page import objgraph_page
+    from .logging_page import LoggingPage as logging_page
+    from .loop_lag_monitor import LoopLagMonitor, Stall
+    from .loop_lag_page_ import LoopLagPage as loop_lag_page
+    from .memory import MemoryMiddleware
+    from .profile_button_ import ProfileButton as profile_button
+    from .sampling_profiler import SamplingProfiler
+    from .timelapse_recorder import TimelapseRecorder
+    from .tracking import track
+    from .videos_page_ import VideosPage as videos_page
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'AsyncioMonitor': '.legacy.asyncio_monitor',
+    'AsyncioWarnings': '.asyncio_warnings',
+    'Day': '.kpi_buckets',
+    'KpiChart': '.kpi_chart',
+    'KpiLogger': '.kpi_logger',
+    'LoopLagMonitor': '.loop_lag_monitor',
+    'MemoryMiddleware': '.memory',
+    'Month': '.kpi_buckets',
+    'NetworkMonitor': '.legacy.network_monitor',
+    'NetworkStats': '.legacy.network_monitor',
+    'SamplingProfiler': '.sampling_profiler',
+    'Stall': '.loop_lag_monitor',
+    'TimeBucket': '.kpi_buckets',
+    'TimelapseRecorder': '.timelapse_recorder',
+    'Week': '.kpi_buckets',
+    'date_to_str': '.kpi_logger',
+    'events_page': '.events_page_:EventsPage',
+    'flame_graph': '.flame_graph_:FlameGraph',
+    'gc_page': '.gc_page_:GcPage',
+    'kpi_page': '.kpi_page_',
+    'logging_page': '.logging_page:LoggingPage',
+    'loop_lag_page': '.loop_lag_page_:LoopLagPage',
+    'objgraph_page': '.legacy.objgraph_page',
+    'profile_button': '.profile_button_:ProfileButton',
+    'str_to_date': '.kpi_logger',
+    'track': '.tracking',
+    'videos_page': '.videos_page_:VideosPage',
+})
 
 __all__ = [
     'AsyncioMonitor',
@@ -19,16 +60,23 @@ __all__ = [
     'Day',
     'KpiChart',
     'KpiLogger',
+    'LoopLagMonitor',
     'MemoryMiddleware',
     'Month',
     'NetworkMonitor',
     'NetworkStats',
+    'SamplingProfiler',
+    'Stall',
     'TimeBucket',
     'TimelapseRecorder',
     'Week',
     'date_to_str',
+    'events_page',
+    'flame_graph',
+    'gc_page',
     'kpi_page',
     'logging_page',
+    'loop_lag_page',
     'objgraph_page',
     'profile_button',
     'str_to_date',
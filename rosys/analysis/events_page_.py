@@ -0,0 +1,57 @@
+from nicegui import ui
+
+from .. import event
+
+COLUMNS: list[dict] = [
+    {'name': 'callback', 'label': 'Callback', 'field': 'callback', 'align': 'left', 'sortable': True},
+    {'name': 'name', 'label': 'Registered at', 'field': 'name', 'align': 'left'},
+    {'name': 'calls', 'label': 'Calls', 'field': 'calls', 'sortable': True},
+    {'name': 'total', 'label': 'Total [ms]', 'field': 'total', 'sortable': True},
+    {'name': 'p99', 'label': 'p99 [ms]', 'field': 'p99', 'sortable': True},
+    {'name': 'tasks', 'label': 'Tasks', 'field': 'tasks', 'sortable': True},
+    {'name': 'pending', 'label': 'Pending', 'field': 'pending', 'sortable': True},
+    {'name': 'task_total', 'label': 'Task total [ms]', 'field': 'task_total', 'sortable': True},
+    {'name': 'task_p99', 'label': 'Task p99 [ms]', 'field': 'task_p99', 'sortable': True},
+]
+
+
+class EventsPage:
+    """Events Page
+
+    This module creates a page showing how much time the listeners of all events consume.
+    Instrumentation can be switched on and off on the page or via `rosys.event.enable_instrumentation()`.
+    It is mounted at /events.
+    """
+
+    def __init__(self) -> None:
+        @ui.page('/events')
+        def page():
+            def update() -> None:
+                table.rows = [{
+                    'callback': stats.callback,
+                    'name': stats.name,
+                    'calls': stats.calls,
+                    'total': round(stats.total_time * 1000, 1),
+                    'p99': round(stats.p99_time * 1000, 2),
+                    'tasks': stats.tasks,
+                    'pending': stats.pending_tasks,
+                    'task_total': round(stats.total_task_time * 1000, 1),
+                    'task_p99': round(stats.p99_task_time * 1000, 2),
+                } for stats in event.get_listener_stats()]
+
+            def toggle(value: bool) -> None:
+                if value:
+                    event.enable_instrumentation()
+                else:
+                    event.disable_instrumentation()
+
+            def clear() -> None:
+                event.clear_listener_stats()
+                update()
+
+            with ui.row().classes('items-center'):
+                ui.switch('record listener timings', value=event.is_instrumented(), on_change=lambda e: toggle(e.value))
+                ui.button('Clear', on_click=clear)
+            table = ui.table(columns=COLUMNS, rows=[], row_key='name').classes('w-full')
+            update()
+            ui.timer(1.0, update)
@@ -0,0 +1,41 @@
+from nicegui import ui
+
+from .stack_sampling import StackNode, build_tree
+
+COLORS = ['bg-orange-300', 'bg-amber-300', 'bg-red-300', 'bg-yellow-300']
+
+
+class FlameGraph(ui.column):
+    """Shows sampled stacks as a flame graph with the outermost frames at the top.
+
+    The width of each bar is proportional to the number of samples containing its frame.
+    Frames with less than ``min_fraction`` of all samples are hidden to keep the page responsive.
+    """
+
+    def __init__(self, stacks: dict[str, int] | None = None, *, min_fraction: float = 0.01) -> None:
+        super().__init__()
+        self.classes('w-full gap-0')
+        self.min_fraction = min_fraction
+        self.set_stacks(stacks or {})
+
+    def set_stacks(self, stacks: dict[str, int]) -> None:
+        """Replace the displayed stacks (collapsed stacks with their number of samples)."""
+        self.clear()
+        root = build_tree(stacks)
+        with self:
+            if not root.count:
+                ui.label('no samples')
+                return
+            self._render(root, root.count, 100.0, 0)
+
+    def _render(self, node: StackNode, total: int, width: float, depth: int) -> None:
+        with ui.column().classes('gap-0 min-w-0').style(f'width: {width}%'):
+            ui.label(node.name) \
+                .classes(f'w-full truncate text-xs px-1 border border-white cursor-default {COLORS[depth % len(COLORS)]}') \
+                .tooltip(f'{node.name}: {node.count} samples ({100 * node.count / total:.1f} %)')
+            children = [child for child in node.children.values() if child.count >= self.min_fraction * total]
+            if not children:
+                return
+            with ui.row().classes('w-full gap-0 flex-nowrap'):
+                for child in sorted(children, key=lambda child: child.count, reverse=True):
+                    self._render(child, total, 100 * child.count / node.count, depth + 1)
@@ -0,0 +1,44 @@
+from nicegui import ui
+
+from .. import rosys
+
+COLUMNS = [
+    {'name': 'generation', 'label': 'Generation', 'field': 'generation', 'align': 'left'},
+    {'name': 'collections', 'label': 'Collections', 'field': 'collections'},
+    {'name': 'collected', 'label': 'Collected objects', 'field': 'collected'},
+    {'name': 'mean', 'label': 'Mean [ms]', 'field': 'mean'},
+    {'name': 'p99', 'label': 'p99 [ms]', 'field': 'p99'},
+    {'name': 'last', 'label': 'Last [ms]', 'field': 'last'},
+    {'name': 'max', 'label': 'Max [ms]', 'field': 'max'},
+]
+
+
+class GcPage:
+    """Garbage Collection Page
+
+    This module creates a page showing the pauses caused by garbage collections
+    and how often collections were postponed by the `rosys.gc_controller`.
+    It is mounted at /gc.
+    """
+
+    def __init__(self) -> None:
+        @ui.page('/gc')
+        def page():
+            def update() -> None:
+                table.rows = [{
+                    'generation': stats.generation,
+                    'collections': stats.pauses.count,
+                    'collected': stats.collected,
+                    'mean': round(stats.pauses.mean * 1000, 2),
+                    'p99': round(stats.pauses.percentile(0.99) * 1000, 2),
+                    'last': round(stats.last_pause * 1000, 2),
+                    'max': round(stats.max_pause * 1000, 2),
+                } for stats in rosys.gc_controller.stats]
+                skipped.text = f'postponed (no idle slot): {rosys.gc_controller.skipped}'
+                deferred.text = f'deferred full collections (robot busy): {rosys.gc_controller.deferred_full_collections}'
+
+            table = ui.table(columns=COLUMNS, rows=[], row_key='generation').classes('w-full')
+            skipped = ui.label()
+            deferred = ui.label()
+            update()
+            ui.timer(1.0, update)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+
+from .. import rosys
+from ..cpu_accounting import Histogram
+from .stack_sampling import collapse
+
+
+@dataclass(slots=True, kw_only=True)
+class Stall:
+    time: float
+    """RoSys time when the event loop was able to run again"""
+    duration: float
+    """how long the event loop was blocked (in seconds)"""
+    stack: str
+    """most frequently sampled stack of the event loop thread during the stall (collapsed, empty if none was sampled)"""
+
+    @property
+    def frame(self) -> str:
+        """The innermost frame of the stack."""
+        return self.stack.rsplit(';', 1)[-1]
+
+
+class LoopLagMonitor:
+    """Measures the scheduling delay of the event loop and attributes stalls to the code which blocked it.
+
+    The event loop runs a heartbeat every ``interval`` seconds and records how late it was called.
+    A watchdog thread looks at the heartbeat every ``sample_interval`` seconds.
+    While the heartbeat is overdue by more than ``threshold`` seconds,
+    it samples the stack of the event loop thread via ``sys._current_frames()``.
+    The samples are aggregated per stack and can be inspected as a flame graph on the ``loop_lag_page``.
+
+    In contrast to ``AsyncioWarnings`` this does not need the slow debug mode of asyncio and can be used in production.
+    """
+
+    def __init__(self, *,
+                 interval: float = 0.05,
+                 threshold: float = 0.1,
+                 sample_interval: float = 0.01,
+                 max_stalls: int = 100) -> None:
+        self.log = logging.getLogger('rosys.loop_lag_monitor')
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+
+        self.lags = Histogram()
+        """scheduling delays of the heartbeat (in seconds)"""
+        self.max_lag = 0.0
+        """largest scheduling delay (in seconds)"""
+        self.stacks: Counter[str] = Counter()
+        """number of samples per stack of the event loop thread taken during stalls"""
+        self.stalls: deque[Stall] = deque(maxlen=max_stalls)
+        """the most recent stalls"""
+
+        self._lock = threading.Lock()
+        self._current_stacks: Counter[str] = Counter()
+        self._expected = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        rosys.on_startup(self.start)
+        rosys.on_shutdown(self.stop)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start measuring (needs to be called from the event loop)."""
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._schedule_heartbeat()
+        self._thread = threading.Thread(target=self._watch, name='rosys.loop_lag_monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self.lags = Histogram()
+            self.max_lag = 0.0
+            self.stacks.clear()
+            self.stalls.clear()
+            self._current_stacks.clear()
+
+    def _schedule_heartbeat(self) -> None:
+        assert self._loop is not None
+        self._expected = self._loop.time() + self.interval
+        self._handle = self._loop.call_at(self._expected, self._heartbeat)
+
+    def _heartbeat(self) -> None:
+        assert self._loop is not None
+        lag = max(self._loop.time() - self._expected, 0.0)
+        self.lags.record(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            with self._lock:
+                samples, self._current_stacks = self._current_stacks, Counter()
+            stall = Stall(time=rosys.time(), duration=lag, stack=samples.most_common(1)[0][0] if samples else '')
+            self.stalls.append(stall)
+            self.log.warning('event loop was blocked for %.3f s in %s', lag, stall.frame or 'unknown code')
+        self._schedule_heartbeat()
+
+    def _watch(self) -> None:
+        assert self._loop is not None
+        thread_id = self._loop_thread_id
+        assert thread_id is not None, 'the thread of the event loop is set before the watcher starts'
+        while not self._stop.wait(self.sample_interval):
+            if self._loop.time() - self._expected < self.threshold:
+                continue
+            frame = sys._current_frames().get(thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = collapse(frame)
+            del frame  # NOTE: do not keep the frames of the event loop thread alive
+            with self._lock:
+                self._current_stacks[stack] += 1
+                self.stacks[stack] += 1
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from nicegui import ui
+
+from .flame_graph_ import FlameGraph
+from .loop_lag_monitor import LoopLagMonitor
+
+COLUMNS: list[dict] = [
+    {'name': 'time', 'label': 'Time', 'field': 'time', 'align': 'left'},
+    {'name': 'duration', 'label': 'Duration [ms]', 'field': 'duration', 'sortable': True},
+    {'name': 'frame', 'label': 'Blocking code', 'field': 'frame', 'align': 'left'},
+]
+
+
+class LoopLagPage:
+    """Loop Lag Page
+
+    This module creates a page showing the scheduling delays of the event loop measured by a `LoopLagMonitor`,
+    the most recent stalls and a flame graph of the code which was running on the event loop during stalls.
+    It is mounted at /loop_lag.
+    """
+
+    def __init__(self, monitor: LoopLagMonitor) -> None:
+        @ui.page('/loop_lag')
+        def page():
+            def update() -> None:
+                lags = monitor.lags
+                summary.text = f'heartbeats: {lags.count}, mean lag: {lags.mean * 1000:.1f} ms, ' \
+                    f'p99: {lags.percentile(0.99) * 1000:.0f} ms, max: {monitor.max_lag * 1000:.0f} ms, ' \
+                    f'stalls: {len(monitor.stalls)}'
+                table.rows = [{
+                    'id': i,
+                    'time': f'{datetime.fromtimestamp(stall.time):%H:%M:%S}',
+                    'duration': round(stall.duration * 1000),
+                    'frame': stall.frame,
+                } for i, stall in enumerate(reversed(monitor.stalls))]
+
+            def refresh() -> None:
+                update()
+                flame_graph.set_stacks(dict(monitor.stacks))
+
+            def clear() -> None:
+                monitor.clear()
+                refresh()
+
+            with ui.row().classes('items-center'):
+                summary = ui.label()
+                ui.button('Refresh', on_click=refresh)
+                ui.button('Clear', on_click=clear)
+            table = ui.table(columns=COLUMNS, rows=[], row_key='id').classes('w-full')
+            ui.label('Stacks sampled during stalls').classes('text-lg')
+            flame_graph = FlameGraph()
+            refresh()
+            ui.timer(1.0, update)
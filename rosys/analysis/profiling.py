@@ -1,6 +1,10 @@
+from __future__ import annotations
+
 from functools import wraps
+from typing import TYPE_CHECKING
 
-from line_profiler import LineProfiler as PyUtilsLineProfiler
+if TYPE_CHECKING:
+    from line_profiler import LineProfiler as PyUtilsLineProfiler
 
 
 class LineProfiler:
@@ -20,6 +24,7 @@ class LineProfiler:
         return wrap
 
     def start(self) -> None:
+        from line_profiler import LineProfiler as PyUtilsLineProfiler  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
         self.line_profiler = PyUtilsLineProfiler()
         for f in self.functions:
             f[1] = self.line_profiler(f[0])
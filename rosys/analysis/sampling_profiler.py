@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from nicegui import app, background_tasks
+
+from .. import run
+from .stack_sampling import collapse
+
+log = logging.getLogger('rosys.sampling_profiler')
+
+
+class _Sampler:
+    """Samples the stacks of all threads of the current process (except its own) in a background thread."""
+
+    def __init__(self, interval: float, *, prefix: str = '') -> None:
+        self.interval = interval
+        self.prefix = prefix
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rosys.sampling_profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        return self.stacks
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [(thread_id, collapse(frame))
+                      for thread_id, frame in sys._current_frames().items()  # pylint: disable=protected-access
+                      if thread_id != own_id]
+            for thread_id, stack in stacks:
+                self.stacks[f'{self.prefix}{names.get(thread_id, thread_id)};{stack}'] += 1
+
+
+class _worker_state:  # NOTE: lives in the worker processes
+    sampler: _Sampler | None = None
+
+
+def _start_worker_sampling(interval: float) -> None:
+    if _worker_state.sampler is None:
+        _worker_state.sampler = _Sampler(interval, prefix=f'worker {os.getpid()} ')
+        _worker_state.sampler.start()
+
+
+def _stop_worker_sampling() -> dict[str, int]:
+    sampler, _worker_state.sampler = _worker_state.sampler, None
+    return {} if sampler is None else dict(sampler.stop())
+
+
+class SamplingProfiler:
+    """A statistical profiler which periodically samples the stacks of all threads.
+
+    It covers the event loop, the thread pool and all other threads of the main process
+    and optionally the worker processes of ``rosys.run.cpu_bound``.
+    As it samples wall-clock time, idle threads show up with the functions they are waiting in.
+    The results can be exported as collapsed stacks (e.g. for ``flamegraph.pl``) or as speedscope JSON
+    (to be opened on https://www.speedscope.app).
+
+    The profiler can be controlled at runtime via HTTP, so a misbehaving robot can be profiled without redeploying:
+
+    - ``POST <route>/start?frequency=100&workers=false&duration=30`` starts sampling (the duration is optional)
+    - ``POST <route>/stop`` stops sampling
+    - ``GET <route>`` returns the status
+    - ``GET <route>/collapsed`` and ``GET <route>/speedscope`` return the collected samples
+
+    :param route: base path of the API routes (``None`` to not register any routes)
+    """
+
+    def __init__(self, *, route: str | None = '/api/profiler') -> None:
+        self.stacks: Counter[str] = Counter()
+        """number of samples per collapsed stack (the first frame is the name of the thread)"""
+        self.frequency = 100.0
+        """sampling frequency of the last or current run (in Hz)"""
+        self._sampler: _Sampler | None = None
+        self._workers = False
+        self._timeout: asyncio.Task | None = None
+        if route is not None:
+            self._add_routes(route)
+
+    @property
+    def is_running(self) -> bool:
+        return self._sampler is not None
+
+    async def start(self, *, frequency: float = 100.0, workers: bool = False, duration: float | None = None) -> None:
+        """Start sampling (previous samples are discarded).
+
+        :param frequency: number of samples per second
+        :param workers: whether to sample the worker processes of ``rosys.run.cpu_bound`` as well
+        :param duration: stop automatically after this time (in seconds)
+        """
+        if self.is_running:
+            await self.stop()
+        self.stacks.clear()
+        self.frequency = frequency
+        self._workers = workers and run.process_pool.processes
+        self._sampler = _Sampler(1 / frequency)
+        self._sampler.start()
+        if self._workers:
+            await run.process_pool.broadcast(_start_worker_sampling, (1 / frequency,))
+        if duration is not None:
+            self._timeout = background_tasks.create(self._stop_after(duration), name='stop sampling profiler')
+        log.info('started sampling profiler with %s Hz', frequency)
+
+    async def stop(self) -> None:
+        if self._sampler is None:
+            return
+        if self._timeout is not None and self._timeout is not asyncio.current_task():
+            self._timeout.cancel()
+        self._timeout = None
+        self.stacks.update(self._sampler.stop())
+        self._sampler = None
+        if self._workers:
+            for stacks in await run.process_pool.broadcast(_stop_worker_sampling):
+                self.stacks.update(stacks)
+        log.info('stopped sampling profiler after %s samples', sum(self.stacks.values()))
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed format (one stack per line followed by the number of samples)."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> dict[str, Any]:
+        """Return the samples in the speedscope file format with one profile per thread."""
+        frames: dict[str, int] = {}
+        profiles: dict[str, dict[str, Any]] = {}
+        for stack, count in self.stacks.items():
+            thread, _, rest = stack.partition(';')
+            profile = profiles.setdefault(thread, {
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': 0,
+                'samples': [],
+                'weights': [],
+            })
+            weight = count / self.frequency
+            profile['samples'].append([frames.setdefault(name, len(frames)) for name in rest.split(';')])
+            profile['weights'].append(weight)
+            profile['endValue'] += weight
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': [{'name': name} for name in frames]},
+            'profiles': list(profiles.values()),
+            'name': 'RoSys',
+            'exporter': 'rosys',
+        }
+
+    def _status(self) -> dict[str, Any]:
+        return {'running': self.is_running, 'frequency': self.frequency, 'samples': sum(self.stacks.values())}
+
+    async def _stop_after(self, duration: float) -> None:
+        await asyncio.sleep(duration)
+        await self.stop()
+
+    def _add_routes(self, route: str) -> None:
+        async def get_status() -> JSONResponse:
+            return JSONResponse(self._status())
+
+        async def start(frequency: float = 100.0, workers: bool = False, duration: float | None = None) -> Response:
+            if not 0 < frequency <= 10_000:
+                return Response(content='Frequency must be between 0 and 10000 Hz', status_code=400)
+            await self.start(frequency=frequency, workers=workers, duration=duration)
+            return JSONResponse(self._status())
+
+        async def stop() -> JSONResponse:
+            await self.stop()
+            return JSONResponse(self._status())
+
+        async def get_collapsed() -> PlainTextResponse:
+            return PlainTextResponse(self.collapsed())
+
+        async def get_speedscope() -> JSONResponse:
+            return JSONResponse(self.speedscope(),
+                                headers={'Content-Disposition': 'attachment; filename="rosys.speedscope.json"'})
+
+        app.add_api_route(route, get_status, methods=['GET'])
+        app.add_api_route(f'{route}/start', start, methods=['POST'])
+        app.add_api_route(f'{route}/stop', stop, methods=['POST'])
+        app.add_api_route(f'{route}/collapsed', get_collapsed, methods=['GET'])
+        app.add_api_route(f'{route}/speedscope', get_speedscope, methods=['GET'])
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from types import FrameType
+
+from ..helpers import find_relative_path
+
+MAX_DEPTH = 64
+
+
+def frame_name(frame: FrameType) -> str:
+    """Return a short, human-readable description of the frame (``function (file:line)``)."""
+    filename = frame.f_code.co_filename
+    path = find_relative_path(filename) or os.path.basename(filename)
+    return f'{frame.f_code.co_qualname} ({path}:{frame.f_lineno})'.replace(';', ',')
+
+
+def collapse(frame: FrameType | None, *, max_depth: int = MAX_DEPTH) -> str:
+    """Return the stack of the frame in collapsed format (outermost frame first, separated by semicolons)."""
+    names: list[str] = []
+    while frame is not None and len(names) < max_depth:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+@dataclass(slots=True, kw_only=True)
+class StackNode:
+    name: str
+    """description of the frame"""
+    count: int = 0
+    """number of samples which contain this frame (at this position in the stack)"""
+    children: dict[str, StackNode] = field(default_factory=dict)
+    """frames called from this frame"""
+
+
+def build_tree(stacks: dict[str, int], *, root_name: str = 'all') -> StackNode:
+    """Merge collapsed stacks with their sample counts into a tree (as displayed by flame graphs)."""
+    root = StackNode(name=root_name)
+    for stack, count in stacks.items():
+        root.count += count
+        node = root
+        for name in stack.split(';'):
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = StackNode(name=name)
+            child.count += count
+            node = child
+    return root
@@ -10,7 +10,6 @@ from pathlib import Path
 from typing import Protocol
 
 import humanize
-from cairosvg import svg2png
 from PIL import Image, ImageDraw, ImageFont
 
 from .. import rosys
@@ -133,8 +132,11 @@ class TimelapseRecorder:
         )
         self.log.info('video compression for %s starting:\n%s', target_filename, cmd)
         self.ongoing_compressions.append(target_filename)
-        await rosys.run.sh(cmd, timeout=None, shell=True)
-        self.ongoing_compressions.remove(target_filename)
+        try:
+            async for line in rosys.run.sh_lines(cmd, shell=True):
+                self.log.debug('ffmpeg: %s', line)
+        finally:
+            self.ongoing_compressions.remove(target_filename)
         self.log.info('video compression for %s finished', target_filename)
 
     def discard_video(self) -> None:
@@ -170,6 +172,7 @@ def _save_image(image: RosysImage,
         y += 30
         _write(message, draw, x, y)
     if overlay:
+        from cairosvg import svg2png  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
         style = 'position:absolute;top:0;left:0;pointer-events:none'
         viewbox = f'0 0 {image.size.width} {image.size.height}'
         svg_image = svg2png(bytestring=f'<svg style="{style}" viewBox="{viewbox}">{overlay}</svg>')
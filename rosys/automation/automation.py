@@ -51,6 +51,7 @@ class Automation:
         self._stop = False
         self._is_waited = False
         self._uninterruptible_depth = 0  # >0 while inside an @uninterruptible section
+        self._waiter: asyncio.Future | None = None
 
     @property
     def is_running(self) -> bool:
@@ -94,7 +95,13 @@ class Automation:
                     return err.value
                 send = iter_send
                 try:
-                    message = yield signal
+                    if asyncio.isfuture(signal):
+                        yield from self._wait_for(signal)
+                        if not signal.done():
+                            continue  # NOTE: the automation has been stopped while waiting
+                        message = None
+                    else:
+                        message = yield signal
                 except BaseException as err:
                     send, message = iter_throw, err
         except Exception as e:
@@ -107,6 +114,26 @@ class Automation:
             _CURRENT_AUTOMATION.reset(token)
         return None
 
+    def _wait_for(self, future: asyncio.Future) -> Generator[Any, None, None]:
+        """Wait for the future but return early if the automation is stopped.
+
+        Otherwise stopping would be delayed until the future is done (e.g. a long ``rosys.sleep()``).
+        """
+        self._waiter = future.get_loop().create_future()
+        future.add_done_callback(self._wake)
+        try:
+            yield from self._waiter.__await__()
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            future.remove_done_callback(self._wake)
+            self._waiter = None
+
+    def _wake(self, _: Any = None) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
     def pause(self) -> None:
         self._can_run.clear()
 
@@ -116,3 +143,5 @@ class Automation:
     def stop(self) -> None:
         self._can_run.set()
         self._stop = True
+        if self._uninterruptible_depth == 0:
+            self._wake()
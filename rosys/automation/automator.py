@@ -63,6 +63,7 @@ class Automator:
             self.AUTOMATION_STOPPED.register(lambda _: cast(Callable, on_interrupt)())
 
         rosys.on_shutdown(lambda: self.stop(because='automator is shutting down'))
+        rosys.gc_controller.defer_full_collections_while(lambda: self.is_running)
 
     @property
     def is_stopped(self) -> bool:
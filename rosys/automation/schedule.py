@@ -4,7 +4,6 @@ from collections.abc import Callable
 from datetime import datetime, timedelta
 from typing import Any, cast
 
-import suntime
 from nicegui import ui
 
 from .. import persistence, rosys
@@ -212,6 +211,7 @@ class Schedule(persistence.Persistable):
 def _get_sun_start_hour(location: tuple[float, float], offset: float) -> float:
     if not location:
         return 0.0
+    import suntime  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
     sun = suntime.Sun(lat=location[0], lon=location[1])
     start_time = sun.get_sunrise_time(datetime.now()).astimezone() + timedelta(minutes=offset)
     return start_time.hour + start_time.minute / 60 + start_time.second / 60 / 60
@@ -221,6 +221,7 @@ def _get_sun_start_hour(location: tuple[float, float], offset: float) -> float:
 def _get_sun_stop_hour(location, offset) -> float:
     if not location:
         return 24.0
+    import suntime  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
     sun = suntime.Sun(lat=location[0], lon=location[1])
     stop_time = sun.get_sunset_time(datetime.now()).astimezone() + timedelta(minutes=offset)
     return stop_time.hour + stop_time.minute / 60 + stop_time.second / 60 / 60
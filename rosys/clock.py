@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time as pytime
+from collections.abc import Callable
+
+MIN_SPEED = 0.01
+
+
+class Clock:
+    """Wakes up sleepers when their deadline is reached.
+
+    All sleepers are kept in a single heap ordered by deadline.
+    Without ``manual_time`` the clock follows the monotonic system time scaled by the speed
+    and only one loop timer is armed for the earliest deadline.
+    With ``manual_time`` (used in tests) the time is advanced from outside and ``update()`` wakes the due sleepers.
+
+    :param manual_time: function returning the current time if it is controlled manually
+    """
+
+    def __init__(self, *, manual_time: Callable[[], float] | None = None) -> None:
+        self.manual_time = manual_time
+        self._speed = 1.0
+        self._offset = 0.0
+        self._anchor = pytime.monotonic()
+        self._sleepers: list[tuple[float, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_deadline = math.inf
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    def set_speed(self, value: float) -> None:
+        """Change the factor by which the clock runs faster than real time (ignored for manual time)."""
+        value = max(value, MIN_SPEED)
+        if value == self._speed:
+            return
+        if self.manual_time is None:
+            self._offset = self.now()
+            self._anchor = pytime.monotonic()
+        self._speed = value
+        self._arm(force=True)  # NOTE: the real-time delay until the earliest deadline has changed
+
+    def now(self) -> float:
+        if self.manual_time is not None:
+            return self.manual_time()
+        return self._offset + (pytime.monotonic() - self._anchor) * self._speed
+
+    def wake_at(self, deadline: float, future: asyncio.Future) -> None:
+        """Resolve the future as soon as the deadline is reached."""
+        heapq.heappush(self._sleepers, (deadline, next(self._counter), future))
+        if deadline < self._timer_deadline:
+            self._arm(force=True)
+
+    async def sleep(self, seconds: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self.wake_at(self.now() + seconds, future)
+        await future
+
+    def update(self) -> None:
+        """Wake up all sleepers whose deadline has been reached."""
+        self._cancel_timer()
+        now = self.now()
+        while self._sleepers and self._is_due(self._sleepers[0][0], now):
+            _, _, future = heapq.heappop(self._sleepers)
+            if not future.done() and not future.get_loop().is_closed():
+                future.set_result(None)
+        self._arm()
+
+    def clear(self) -> None:
+        self._sleepers.clear()
+        self._cancel_timer()
+
+    @property
+    def num_sleepers(self) -> int:
+        return sum(1 for _, _, future in self._sleepers if not future.done())
+
+    def _is_due(self, deadline: float, now: float) -> bool:
+        if self.manual_time is not None:
+            return deadline < now  # NOTE: in tests sleepers wake up at the first time step after their deadline
+        return deadline <= now
+
+    def _arm(self, *, force: bool = False) -> None:
+        while self._sleepers and self._sleepers[0][2].done():
+            heapq.heappop(self._sleepers)  # NOTE: drop cancelled sleepers
+        if self.manual_time is not None:
+            return
+        if not self._sleepers:
+            self._cancel_timer()
+            return
+        deadline, _, future = self._sleepers[0]
+        if not force and deadline == self._timer_deadline and self._timer is not None:
+            return
+        self._cancel_timer()
+        delay = max(deadline - self.now(), 0.0) / self._speed
+        self._timer = future.get_loop().call_later(delay, self.update)
+        self._timer_deadline = deadline
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._timer_deadline = math.inf
@@ -1,5 +1,6 @@
 from typing import Any
 
+from .event import Event
 from .persistence.persistable import Persistable
 
 
@@ -8,9 +9,23 @@ class Config(Persistable):
     def __init__(self) -> None:
         super().__init__()
         self.ui_update_interval: float = 0.1
-        self.simulation_speed: float = 1.0
+        self._simulation_speed: float = 1.0
         self.garbage_collection_mbyte_limit: float = 300
 
+        self.SIMULATION_SPEED_CHANGED = Event[float]()
+        """the simulation speed has changed (argument: new speed)"""
+
+    @property
+    def simulation_speed(self) -> float:
+        return self._simulation_speed
+
+    @simulation_speed.setter
+    def simulation_speed(self, value: float) -> None:
+        if value == self._simulation_speed:
+            return
+        self._simulation_speed = value
+        self.SIMULATION_SPEED_CHANGED.emit(value)
+
     def backup_to_dict(self) -> dict[str, Any]:
         return {'simulation_speed': self.simulation_speed}
 
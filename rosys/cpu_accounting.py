@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import math
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+BUCKET_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+"""upper bounds of the histogram buckets (in seconds); the last bucket collects all larger values"""
+
+
+@dataclass(slots=True, kw_only=True)
+class Histogram:
+    counts: list[int] = field(default_factory=lambda: [0] * (len(BUCKET_BOUNDS) + 1))
+    """number of values per bucket"""
+    total: float = 0.0
+    """sum of all values (in seconds)"""
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.total += value
+
+    def percentile(self, q: float) -> float:
+        """Return the upper bound of the bucket which contains the given quantile (``inf`` for the last bucket)."""
+        rank = q * self.count
+        cumulated = 0
+        for i, count in enumerate(self.counts):
+            cumulated += count
+            if count and cumulated >= rank:
+                return BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else math.inf
+        return 0.0
+
+
+@dataclass(slots=True, kw_only=True)
+class CallsiteStats:
+    callsite: str
+    """qualified name of the function which has been called"""
+    category: str
+    """category which limits the number of concurrent calls"""
+    queue_wait: Histogram = field(default_factory=Histogram)
+    """time from submitting a call until it starts executing"""
+    execution: Histogram = field(default_factory=Histogram)
+    """time spent executing the call"""
+
+
+class CpuAccounting:
+    """Keeps track of CPU-bound work.
+
+    It counts the calls in flight, collects per-callsite histograms of queue wait and execution time
+    and limits the number of concurrent calls per category (e.g. "camera" or "planning").
+    All bookkeeping happens on the event loop, so plain integers are sufficient as counters.
+    """
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.callsites: dict[str, CallsiteStats] = {}
+        self.limits: dict[str, int] = {}
+        self._semaphores: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+    def set_limit(self, category: str, limit: int | None) -> None:
+        """Limit the number of concurrent calls of the given category (``None`` removes the limit)."""
+        if limit is None:
+            self.limits.pop(category, None)
+        else:
+            self.limits[category] = limit
+        self._semaphores.pop(category, None)
+
+    @asynccontextmanager
+    async def limit(self, category: str) -> AsyncGenerator[None, None]:
+        """Wait until another call of the given category is allowed to run."""
+        limit = self.limits.get(category)
+        if limit is None:
+            yield
+            return
+        # NOTE: semaphores are bound to the loop they are first used on, so they are created lazily for each new loop
+        loop = asyncio.get_running_loop()
+        semaphore_loop, semaphore = self._semaphores.get(category, (None, None))
+        if semaphore is None or semaphore_loop is not loop:
+            semaphore = asyncio.Semaphore(limit)
+            self._semaphores[category] = (loop, semaphore)
+        async with semaphore:
+            yield
+
+    def record(self, callsite: str, category: str, *, queue_wait: float, execution: float) -> None:
+        stats = self.callsites.get(callsite)
+        if stats is None:
+            stats = self.callsites[callsite] = CallsiteStats(callsite=callsite, category=category)
+        stats.queue_wait.record(queue_wait)
+        stats.execution.record(execution)
+
+    def clear(self) -> None:
+        self.callsites.clear()
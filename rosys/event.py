@@ -3,18 +3,31 @@ from __future__ import annotations
 import asyncio
 import inspect
 import logging
+import math
+import time
+import weakref
+from collections import deque
 from collections.abc import Awaitable, Callable
-from dataclasses import dataclass
-from typing import Any, Generic, ParamSpec
+from dataclasses import dataclass, field
+from typing import Any, Generic, Literal, ParamSpec
 
 from nicegui import background_tasks, context, core
 
 from .helpers import invoke
 
 startup_coroutines: list[Awaitable] = []
-tasks: list[asyncio.Task] = []
+tasks: set[asyncio.Task] = set()
+exception_handlers: list[Callable[[BaseException], None]] = []
 log = logging.getLogger('rosys.event')
 events: list[Event] = []
+listener_stats: dict[str, ListenerStats] = {}
+STATS_WINDOW = 1000
+
+OverflowPolicy = Literal['drop_oldest', 'drop_newest', 'latest']
+
+
+class _state:
+    instrumented: bool = False
 
 
 @dataclass(slots=True, kw_only=True)
@@ -22,6 +35,82 @@ class EventListener:
     callback: Callable
     filepath: str
     line: int
+    is_async: bool = field(init=False)
+    name: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.is_async = asyncio.iscoroutinefunction(self.callback)
+        self.name = f'{self.filepath}:{self.line}'
+
+
+@dataclass(slots=True, kw_only=True)
+class ListenerStats:
+    name: str
+    """location where the listener has been registered (``filepath:line``)"""
+    callback: str
+    """qualified name of the callback"""
+    calls: int = 0
+    """number of calls via ``emit()``"""
+    total_time: float = 0.0
+    """cumulative time spent synchronously in the callback (in seconds)"""
+    durations: deque[float] = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    """durations of the most recent synchronous calls (in seconds)"""
+    tasks: int = 0
+    """number of completed tasks spawned for awaitable results"""
+    pending_tasks: int = 0
+    """number of spawned tasks which are still running"""
+    total_task_time: float = 0.0
+    """cumulative time from spawning until completion of the tasks (in seconds)"""
+    task_durations: deque[float] = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    """durations of the most recent tasks (in seconds)"""
+
+    @property
+    def p99_time(self) -> float:
+        return _percentile(self.durations, 0.99)
+
+    @property
+    def p99_task_time(self) -> float:
+        return _percentile(self.task_durations, 0.99)
+
+    def record_call(self, duration: float) -> None:
+        self.calls += 1
+        self.total_time += duration
+        self.durations.append(duration)
+
+    def record_task(self, duration: float) -> None:
+        self.tasks += 1
+        self.pending_tasks -= 1
+        self.total_task_time += duration
+        self.task_durations.append(duration)
+
+
+def _percentile(values: deque[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def enable_instrumentation() -> None:
+    """Start recording call counts and execution times of all listeners called via ``emit()``."""
+    _state.instrumented = True
+
+
+def disable_instrumentation() -> None:
+    _state.instrumented = False
+
+
+def is_instrumented() -> bool:
+    return _state.instrumented
+
+
+def get_listener_stats() -> list[ListenerStats]:
+    """Return the recorded statistics of all listeners, the most time-consuming first."""
+    return sorted(listener_stats.values(), key=lambda stats: stats.total_time + stats.total_task_time, reverse=True)
+
+
+def clear_listener_stats() -> None:
+    listener_stats.clear()
 
 
 P = ParamSpec('P')
@@ -31,6 +120,8 @@ class Event(Generic[P]):
 
     def __init__(self) -> None:
         self.listeners: list[EventListener] = []
+        self._sync_listeners: tuple[EventListener, ...] = ()
+        self._async_listeners: tuple[EventListener, ...] = ()
         events.append(self)
 
     def register(self, callback: Callable[P, Any]) -> Event[P]:
@@ -43,6 +134,7 @@ class Event(Generic[P]):
         frame = frame.f_back
         assert frame is not None
         self.listeners.append(EventListener(callback=callback, filepath=frame.f_code.co_filename, line=frame.f_lineno))
+        self._partition()
         return self
 
     def register_ui(self, callback: Callable[P, Any]) -> Event[P]:
@@ -61,6 +153,17 @@ class Event(Generic[P]):
 
     def unregister(self, callback: Callable[P, Any]) -> None:
         self.listeners[:] = [l for l in self.listeners if l.callback != callback]
+        self._partition()
+
+    def clear(self) -> None:
+        """Remove all listeners."""
+        self.listeners.clear()
+        self._partition()
+
+    def _partition(self) -> None:
+        # NOTE: emit iterates over these immutable snapshots, so listeners can (un)register themselves while being called
+        self._sync_listeners = tuple(l for l in self.listeners if not l.is_async)
+        self._async_listeners = tuple(l for l in self.listeners if l.is_async)
 
     async def call(self, *args: P.args, **kwargs: P.kwargs) -> None:
         """Fires event and waits async until all registered listeners are completed"""
@@ -72,25 +175,44 @@ class Event(Generic[P]):
 
     def emit(self, *args: P.args, **kwargs: P.kwargs) -> None:
         """Fires event without waiting for the result."""
-        for listener in self.listeners:
+        if _state.instrumented:
+            self._emit_instrumented(*args, **kwargs)
+            return
+        for listener in self._sync_listeners:
             try:
                 result = listener.callback(*args, **kwargs)
-                if isinstance(result, Awaitable):
-                    if core.loop and core.loop.is_running():
-                        name = f'{listener.filepath}:{listener.line}'
-                        tasks.append(background_tasks.create(result, name=name))
-                    else:
-                        startup_coroutines.append(result)
+                if result is not None and isinstance(result, Awaitable):  # NOTE: e.g. lambdas returning a coroutine
+                    _schedule(result, listener)
+            except Exception:
+                log.exception('could not emit listener=%s', listener)
+        for listener in self._async_listeners:
+            try:
+                _schedule(listener.callback(*args, **kwargs), listener)
             except Exception:
                 log.exception('could not emit listener=%s', listener)
 
+    def _emit_instrumented(self, *args: P.args, **kwargs: P.kwargs) -> None:
+        for listener in self._sync_listeners + self._async_listeners:
+            stats = listener_stats.get(listener.name)
+            if stats is None:
+                callback = getattr(listener.callback, '__qualname__', repr(listener.callback))
+                stats = listener_stats[listener.name] = ListenerStats(name=listener.name, callback=callback)
+            start = time.perf_counter()
+            try:
+                result = listener.callback(*args, **kwargs)
+                if listener.is_async or (result is not None and isinstance(result, Awaitable)):
+                    _schedule(result, listener, stats)
+            except Exception:
+                log.exception('could not emit listener=%s', listener)
+            stats.record_call(time.perf_counter() - start)
+
     async def emitted(self, timeout: float | None = None) -> Any:
         """Waits for an event to be emitted and returns its arguments."""
         future: asyncio.Future[Any] = asyncio.Future()
 
         def callback(*args: P.args, **kwargs: P.kwargs) -> None:  # pylint: disable=unused-argument
             if not future.done():
-                future.set_result(args[0] if len(args) == 1 else args if args else None)
+                future.set_result(_to_value(args))
 
         self.register(callback)
         try:
@@ -103,12 +225,115 @@ class Event(Generic[P]):
     def __await__(self):
         return self.emitted().__await__()
 
+    def stream(self, maxsize: int = 1, *, policy: OverflowPolicy = 'drop_oldest') -> EventStream:
+        """Subscribe to the event with a bounded buffer which can be consumed with ``async for``.
+
+        Unlike async listeners, a slow consumer does not spawn a task per emitted event.
+        If the buffer is full, the oldest (``'drop_oldest'``) or the new value (``'drop_newest'``) is dropped.
+        With ``'latest'`` only the most recent value is kept.
+
+        Example: ``async for image in camera.NEW_IMAGE.stream(maxsize=2): ...``
+        """
+        return EventStream(self, maxsize=maxsize, policy=policy)
+
+
+class EventStream:
+    """A subscription to an event which buffers its values until they are consumed.
+
+    The stream unregisters from the event when it is closed or garbage collected.
+    """
+
+    def __init__(self, event: Event, *, maxsize: int, policy: OverflowPolicy) -> None:
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.event = event
+        self.maxsize = 1 if policy == 'latest' else maxsize
+        self.policy = policy
+        self.buffer: deque[Any] = deque()
+        self.dropped = 0
+        self.closed = False
+        self._waiter: asyncio.Future | None = None
+
+        stream_ref = weakref.ref(self)
+
+        def put(*args: Any, **kwargs: Any) -> None:  # pylint: disable=unused-argument
+            stream = stream_ref()
+            if stream is None:
+                event.unregister(put)  # NOTE: the consumer has gone away without closing the stream
+                return
+            stream.put(_to_value(args))
+        self._listener = put
+        event.register(put)
+
+    def put(self, value: Any) -> None:
+        if self.closed:
+            return
+        if len(self.buffer) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == 'drop_newest':
+                return
+            self.buffer.popleft()
+        self.buffer.append(value)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self) -> None:
+        """Stop receiving values; the iteration ends after the buffered values have been consumed."""
+        self.closed = True
+        self.event.unregister(self._listener)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self) -> EventStream:
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self.buffer:
+            if self.closed:
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self.buffer.popleft()
+
+
+def _to_value(args: tuple) -> Any:
+    return args[0] if len(args) == 1 else args if args else None
+
+
+def _schedule(awaitable: Awaitable, listener: EventListener, stats: ListenerStats | None = None) -> None:
+    if core.loop and core.loop.is_running():
+        task = background_tasks.create(awaitable, name=listener.name)
+        tasks.add(task)
+        task.add_done_callback(_handle_task_result)
+        if stats is not None:
+            start = time.perf_counter()
+            stats.pending_tasks += 1
+            task.add_done_callback(lambda _: stats.record_task(time.perf_counter() - start))
+    else:
+        startup_coroutines.append(awaitable)
+
+
+def _handle_task_result(task: asyncio.Task) -> None:
+    tasks.discard(task)
+    if task.cancelled() or task.exception() is None:
+        return
+    exception = task.exception()
+    assert exception is not None
+    log.exception('task failed to execute', exc_info=exception)
+    for handler in exception_handlers:
+        handler(exception)
+
 
 def reset() -> None:
     for event in events:
-        event.listeners.clear()
+        event.clear()
     events.clear()
     for task in tasks:
         task.cancel()
     tasks.clear()
     startup_coroutines.clear()
+    clear_listener_stats()
+    disable_instrumentation()
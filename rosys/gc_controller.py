@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import logging
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import psutil
+
+from .cpu_accounting import Histogram
+
+if TYPE_CHECKING:
+    from .scheduler import Scheduler
+
+log = logging.getLogger('rosys.gc_controller')
+
+
+@dataclass(slots=True, kw_only=True)
+class GcStats:
+    generation: int
+    """the collected generation (a collection of generation 2 is a full collection)"""
+    pauses: Histogram = field(default_factory=Histogram)
+    """durations of the collections (in seconds)"""
+    last_pause: float = 0.0
+    """duration of the last collection (in seconds)"""
+    max_pause: float = 0.0
+    """longest duration of a collection (in seconds)"""
+    collected: int = 0
+    """number of unreachable objects which have been freed"""
+
+
+class GcController:
+    """Runs garbage collections in idle slots between the deadlines of the repeaters.
+
+    Automatic garbage collection is disabled by RoSys.
+    Instead ``step`` is called regularly and collects the young generations (0 and 1) whenever their counters exceed
+    the thresholds of the ``gc`` module and the next deadline of the scheduler is further away than the expected pause.
+    If there is no idle slot for ``max_skips`` steps, the young generations are collected anyway.
+    Full collections run every ``full_interval`` seconds or when free memory gets low.
+    Regular ones are deferred while any of the registered checks (like ``Automator.is_running``) reports
+    that the robot is busy; low memory always triggers a full collection, but at most every ``low_memory_interval``.
+    The free memory is checked every ``memory_check_interval`` seconds.
+
+    The pauses of all collections, including the ones triggered elsewhere, are measured via ``gc.callbacks``.
+
+    :param scheduler: the scheduler which knows the next deadline
+    :param full_interval: time between full collections (in seconds)
+    :param max_skips: number of steps after which young generations are collected even without an idle slot
+    :param low_memory_interval: minimum time between full collections due to low memory (in seconds)
+    :param memory_check_interval: time between checks of the free memory (in seconds)
+    """
+
+    def __init__(self, scheduler: Scheduler, *,
+                 full_interval: float = 600.0,
+                 max_skips: int = 50,
+                 low_memory_interval: float = 60.0,
+                 memory_check_interval: float = 1.0) -> None:
+        self.scheduler = scheduler
+        self.full_interval = full_interval
+        self.max_skips = max_skips
+        self.low_memory_interval = low_memory_interval
+        self.memory_check_interval = memory_check_interval
+        self.stats = [GcStats(generation=generation) for generation in range(3)]
+        self.skipped = 0
+        """number of steps in which a due collection was postponed because there was no idle slot"""
+        self.deferred_full_collections = 0
+        """number of steps in which a due full collection was deferred because the robot was busy"""
+        self._busy_checks: list[Callable[[], bool]] = []
+        self._last_full_collection = scheduler.clock.now()
+        self._last_low_memory_collection = -math.inf
+        self._last_memory_check = -math.inf
+        self._skips_in_a_row = 0
+        self._start = 0.0
+        gc.callbacks.append(self._measure)
+
+    def defer_full_collections_while(self, check: Callable[[], bool]) -> None:
+        """Do not run full collections while the given check returns ``True``."""
+        self._busy_checks.append(check)
+
+    @property
+    def is_busy(self) -> bool:
+        return any(check() for check in self._busy_checks)
+
+    def expected_pause(self, generation: int) -> float:
+        """Estimate the duration of a collection of the given generation from previous ones (in seconds)."""
+        return self.stats[generation].pauses.percentile(0.99)
+
+    def step(self, *, memory_limit_mbyte: float = 0) -> None:
+        """Collect garbage if it is due.
+
+        The decision is made after the scheduler has fired all repeaters which are currently due.
+
+        :param memory_limit_mbyte: start a full collection if less memory is available
+        """
+        asyncio.get_running_loop().call_soon(self._collect, memory_limit_mbyte)
+
+    def clear(self) -> None:
+        self._busy_checks.clear()
+        self._last_full_collection = self.scheduler.clock.now()
+        self._skips_in_a_row = 0
+
+    def _collect(self, memory_limit_mbyte: float) -> None:
+        now = self.scheduler.clock.now()
+        low_memory = self._is_low_on_memory(now, memory_limit_mbyte)
+        if low_memory or now >= self._last_full_collection + self.full_interval:
+            if self.is_busy and not low_memory:
+                self.deferred_full_collections += 1
+            else:
+                if low_memory:
+                    log.warning('less than %s mb of memory remaining -> start garbage collection', memory_limit_mbyte)
+                gc.collect()
+                if low_memory:
+                    log.warning('finished garbage collection')
+                self._last_full_collection = now
+                self._last_low_memory_collection = now  # NOTE: another collection would not free much right away
+                self._skips_in_a_row = 0
+                return
+
+        count0, count1, _ = gc.get_count()
+        threshold0, threshold1, _ = gc.get_threshold()
+        if count1 >= threshold1:
+            generation = 1
+        elif count0 >= threshold0:
+            generation = 0
+        else:
+            return
+        # NOTE: the slack is measured on the (possibly accelerated) clock, but pauses take real time
+        real_slack = self.scheduler.slack() / self.scheduler.clock.speed
+        if real_slack < self.expected_pause(generation) and self._skips_in_a_row < self.max_skips:
+            self.skipped += 1
+            self._skips_in_a_row += 1
+            return
+        gc.collect(generation)
+        self._skips_in_a_row = 0
+
+    def _is_low_on_memory(self, now: float, memory_limit_mbyte: float) -> bool:
+        # NOTE: "free" memory excludes the page cache, so it may stay below the limit for a long time
+        if memory_limit_mbyte <= 0 or now < self._last_low_memory_collection + self.low_memory_interval:
+            return False
+        if now < self._last_memory_check + self.memory_check_interval:
+            return False
+        self._last_memory_check = now
+        return psutil.virtual_memory().free < memory_limit_mbyte * 1_000_000
+
+    def _measure(self, phase: str, info: dict[str, Any]) -> None:
+        if phase == 'start':
+            self._start = time.perf_counter()
+            return
+        duration = time.perf_counter() - self._start
+        stats = self.stats[info['generation']]
+        stats.pauses.record(duration)
+        stats.last_pause = duration
+        stats.max_pause = max(stats.max_pause, duration)
+        stats.collected += info['collected']
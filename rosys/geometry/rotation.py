@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-import cv2
 import numpy as np
 from pyquaternion import Quaternion
 
@@ -28,6 +27,8 @@ class Rotation:
 
     @staticmethod
     def from_rvec(rvec) -> Rotation:
+        # NOTE: OpenCV takes long to import and is rarely needed here
+        import cv2  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
         return Rotation(R=cv2.Rodrigues(rvec)[0].tolist())
 
     def __mul__(self, other: Rotation) -> Rotation:
@@ -163,26 +163,7 @@ class Spline:
         return (x_ * y__ - y_ * x__) / (x_**2 + y_**2)**(3/2)
 
     def max_curvature(self, t_min: float = 0.0, t_max: float = 1.0) -> float:
-        poly = [
-            (1296 * self.m * self.p ** 2 + 1296 * self.m ** 3) * self.q - 1296 * self.n * self.p ** 3 - 1296 * self.m ** 2 *
-            self.n * self.p, (1620 * self.m * self.p ** 2 + 1620 * self.m ** 3) *
-            self.r + 3240 * self.m * self.p * self.q
-            ** 2 + (3240 * self.m ** 2 * self.n - 3240 * self.n * self.p ** 2) * self.q - 1620 * self.o * self.p ** 3 +
-            ((-1620 * self.m ** 2 * self.o) - 3240 * self.m * self.n ** 2) * self.p,
-            (5184 * self.m * self.p * self.q + 1296 * self.n * self.p ** 2 + 6480 * self.m ** 2 * self.n) * self.r + 1296 *
-            self.m * self.q ** 3 - 1296 * self.n * self.p * self.q ** 2 +
-            ((-6480 * self.o * self.p ** 2) - 1296 * self.m ** 2 * self.o + 1296 * self.m * self.n ** 2) * self.q +
-            ((-5184 * self.m * self.n * self.o) - 1296 * self.n ** 3) * self.p, 1296 * self.m * self.p * self.r ** 2 +
-            (1944 * self.m * self.q ** 2 + 6480 * self.n * self.p * self.q - 1296 * self.o * self.p ** 2 + 1296 * self.m **
-             2 * self.o + 8424 * self.m * self.n ** 2) * self.r - 8424 * self.o * self.p * self.q ** 2 - 6480 * self.m *
-            self.n * self.o * self.q + ((-1296 * self.m * self.o ** 2) - 1944 * self.n ** 2 * self.o) * self.p, 2592 *
-            self.n * self.p * self.r ** 2 +
-            (3888 * self.n * self.q ** 2 - 2592 * self.o * self.p * self.q + 2592 * self.m * self.n * self.o + 3888 * self.
-             n ** 3) * self.r - 3888 * self.o * self.q ** 3 +
-            ((-2592 * self.m * self.o ** 2) - 3888 * self.n ** 2 * self.o) * self.q, -324 * self.m * self.r ** 3 +
-            (1944 * self.n * self.q + 324 * self.o * self.p) * self.r ** 2 +
-            ((-1944 * self.o * self.q ** 2) - 324 * self.m * self.o ** 2 + 1944 * self.n ** 2 * self.o) * self.r - 1944 *
-            self.n * self.o ** 2 * self.q + 324 * self.o ** 3 * self.p, ]
+        poly = curvature_polynomial(self)
         roots = np.roots(poly)
         t = np.array([t0 for t0 in roots if np.isreal(t0) and t_min < t0 < t_max] + [t_min, t_max])
 
@@ -238,3 +219,27 @@ class Spline:
         dx = np.diff([self.x(t) for t in np.linspace(0, 1, steps)])
         dy = np.diff([self.y(t) for t in np.linspace(0, 1, steps)])
         return np.sum(np.sqrt(dx**2 + dy**2))
+
+
+
+def curvature_polynomial(spline) -> list:
+    """Coefficients of the polynomial in t whose roots are the extrema of the spline's curvature.
+
+    The spline can be any object with the derivative coefficients m, n, o, p, q and r,
+    which may also be NumPy arrays to get the coefficients of many splines at once.
+    """
+    m, n, o, p, q, r = spline.m, spline.n, spline.o, spline.p, spline.q, spline.r
+    return [
+        (1296 * m * p ** 2 + 1296 * m ** 3) * q - 1296 * n * p ** 3 - 1296 * m ** 2 * n * p,
+        (1620 * m * p ** 2 + 1620 * m ** 3) * r + 3240 * m * p * q ** 2 + (3240 * m ** 2 * n - 3240 * n * p ** 2) * q -
+        1620 * o * p ** 3 + ((-1620 * m ** 2 * o) - 3240 * m * n ** 2) * p,
+        (5184 * m * p * q + 1296 * n * p ** 2 + 6480 * m ** 2 * n) * r + 1296 * m * q ** 3 - 1296 * n * p * q ** 2 +
+        ((-6480 * o * p ** 2) - 1296 * m ** 2 * o + 1296 * m * n ** 2) * q + ((-5184 * m * n * o) - 1296 * n ** 3) * p,
+        1296 * m * p * r ** 2 +
+        (1944 * m * q ** 2 + 6480 * n * p * q - 1296 * o * p ** 2 + 1296 * m ** 2 * o + 8424 * m * n ** 2) * r -
+        8424 * o * p * q ** 2 - 6480 * m * n * o * q + ((-1296 * m * o ** 2) - 1944 * n ** 2 * o) * p,
+        2592 * n * p * r ** 2 + (3888 * n * q ** 2 - 2592 * o * p * q + 2592 * m * n * o + 3888 * n ** 3) * r -
+        3888 * o * q ** 3 + ((-2592 * m * o ** 2) - 3888 * n ** 2 * o) * q,
+        -324 * m * r ** 3 + (1944 * n * q + 324 * o * p) * r ** 2 +
+        ((-1944 * o * q ** 2) - 324 * m * o ** 2 + 1944 * n ** 2 * o) * r - 1944 * n * o ** 2 * q + 324 * o ** 3 * p,
+    ]
@@ -12,12 +12,18 @@ from typing import Any
 import numpy as np
 from nicegui import app
 
+from .coalescing_executor import CoalescingExecutor, CoalescingPolicy, CoalescingStats, SupersededError
+from .lazy_import import lazy_attributes
 from .lazy_worker import LazyWorker
 
 __all__ = [
+    'CoalescingExecutor',
+    'CoalescingPolicy',
+    'CoalescingStats',
     'LazyWorker',
     'ModificationContext',
     'PackagePathFilter',
+    'SupersededError',
     'angle',
     'eliminate_2pi',
     'eliminate_pi',
@@ -25,6 +31,7 @@ __all__ = [
     'invoke',
     'is_stopping',
     'is_test',
+    'lazy_attributes',
     'measure',
     'ramp',
     'remove_indentation',
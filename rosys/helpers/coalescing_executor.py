@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Coroutine
+from dataclasses import dataclass, field
+from typing import Any, Literal, TypeVar
+
+from ..cpu_accounting import Histogram
+
+_T = TypeVar('_T')
+
+CoalescingPolicy = Literal['newest', 'oldest']
+"""which coroutine is kept when the queue of pending coroutines is full"""
+
+
+class SupersededError(Exception):
+    """The coroutine has been dropped in favor of another one."""
+
+
+@dataclass(slots=True, kw_only=True)
+class CoalescingStats:
+    submitted: int = 0
+    """number of submitted coroutines"""
+    executed: int = 0
+    """number of coroutines which have finished successfully"""
+    failed: int = 0
+    """number of coroutines which raised an exception"""
+    dropped: int = 0
+    """number of coroutines which have been superseded before they could run"""
+    latency: Histogram = field(default_factory=Histogram)
+    """time from submitting a coroutine until it starts running (in seconds)"""
+    duration: Histogram = field(default_factory=Histogram)
+    """time from starting a coroutine until it is done (in seconds)"""
+
+
+@dataclass(slots=True, kw_only=True, eq=False)
+class _Item:
+    coro: Coroutine[Any, Any, Any]
+    future: asyncio.Future
+    submitted: float
+    started: float = 0.0
+    task: asyncio.Task | None = None
+
+
+class CoalescingExecutor:
+    """Runs up to ``concurrency`` coroutines at once and coalesces the ones which arrive in the meantime.
+
+    At most ``max_pending`` coroutines wait for a free slot.
+    When another one arrives, either the oldest pending coroutine is dropped (policy "newest")
+    or the new one is dropped right away (policy "oldest").
+    Dropped coroutines are closed without running and their callers receive a ``SupersededError``.
+    This is useful for work like object detection where only the latest input matters.
+
+    :param concurrency: number of coroutines which may run at the same time (e.g. the number of detector replicas)
+    :param policy: which coroutine to keep when the queue of pending coroutines is full
+    :param max_pending: number of coroutines which may wait for a free slot
+    """
+
+    def __init__(self, concurrency: int = 1, *, policy: CoalescingPolicy = 'newest', max_pending: int = 1) -> None:
+        self.concurrency = concurrency
+        self.policy = policy
+        self.max_pending = max_pending
+        self.stats = CoalescingStats()
+        self._pending: deque[_Item] = deque()
+        self._running: set[_Item] = set()
+
+    @property
+    def num_running(self) -> int:
+        return len(self._running)
+
+    @property
+    def num_pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, coro: Coroutine[Any, Any, _T]) -> asyncio.Future[_T]:
+        """Submit the coroutine and return a future for its result.
+
+        The future raises a ``SupersededError`` if the coroutine is dropped in favor of another one.
+        Cancelling the future cancels the coroutine.
+        """
+        item = _Item(coro=coro, future=asyncio.get_running_loop().create_future(), submitted=time.perf_counter())
+        item.future.add_done_callback(lambda _: self._handle_done_future(item))
+        self.stats.submitted += 1
+        if len(self._running) < self.concurrency:
+            self._start(item)
+        elif len(self._pending) < self.max_pending:
+            self._pending.append(item)
+        elif self.policy == 'newest' and self._pending:
+            self._drop(self._pending.popleft())
+            self._pending.append(item)
+        else:
+            self._drop(item)
+        return item.future
+
+    async def run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        """Run the coroutine and return its result.
+
+        :raises SupersededError: if the coroutine is dropped in favor of another one
+        """
+        return await self.submit(coro)
+
+    def _start(self, item: _Item) -> None:
+        item.started = time.perf_counter()
+        self.stats.latency.record(item.started - item.submitted)
+        self._running.add(item)
+        item.task = asyncio.get_running_loop().create_task(item.coro, name='coalescing executor')
+        item.task.add_done_callback(lambda task: self._finish(item, task))
+
+    def _finish(self, item: _Item, task: asyncio.Task) -> None:
+        self.stats.duration.record(time.perf_counter() - item.started)
+        self._running.discard(item)
+        if task.cancelled():
+            item.future.cancel()
+        elif task.exception() is not None:
+            self.stats.failed += 1
+            if not item.future.done():
+                item.future.set_exception(task.exception())  # type: ignore[arg-type]
+        else:
+            self.stats.executed += 1
+            if not item.future.done():
+                item.future.set_result(task.result())
+        if self._pending:
+            self._start(self._pending.popleft())
+
+    def _drop(self, item: _Item) -> None:
+        self.stats.dropped += 1
+        item.coro.close()
+        if not item.future.done():
+            item.future.set_exception(SupersededError())
+
+    def _handle_done_future(self, item: _Item) -> None:
+        if not item.future.cancelled():
+            return
+        if item in self._pending:
+            self._pending.remove(item)
+            item.coro.close()
+        elif item.task is not None and not item.task.done():
+            item.task.cancel()
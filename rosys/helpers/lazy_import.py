@@ -0,0 +1,31 @@
+import importlib
+import sys
+from collections.abc import Callable
+from typing import Any
+
+
+def lazy_attributes(package: str, attributes: dict[str, str]) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """Create module-level ``__getattr__`` and ``__dir__`` functions which import attributes on first access.
+
+    This keeps heavy submodules (and the third-party libraries they use) out of the startup time
+    until they are actually needed.
+
+    :param package: name of the package the attributes belong to (usually ``__name__``)
+    :param attributes: maps each attribute to the module providing it (``'.module'`` or ``'.module:name'``)
+    """
+    def __getattr__(name: str) -> Any:
+        if name not in attributes:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        module_name, _, attribute = attributes[name].partition(':')
+        module = importlib.import_module(module_name, package)
+        if module_name == f'.{name}' and not attribute:
+            value = module  # NOTE: the attribute is the submodule itself
+        else:
+            value = getattr(module, attribute or name)
+        setattr(sys.modules[package], name, value)  # NOTE: later accesses do not need to go through __getattr__
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(sys.modules[package].__dict__) | set(attributes))
+
+    return __getattr__, __dir__
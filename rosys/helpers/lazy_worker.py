@@ -1,15 +1,19 @@
-import asyncio
 from collections.abc import Coroutine
 from typing import Any, TypeVar
 
+from .coalescing_executor import CoalescingExecutor, SupersededError
+
 _T = TypeVar('_T')
 
 
 class LazyWorker:
+    """Runs one coroutine at a time and keeps only the newest of the waiting ones.
+
+    This is a simplified interface to ``CoalescingExecutor``.
+    """
 
     def __init__(self) -> None:
-        self._condition = asyncio.Event()
-        self._is_free = True
+        self.executor = CoalescingExecutor(1, policy='newest', max_pending=1)
 
     async def run(self, coro: Coroutine[Any, None, _T]) -> _T | None:
         """Run the coroutine and return the result.
@@ -19,22 +23,7 @@ class LazyWorker:
 
         :return: result of the coroutine or ``None`` if the coroutine was discarded
         """
-        self._notify()
-
-        if not self._is_free:
-            await self._condition.wait()
-
-        if not self._is_free:
-            coro.close()
-            return None
-
-        self._is_free = False
         try:
-            return await coro
-        finally:
-            self._is_free = True
-            self._notify()
-
-    def _notify(self) -> None:
-        self._condition.set()
-        self._condition.clear()
+            return await self.executor.run(coro)
+        except SupersededError:
+            return None
@@ -1,10 +1,26 @@
-from .area import Area
-from .area_manipulation import AreaManipulation, AreaManipulationMode
-from .area_object_ import AreaObject as area_object
-from .obstacle import Obstacle
-from .obstacle_object_ import ObstacleObject as obstacle_object
-from .path_object_ import PathObject as path_object
-from .path_planner import PathPlanner
+from typing import TYPE_CHECKING
+
+from ..helpers.lazy_import import lazy_attributes
+
+if TYPE_CHECKING:
+    from .area import Area
+    from .area_manipulation import AreaManipulation, AreaManipulationMode
+    from .area_object_ import AreaObject as area_object
+    from .obstacle import Obstacle
+    from .obstacle_object_ import ObstacleObject as obstacle_object
+    from .path_object_ import PathObject as path_object
+    from .path_planner import PathPlanner
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'Area': '.area',
+    'AreaManipulation': '.area_manipulation',
+    'AreaManipulationMode': '.area_manipulation',
+    'Obstacle': '.obstacle',
+    'PathPlanner': '.path_planner',
+    'area_object': '.area_object_:AreaObject',
+    'obstacle_object': '.obstacle_object_:ObstacleObject',
+    'path_object': '.path_object_:PathObject',
+})
 
 __all__ = [
     'Area',
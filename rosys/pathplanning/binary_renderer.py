@@ -4,30 +4,51 @@ from matplotlib.path import Path
 
 class BinaryRenderer:
 
-    def __init__(self, size, fill_value: bool = False) -> None:
-        self.map = np.full(size, fill_value=fill_value, dtype=bool)
+    def __init__(self, size, fill_value: bool = False, *, window: tuple[slice, slice] | None = None) -> None:
+        """Render shapes into a binary map of the given size.
 
-        self.xx, self.yy = np.meshgrid(range(size[1]), range(size[0]))
-        self.xy = np.vstack((self.xx.flatten(), self.yy.flatten())).T
+        If a window (rows, columns) is given, only this part of the map is allocated and rendered,
+        while all coordinates still refer to the full map.
+        """
+        self.size = size
+        rows, cols = window or (slice(0, size[0]), slice(0, size[1]))
+        self.row0 = rows.start
+        self.col0 = cols.start
+        self.map = np.full((rows.stop - rows.start, cols.stop - cols.start), fill_value=fill_value, dtype=bool)
 
     def circle(self, x, y, radius, value=True) -> None:
-        x0 = max(int(x - radius), 0)
-        y0 = max(int(y - radius), 0)
-        x1 = min(int(x + radius) + 2, self.map.shape[1] - 1)
-        y1 = min(int(y + radius) + 2, self.map.shape[0] - 1)
-        roi = self.map[y0:y1, x0:x1]
-        sqr_dist = (self.xx[y0:y1, x0:x1] - x)**2 + (self.yy[y0:y1, x0:x1] - y)**2
+        rows, cols = self._clip(int(x - radius), int(y - radius), int(x + radius) + 2, int(y + radius) + 2)
+        xx, yy = self._coordinates(rows, cols)
+        roi = self.map[rows, cols]
+        sqr_dist = (xx - x)**2 + (yy - y)**2
         roi[sqr_dist <= radius**2] = value
-        self.map[y0:y1, x0:x1] = roi
+        self.map[rows, cols] = roi
 
     def polygon(self, points, value=True) -> None:
         if len(points) == 0:
             return
-        x0 = max(int(points[:, 0].min()), 0)
-        y0 = max(int(points[:, 1].min()), 0)
-        x1 = min(int(points[:, 0].max()) + 2, self.map.shape[1] - 1)
-        y1 = min(int(points[:, 1].max()) + 2, self.map.shape[0] - 1)
-        xy = np.vstack((self.xx[y0:y1, x0:x1].flatten(), self.yy[y0:y1, x0:x1].flatten())).T
-        roi = self.map[y0:y1, x0:x1]
+        rows, cols = self._clip(int(points[:, 0].min()), int(points[:, 1].min()),
+                                int(points[:, 0].max()) + 2, int(points[:, 1].max()) + 2)
+        roi = self.map[rows, cols]
+        if roi.size == 0:
+            return
+        xx, yy = self._coordinates(rows, cols)
+        xy = np.vstack((xx.flatten(), yy.flatten())).T
         roi[Path(points).contains_points(xy).reshape(roi.shape)] = value
-        self.map[y0:y1, x0:x1] = roi
+        self.map[rows, cols] = roi
+
+    def _clip(self, x0: int, y0: int, x1: int, y1: int) -> tuple[slice, slice]:
+        """Clip a region given in map coordinates to the map and return it as slices of the rendered window."""
+        x0 = max(x0, 0) - self.col0
+        y0 = max(y0, 0) - self.row0
+        x1 = min(x1, self.size[1] - 1) - self.col0
+        y1 = min(y1, self.size[0] - 1) - self.row0
+        height, width = self.map.shape
+        return slice(min(max(y0, 0), height), min(max(y1, 0), height)), slice(min(max(x0, 0), width), min(max(x1, 0), width))
+
+    def _coordinates(self, rows: slice, cols: slice) -> tuple[np.ndarray, np.ndarray]:
+        """Map coordinates (x, y) of the pixels within the given slices of the rendered window."""
+        # NOTE: the coordinates are computed for the region of interest only to avoid a meshgrid of the whole map
+        x, y = np.meshgrid(range(self.col0 + cols.start, self.col0 + cols.stop),
+                           range(self.row0 + rows.start, self.row0 + rows.stop))
+        return x, y
@@ -1,25 +1,60 @@
+from __future__ import annotations
+
+import heapq
 import itertools
 import logging
+import math
 from dataclasses import dataclass
-from functools import lru_cache
+from typing import Literal
 
-import networkx as nx
 import numpy as np
-from scipy import ndimage, spatial
+from scipy import sparse, spatial
+from scipy.sparse import csgraph
 
 from ..driving import PathSegment
 from ..geometry import Point, Pose, PoseStep, Spline
 from ..helpers import angle
 from .area import Area
-from .delaunay_pose_group import DelaunayPoseGroup
 from .fast_spline import FastSpline
 from .grid import Grid
 from .obstacle import Obstacle
 from .obstacle_map import ObstacleMap
+from .roadmap_cache import RoadmapCache
+from .robot_renderer import RobotRenderer
+from .spline_batch import SplineBatch, linspaces
+from .tiled_obstacle_map import TiledObstacleMap
 
 GRID_RESOLUTION = 1.0
 MIN_MARGIN = 1.0
 
+PIXEL_SIZE = 0.1
+"""Pixel size of the obstacle map (in meters)."""
+
+NUM_LAYERS = 36
+"""Number of yaw layers of the obstacle map."""
+
+EDGE_BATCH_SIZE = 10_000
+"""Number of roadmap edges which are sampled and tested for collisions at once."""
+
+MAX_DENSE_CELLS = 50_000_000
+"""Grids with more cells (pixels times yaw layers) use a ``TiledObstacleMap`` to limit the memory usage."""
+
+CURVATURE_LIMIT = 10.0
+"""Splines with a larger curvature are considered unhealthy."""
+
+SearchMode = Literal['dijkstra', 'astar', 'multi']
+"""How to search the roadmap between the passages entering and exiting the grid.
+
+- "dijkstra": one Dijkstra search per entry, yielding the shortest path for each pair of entry and exit
+- "astar": one A* search per pair of entry and exit with the Euclidean distance as heuristic
+- "multi": a single A* search from all entries to all exits, yielding only the overall shortest path
+  (including the entry and exit segments), which saves smoothing the other paths
+
+"dijkstra" and "astar" smooth the path of each pair and return the shortest result.
+"multi" only smooths the path which is shortest *before* smoothing,
+so it is several times faster but its result can be slightly longer (by up to 6 % on the demo scenarios).
+"""
+
 TRY_SINGLE_PATH = True
 """Try to find a collision-free simple path between start and goal.
 
@@ -32,17 +67,37 @@ TRY_SINGLE_SHUNTING = True
 
 class DelaunayPlanner:
 
-    def __init__(self, robot_outline: list[tuple[float, float]]) -> None:
+    def __init__(self, robot_outline: list[tuple[float, float]], *,
+                 workers: int | None = None, search_mode: SearchMode = 'dijkstra',
+                 cache: RoadmapCache | None = None) -> None:
         self.robot_outline = robot_outline
+        self.workers = workers
+        """number of threads building the obstacle map (``None`` for one per CPU core)"""
+        self.search_mode = search_mode
+        """how to search the roadmap between the grid entries and exits"""
+        self.cache = cache
+        """on-disk cache of obstacle maps and roadmaps (``None`` to always build them)"""
         self.areas: list[Area] = []
         self.obstacles: list[Obstacle] = []
-        self.obstacle_map: ObstacleMap | None = None
+        self.obstacle_map: ObstacleMap | TiledObstacleMap | None = None
         self.tri_points: np.ndarray | None = None
         self.tri_mesh: spatial.Delaunay | None = None
-        self.pose_groups: list[DelaunayPoseGroup] | None = None
-        self.graph: nx.DiGraph | None = None
+        self.tri_tree: spatial.cKDTree | None = None
+        """k-d tree over ``tri_points`` to find the points nearest to start and goal"""
+        self.node_offsets: np.ndarray | None = None
+        """the roadmap nodes of Delaunay point i are ``node_offsets[i]`` to ``node_offsets[i + 1] - 1``"""
+        self.node_poses: np.ndarray | None = None
+        """pose (x, y, yaw) of each roadmap node, i.e. a Delaunay point facing one of its neighbors"""
+        self.graph: sparse.csr_matrix | None = None
+        """adjacency matrix of the roadmap with the length of each edge as weight"""
+        self.edge_backward: np.ndarray | None = None
+        """whether each edge of the roadmap (in the order of ``graph.data``) is driven backward"""
         self.log = logging.getLogger('rosys.delaunay_planner')
 
+    def precompute_kernels(self) -> None:
+        """Render the robot kernels of all yaw layers upfront so that the first obstacle map is built faster."""
+        RobotRenderer(self.robot_outline).render_kernels(PIXEL_SIZE, NUM_LAYERS)
+
     def update_map(self, areas: list[Area], obstacles: list[Obstacle], additional_points: list[Point],
                    deadline: float) -> None:
         if self.obstacle_map and \
@@ -50,10 +105,17 @@ class DelaunayPlanner:
                 self.obstacles == obstacles and \
                 all(self.obstacle_map.grid.contains(point, padding=1.0) for point in additional_points):
             return
+        if self.obstacle_map and \
+                self.areas == areas and \
+                all(self.obstacle_map.grid.contains(point, padding=1.0)
+                    for point in additional_points + [p for obstacle in obstacles for p in obstacle.outline]):
+            self.obstacle_map.update(obstacles, deadline)
+            self.obstacles = obstacles
+            self._create_graph()
+            return
         self.areas = areas
         self.obstacles = obstacles
-        self._create_obstacle_map(additional_points, deadline)
-        self._create_graph()
+        self._create_map_and_graph(additional_points, deadline)
 
     def grow_map(self, points: list[Point], deadline: float) -> None:
         if self.obstacle_map is not None and \
@@ -65,15 +127,61 @@ class DelaunayPlanner:
             points.append(Point(x=bbox[0]+bbox[2], y=bbox[1]))
             points.append(Point(x=bbox[0],         y=bbox[1]+bbox[3]))
             points.append(Point(x=bbox[0]+bbox[2], y=bbox[1]+bbox[3]))
-        self._create_obstacle_map(points, deadline)
-        self._create_graph()
+        self._create_map_and_graph(points, deadline)
 
-    def _create_obstacle_map(self, additional_points: list[Point], deadline: float) -> None:
+    def _create_map_and_graph(self, additional_points: list[Point], deadline: float) -> None:
         points = [p for obstacle in self.obstacles for p in obstacle.outline]
         points += [p for area in self.areas for p in area.outline]
         points += additional_points
-        grid = Grid.from_points(points, pixel_size=0.1, num_layers=36, padding=1.0)
-        self.obstacle_map = ObstacleMap.from_world(self.robot_outline, self.areas, self.obstacles, grid, deadline)
+        grid = Grid.from_points(points, pixel_size=PIXEL_SIZE, num_layers=NUM_LAYERS, padding=1.0)
+        if np.prod(grid.size) > MAX_DENSE_CELLS:
+            # NOTE: tiled maps are not cached because their tiles are only created on demand
+            self.obstacle_map = TiledObstacleMap.from_world(self.robot_outline, self.areas, self.obstacles, grid, deadline)
+            self._create_graph()
+            return
+        key = RoadmapCache.key(self.robot_outline, self.areas, self.obstacles, grid.size, grid.bbox,
+                               GRID_RESOLUTION, MIN_MARGIN)
+        arrays = self.cache.load(key) if self.cache else None
+        if arrays is not None:
+            self.log.info('loaded obstacle map and roadmap from cache')
+            self._load(grid, arrays)
+            return
+        self.obstacle_map = ObstacleMap.from_world(self.robot_outline, self.areas, self.obstacles, grid, deadline,
+                                                   workers=self.workers)
+        self._create_graph()
+        if self.cache:
+            self.cache.store(key, self._dump())
+
+    def _dump(self) -> dict[str, np.ndarray]:
+        assert isinstance(self.obstacle_map, ObstacleMap)
+        assert self.tri_points is not None and self.node_offsets is not None and self.node_poses is not None
+        assert self.graph is not None and self.edge_backward is not None
+        return {
+            'map': self.obstacle_map.map,
+            'stack': self.obstacle_map.stack,
+            'dist_stack': self.obstacle_map.dist_stack,
+            'tri_points': self.tri_points,
+            'node_offsets': self.node_offsets,
+            'node_poses': self.node_poses,
+            'graph_data': self.graph.data,
+            'graph_indices': self.graph.indices,
+            'graph_indptr': self.graph.indptr,
+            'edge_backward': self.edge_backward,
+        }
+
+    def _load(self, grid: Grid, arrays: dict[str, np.ndarray]) -> None:
+        self.obstacle_map = ObstacleMap(grid, arrays['map'], RobotRenderer(self.robot_outline),
+                                        areas=self.areas, obstacles=self.obstacles,
+                                        layers=(arrays['stack'], arrays['dist_stack']))
+        self.tri_points = arrays['tri_points']
+        self.tri_mesh = spatial.Delaunay(self.tri_points)
+        self.tri_tree = spatial.cKDTree(self.tri_points)
+        self.node_offsets = arrays['node_offsets']
+        self.node_poses = arrays['node_poses']
+        num_nodes = len(self.node_poses)
+        self.graph = sparse.csr_matrix((arrays['graph_data'], arrays['graph_indices'], arrays['graph_indptr']),
+                                       shape=(num_nodes, num_nodes))
+        self.edge_backward = arrays['edge_backward']
 
     def _create_graph(self) -> None:
         assert self.obstacle_map is not None
@@ -83,19 +191,14 @@ class DelaunayPlanner:
         X[::2] += GRID_RESOLUTION / 2
 
         rows, cols = self.obstacle_map.grid.to_grid(X.flatten(), Y.flatten())
-        distance = ndimage.distance_transform_edt(1 - self.obstacle_map.map) * self.obstacle_map.grid.pixel_size
-        D = ndimage.map_coordinates(distance, [[rows], [cols]], order=0).reshape(X.shape)
-        gradient_y, gradient_x = np.gradient(distance)
-        dD_dX = ndimage.map_coordinates(gradient_x, [[rows], [cols]], order=0).reshape(X.shape)
-        dD_dY = ndimage.map_coordinates(gradient_y, [[rows], [cols]], order=0).reshape(X.shape)
+        D, dD_dY, dD_dX = (values.reshape(X.shape) for values in self.obstacle_map.get_map_distance(rows, cols))
         dD = np.sqrt(dD_dX**2 + dD_dY**2)
         close = np.logical_and(0.0 < D, D < MIN_MARGIN)
         close = np.logical_and(close, dD > 0)
         X[close] += dD_dX[close] / dD[close] * (MIN_MARGIN - D[close])
         Y[close] += dD_dY[close] / dD[close] * (MIN_MARGIN - D[close])
 
-        keep = np.reshape([not all(self.obstacle_map.stack[int(np.round(row)), int(np.round(col)), :])
-                           for row, col in zip(rows, cols, strict=True)], X.shape)
+        keep = ~self.obstacle_map.blocks_all_yaws(rows, cols).reshape(X.shape)
         keep[1::2, :] = np.logical_and(keep[1::2, :], D[1::2, :] < 2)
         keep[::4, 1::2] = np.logical_and(keep[::4, 1::2], D[::4, 1::2] < 2)
         keep[2::4, ::2] = np.logical_and(keep[2::4, ::2], D[2::4, ::2] < 2)
@@ -103,39 +206,37 @@ class DelaunayPlanner:
         assert self.tri_points is not None  # NOTE: mypy doesn't seem to understand np.stack
 
         self.tri_mesh = spatial.Delaunay(self.tri_points)
-        self.pose_groups = [
-            DelaunayPoseGroup(
-                index=i,
-                point=Point(x=self.tri_points[i, 0], y=self.tri_points[i, 1]),
-                neighbor_indices=_tri_neighbors(self.tri_mesh, i).tolist(),
-                poses=[
-                    Pose(x=point[0], y=point[1], yaw=np.arctan2(neighbor[1] - point[1], neighbor[0] - point[0]))
-                    for neighbor in self.tri_points[_tri_neighbors(self.tri_mesh, i)]
-                ],
-            )
-            for i, point in enumerate(self.tri_points)
-        ]
-
-        self.graph = nx.DiGraph()
-        for g, group in enumerate(self.pose_groups):
-            for p in range(len(group.poses)):
-                self.graph.add_node((g, p))
-        for g, group in enumerate(self.pose_groups):
-            for p, (pose, g_) in enumerate(zip(group.poses, group.neighbor_indices, strict=True)):
-                for p_, pose_ in enumerate(self.pose_groups[g_].poses):
-                    if abs(angle(pose.yaw, pose_.yaw + np.pi)) < 0.01:
-                        continue  # NOTE: avoid 180-degree turns
-                    x, y, yaw = _generate_poses(self.obstacle_map.grid, pose, pose_)
-                    if not self.obstacle_map.test(x, y, yaw).any():
-                        length = np.sum(np.sqrt(np.diff(x)**2 + np.diff(y)**2))
-                        self.graph.add_edge((g, p), (g_, p_), backward=False, weight=length)
-                        if ((g_, p_), (g, p)) not in self.graph.edges:
-                            self.graph.add_edge((g_, p_), (g, p), backward=True, weight=1.2*length)
+        self.tri_tree = spatial.cKDTree(self.tri_points)
+        self.node_offsets, neighbors = self.tri_mesh.vertex_neighbor_vertices
+        points = np.repeat(self.tri_points, np.diff(self.node_offsets), axis=0)
+        directions = self.tri_points[neighbors] - points
+        self.node_poses = np.column_stack((points, np.arctan2(directions[:, 1], directions[:, 0])))
+
+        # NOTE: each node is connected to all nodes of the neighbor it is facing
+        num_targets = np.diff(self.node_offsets)[neighbors]
+        sources = np.repeat(np.arange(len(neighbors)), num_targets)
+        targets = np.repeat(self.node_offsets[neighbors] - np.cumsum(num_targets) + num_targets, num_targets) + \
+            np.arange(len(sources))
+        keep = np.abs(angle(self.node_poses[sources, 2], self.node_poses[targets, 2] + np.pi)) >= 0.01  # NOTE: avoid 180-degree turns
+        sources, targets = sources[keep], targets[keep]
+
+        lengths = np.empty(len(sources))
+        collisions = np.empty(len(sources), dtype=bool)
+        for start in range(0, len(sources), EDGE_BATCH_SIZE):
+            batch = slice(start, start + EDGE_BATCH_SIZE)
+            x, y, yaw, offsets = _generate_edge_poses(self.obstacle_map.grid,
+                                                      self.node_poses[sources[batch]], self.node_poses[targets[batch]])
+            collisions[batch] = self.obstacle_map.test_batch(x, y, yaw, offsets)
+            lengths[batch] = _sum_segments(np.sqrt(np.diff(x)**2 + np.diff(y)**2), offsets[:-1], offsets[1:] - 1)
+        self.graph, self.edge_backward = _create_roadmap(len(neighbors), sources[~collisions], targets[~collisions],
+                                                         lengths[~collisions])
 
     def search(self, start: Pose, goal: Pose) -> list[PathSegment]:
         assert self.obstacle_map is not None
+        assert self.tri_tree is not None
+        assert self.node_offsets is not None
+        assert self.node_poses is not None
         assert self.graph is not None
-        assert self.pose_groups is not None
         paths: list[list[PathSegment]] = []
 
         if TRY_SINGLE_PATH:
@@ -168,126 +269,242 @@ class DelaunayPlanner:
             self.log.info('found single shunt to reach goal')
             return min(paths, key=lambda path: path[0].spline.estimated_length() + path[1].spline.estimated_length())
 
-        grid_entries = _find_grid_passages(self.obstacle_map, self.pose_groups, start, True)
-        grid_exits = _find_grid_passages(self.obstacle_map, self.pose_groups, goal, False)
+        grid_entries = _find_grid_passages(self.obstacle_map, self.tri_tree, self.node_offsets, self.node_poses,
+                                           start, entering=True)
+        grid_exits = _find_grid_passages(self.obstacle_map, self.tri_tree, self.node_offsets, self.node_poses,
+                                         goal, entering=False)
         if not grid_entries:
             raise RuntimeError('could not find start segment')
         if not grid_exits:
             raise RuntimeError('could not find exit segment')
 
-        for enter, exit_ in itertools.product(grid_entries, grid_exits):
-            p, g = enter.coordinate
-            p_, g_ = exit_.coordinate
+        for enter, exit_, nodes in self._search_roadmap(grid_entries, grid_exits):
             path: list[PathSegment] = [enter.segment]
-            last_g, last_p = g, p
-            try:
-                for next_g, next_p in nx.shortest_path(self.graph, (g, p), (g_, p_), weight='weight')[1:]:
-                    last_pose = self.pose_groups[last_g].poses[last_p]
-                    next_pose = self.pose_groups[next_g].poses[next_p]
-                    backward = self.graph.edges[((last_g, last_p), (next_g, next_p))]['backward']
-                    spline = Spline.from_poses(last_pose, next_pose, backward=backward)
-                    path.append(PathSegment(spline=spline, backward=backward))
-                    last_g, last_p = next_g, next_p
-            except nx.exception.NetworkXNoPath:
-                continue
+            for node, next_node in itertools.pairwise(nodes):
+                backward = self._is_backward(node, next_node)
+                spline = Spline.from_poses(self._node_pose(node), self._node_pose(next_node), backward=backward)
+                path.append(PathSegment(spline=spline, backward=backward))
             path.append(exit_.segment)
 
-            while True:
-                shortcuts: list[PathSegment] = []
-                for step_size in [1, 2]:
-                    for s in range(len(path) - step_size):
-                        new_start = Pose(
-                            x=path[s].spline.start.x,
-                            y=path[s].spline.start.y,
-                            yaw=path[s].spline.yaw(0) + (np.pi if path[s].backward else 0),
-                        )
-                        new_end = Pose(
-                            x=path[s+step_size].spline.end.x,
-                            y=path[s+step_size].spline.end.y,
-                            yaw=path[s+step_size].spline.yaw(1) + (np.pi if path[s+step_size].backward else 0),
-                        )
-                        if abs(angle(new_start.yaw, new_end.yaw + np.pi)) < 0.01:
-                            continue
-                        for new_backward in [False, True]:
-                            new_spline = Spline.from_poses(new_start, new_end, backward=new_backward)
-                            if not _is_healthy(new_spline):
-                                continue
-                            if self.obstacle_map.test_spline(new_spline, new_backward):
-                                continue
-                            combined_length = path[s].spline.estimated_length() + \
-                                path[s+step_size].spline.estimated_length()
-                            if .9 * new_spline.estimated_length() > combined_length:
-                                continue
-                            shortcuts.append(PathSegment(spline=new_spline, backward=new_backward))
-                        if shortcuts:
-                            lengths = [segment.spline.estimated_length() for segment in shortcuts]
-                            path[s] = shortcuts[np.argmin(lengths)]
-                            for _ in range(step_size):
-                                del path[s+1]
-                            break  # restart while loop
-                    if shortcuts:
-                        break  # restart while loop
-                if not shortcuts:
-                    break  # exit while loop
-            paths.append(path)
+            paths.append(self._smooth(path))
         if not paths:
             raise RuntimeError('could not find path')
         return min(paths, key=len)
 
+    def _smooth(self, path: list[PathSegment]) -> list[PathSegment]:
+        """Replace two or three consecutive segments by a single spline as long as it is healthy, collision-free and not longer.
 
-def _tri_neighbors(tri_mesh: spatial.Delaunay, vertex_index: int) -> np.ndarray:
-    return tri_mesh.vertex_neighbor_vertices[1][tri_mesh.vertex_neighbor_vertices[0][vertex_index]:
-                                                tri_mesh.vertex_neighbor_vertices[0][vertex_index + 1]]
-
-
-@lru_cache(maxsize=1000)
-def _t_array(n: int) -> np.ndarray:
-    return np.linspace(0, 1, n)
-
-
-@lru_cache(maxsize=10000)
-def _generate_pose_offsets(grid: Grid, dx: float, dy: float, yaw: float, yaw_: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-    spline = FastSpline(0, 0, yaw, dx, dy, yaw_, False)
-    row0, col0, layer0 = grid.to_3d_grid(0, 0, yaw)
+        All shortcuts of a pass are evaluated at once.
+        Then a non-overlapping set of them is applied, preferring shortcuts over two segments, earlier and shorter ones.
+        """
+        assert self.obstacle_map is not None
+        while len(path) > 1:
+            lengths = np.array([segment.spline.estimated_length() for segment in path])
+            poses = np.array([[
+                (segment.spline.start.x, segment.spline.start.y, segment.spline.yaw(0) + (np.pi if segment.backward else 0)),
+                (segment.spline.end.x, segment.spline.end.y, segment.spline.yaw(1) + (np.pi if segment.backward else 0)),
+            ] for segment in path])
+            first = np.concatenate([np.arange(len(path) - step_size) for step_size in [1, 2] if step_size < len(path)])
+            last = first + np.concatenate([np.full(len(path) - step_size, step_size)
+                                           for step_size in [1, 2] if step_size < len(path)])
+            keep = np.abs(angle(poses[first, 0, 2], poses[last, 1, 2] + np.pi)) >= 0.01  # NOTE: avoid 180-degree turns
+            first, last = np.repeat(first[keep], 2), np.repeat(last[keep], 2)
+            if len(first) == 0:
+                break
+            backward = np.tile([False, True], len(first) // 2)
+            shortcuts = SplineBatch(poses[first, 0], poses[last, 1], backward)
+            shortcut_lengths = shortcuts.estimated_length()
+            valid = (np.abs(shortcuts.max_curvature()) < CURVATURE_LIMIT) & \
+                (0.9 * shortcut_lengths <= lengths[first] + lengths[last])
+            candidates = np.flatnonzero(valid)
+            if len(candidates):
+                valid[candidates] = ~self.obstacle_map.test_batch(*shortcuts[candidates].poses(self.obstacle_map.grid))
+
+            used = np.zeros(len(path), dtype=bool)
+            replacements: dict[int, tuple[int, PathSegment]] = {}
+            for i in np.lexsort((shortcut_lengths, first, last - first)):
+                if not valid[i] or used[first[i]:last[i] + 1].any():
+                    continue
+                used[first[i]:last[i] + 1] = True
+                replacements[first[i]] = (last[i], PathSegment(spline=shortcuts.spline(i), backward=bool(backward[i])))
+            if not replacements:
+                break
+            smoothed_path: list[PathSegment] = []
+            s = 0
+            while s < len(path):
+                if s in replacements:
+                    s, segment = replacements[s]
+                    smoothed_path.append(segment)
+                else:
+                    smoothed_path.append(path[s])
+                s += 1
+            path = smoothed_path
+        return path
+
+    def _search_roadmap(self, entries: list[Passage], exits: list[Passage]) -> list[tuple[Passage, Passage, list[int]]]:
+        """Find the shortest roadmap paths (as lists of nodes) between grid entries and exits depending on the search mode."""
+        assert self.graph is not None
+        assert self.node_poses is not None
+        if self.search_mode == 'multi':
+            sources = {enter.node: enter.segment.spline.estimated_length() for enter in reversed(entries)}
+            targets = {exit_.node: exit_.segment.spline.estimated_length() for exit_ in reversed(exits)}
+            nodes = _astar(self.graph, self.node_poses, sources, targets)
+            if nodes is None:
+                return []
+            enter = next(enter for enter in entries if enter.node == nodes[0])
+            exit_ = next(exit_ for exit_ in exits if exit_.node == nodes[-1])
+            return [(enter, exit_, nodes)]
+        if self.search_mode == 'astar':
+            results = []
+            for enter, exit_ in itertools.product(entries, exits):
+                nodes = _astar(self.graph, self.node_poses, {enter.node: 0.0}, {exit_.node: 0.0})
+                if nodes is not None:
+                    results.append((enter, exit_, nodes))
+            return results
+        costs, predecessors = csgraph.dijkstra(self.graph, indices=[enter.node for enter in entries],
+                                               return_predecessors=True)
+        results = []
+        for (e, enter), exit_ in itertools.product(enumerate(entries), exits):
+            if np.isinf(costs[e, exit_.node]):
+                continue
+            nodes = [exit_.node]
+            while nodes[-1] != enter.node:
+                nodes.append(predecessors[e, nodes[-1]])
+            results.append((enter, exit_, nodes[::-1]))
+        return results
+
+    def _node_pose(self, node: int) -> Pose:
+        assert self.node_poses is not None
+        x, y, yaw = self.node_poses[node]
+        return Pose(x=x, y=y, yaw=yaw)
+
+    def _is_backward(self, node: int, next_node: int) -> bool:
+        assert self.graph is not None and self.edge_backward is not None
+        start, end = self.graph.indptr[node], self.graph.indptr[node + 1]
+        return bool(self.edge_backward[start + np.searchsorted(self.graph.indices[start:end], next_node)])
+
+
+def _generate_edge_poses(grid: Grid, starts: np.ndarray, ends: np.ndarray) \
+        -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Sample the splines between the given start and end poses (x, y, yaw) with about one pose per grid cell and layer.
+
+    The poses of all splines are concatenated; the ones of spline i are ``offsets[i]`` to ``offsets[i + 1] - 1``.
+    """
+    dx, dy, yaw_ = ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1], ends[:, 2]
+    row0, col0, layer0 = grid.to_3d_grid(0, 0, starts[:, 2])
     row1, col1, layer1 = grid.to_3d_grid(dx, dy, yaw_)
-    num_rows = int(abs(row1 - row0))
-    num_cols = int(abs(col1 - col0))
-    num_layers = int(abs(layer1 - layer0))
-    t = _t_array(max(num_rows, num_cols, num_layers))
-    return (spline.x(t), spline.y(t), spline.yaw(t) + [0, np.pi][spline.backward])
-
-
-def _generate_poses(grid: Grid, pose: Pose, pose_: Pose) -> tuple:
-    dx, dy, yaw = _generate_pose_offsets(grid, pose_.x - pose.x, pose_.y - pose.y, pose.yaw, pose_.yaw)
-    return pose.x + dx, pose.y + dy, yaw
-
-
-def _is_healthy(spline: Spline, curvature_limit: float = 10.0) -> bool:
+    counts = np.maximum.reduce([np.abs(row1 - row0).astype(int),
+                                np.abs(col1 - col0).astype(int),
+                                np.abs(layer1 - layer0).astype(int)])
+    t, offsets = linspaces(counts)
+    spline = FastSpline(0, 0, np.repeat(starts[:, 2], counts), np.repeat(dx, counts), np.repeat(dy, counts),
+                        np.repeat(yaw_, counts), False)
+    return np.repeat(starts[:, 0], counts) + spline.x(t), np.repeat(starts[:, 1], counts) + spline.y(t), spline.yaw(t), offsets
+
+
+def _sum_segments(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Sum ``values[starts[i]:ends[i]]`` for each i."""
+    if len(starts) == 0:
+        return np.zeros(0)
+    non_empty = ends > starts
+    sums = np.add.reduceat(np.append(values, 0), np.column_stack((starts, ends)).ravel())[::2]
+    return np.where(non_empty, sums, 0.0)
+
+
+def _create_roadmap(num_nodes: int, sources: np.ndarray, targets: np.ndarray, lengths: np.ndarray) \
+        -> tuple[sparse.csr_matrix, np.ndarray]:
+    """Create the adjacency matrix of the roadmap from its forward edges.
+
+    Each forward edge is complemented by a backward edge in the opposite direction with 20% more weight,
+    unless there is a forward edge in this direction as well.
+    Returns the adjacency matrix and whether each of its entries (in the order of ``data``) is a backward edge.
+    """
+    reverse = ~np.isin(targets * num_nodes + sources, sources * num_nodes + targets)
+    rows = np.concatenate((sources, targets[reverse]))
+    cols = np.concatenate((targets, sources[reverse]))
+    weights = np.concatenate((lengths, 1.2 * lengths[reverse]))
+    backward = np.concatenate((np.zeros(len(sources), dtype=bool), np.ones(np.count_nonzero(reverse), dtype=bool)))
+    order = np.lexsort((cols, rows))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=num_nodes))))
+    return sparse.csr_matrix((weights[order], cols[order], indptr), shape=(num_nodes, num_nodes)), backward[order]
+
+
+def _astar(graph: sparse.csr_matrix,
+           node_poses: np.ndarray,
+           sources: dict[int, float],
+           targets: dict[int, float]) -> list[int] | None:
+    """Find the cheapest path from any source to any target node with A*.
+
+    Sources and targets are given with an additional cost for starting or ending there.
+    The heuristic is the Euclidean distance to the closest target (plus its cost),
+    which is admissible because each edge is at least as long as the distance between its nodes.
+    Returns the nodes of the path or ``None`` if no target can be reached.
+    """
+    # NOTE: the search loop works on Python scalars because NumPy's per-element overhead would dominate
+    target_list = [(float(node_poses[node, 0]), float(node_poses[node, 1]), cost) for node, cost in targets.items()]
+
+    def heuristic(node: int) -> float:
+        x, y = node_poses[node, :2].tolist()
+        return min(math.hypot(target_x - x, target_y - y) + cost for target_x, target_y, cost in target_list)
+
+    goal = -1  # NOTE: virtual node which is reached from each target
+    costs: dict[int, float] = dict(sources)
+    predecessors: dict[int, int] = {}
+    queue = [(cost + heuristic(node), cost, node) for node, cost in sources.items()]
+    heapq.heapify(queue)
+    closed: set[int] = set()
+    while queue:
+        _, cost, node = heapq.heappop(queue)
+        if node == goal:
+            nodes = [predecessors[goal]]
+            while nodes[-1] in predecessors:
+                nodes.append(predecessors[nodes[-1]])
+            return nodes[::-1]
+        if node in closed:
+            continue
+        closed.add(node)
+        if node in targets and cost + targets[node] < costs.get(goal, np.inf):
+            costs[goal] = cost + targets[node]
+            predecessors[goal] = node
+            heapq.heappush(queue, (costs[goal], costs[goal], goal))
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        for neighbor, weight in zip(graph.indices[start:end].tolist(), graph.data[start:end].tolist(), strict=True):
+            neighbor_cost = cost + weight
+            if neighbor not in closed and neighbor_cost < costs.get(neighbor, np.inf):
+                costs[neighbor] = neighbor_cost
+                predecessors[neighbor] = node
+                heapq.heappush(queue, (neighbor_cost + heuristic(neighbor), neighbor_cost, neighbor))
+    return None
+
+
+def _is_healthy(spline: Spline, curvature_limit: float = CURVATURE_LIMIT) -> bool:
     return np.abs(spline.max_curvature()) < curvature_limit
 
 
 @dataclass(slots=True, kw_only=True)
 class Passage:
     segment: PathSegment
-    coordinate: tuple[int, int]
+    node: int
 
 
-def _find_grid_passages(obstacle_map: ObstacleMap,
-                        pose_groups: list[DelaunayPoseGroup],
-                        pose: Pose,
+def _find_grid_passages(obstacle_map: ObstacleMap | TiledObstacleMap,
+                        tri_tree: spatial.cKDTree,
+                        node_offsets: np.ndarray,
+                        node_poses: np.ndarray,
+                        pose: Pose, *,
                         entering: bool,
                         max_num_groups: int = 10,
                         max_num_results: int = 3) -> list[Passage]:
-    group_distances = [g.point.distance(pose) for g in pose_groups]
-    group_indices = np.argsort(group_distances)
-    results: list[Passage] = []
-    for g, group in zip(group_indices, np.array(pose_groups)[group_indices][:max_num_groups], strict=False):
-        for p, group_pose in enumerate(group.poses):
-            for backward in [False, True]:
-                poses = (pose, group_pose) if entering else (group_pose, pose)
-                spline = Spline.from_poses(*poses, backward=backward)
-                if _is_healthy(spline) and not obstacle_map.test_spline(spline, backward):
-                    passage = Passage(segment=PathSegment(spline=spline, backward=backward), coordinate=(p, g))
-                    results.append(passage)
-    results.sort(key=lambda passage: passage.segment.spline.estimated_length())
-    return results[:max_num_results]
+    _, groups = tri_tree.query([pose.x, pose.y], k=min(max_num_groups, tri_tree.n))
+    nodes = np.concatenate([np.arange(node_offsets[g], node_offsets[g + 1]) for g in np.atleast_1d(groups)])
+    nodes = np.repeat(nodes, 2)
+    backward = np.tile([False, True], len(nodes) // 2)
+    poses = np.broadcast_to([pose.x, pose.y, pose.yaw], (len(nodes), 3))
+    splines = SplineBatch(poses, node_poses[nodes], backward) if entering else \
+        SplineBatch(node_poses[nodes], poses, backward)
+    candidates = np.flatnonzero(np.abs(splines.max_curvature()) < CURVATURE_LIMIT)
+    if len(candidates):
+        candidates = candidates[~obstacle_map.test_batch(*splines[candidates].poses(obstacle_map.grid))]
+    candidates = candidates[np.argsort(splines[candidates].estimated_length(), kind='stable')]
+    return [Passage(segment=PathSegment(spline=splines.spline(i), backward=bool(backward[i])), node=int(nodes[i]))
+            for i in candidates[:max_num_results]]
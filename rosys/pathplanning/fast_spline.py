@@ -9,16 +9,17 @@ from ..geometry import Pose
 
 @dataclass
 class FastSpline:
-    start_x: float
-    start_y: float
-    start_yaw: float
-    end_x: float
-    end_y: float
-    end_yaw: float
+    """A spline between two poses; the coordinates may also be arrays of equal length to evaluate many splines at once."""
+    start_x: float | np.ndarray
+    start_y: float | np.ndarray
+    start_yaw: float | np.ndarray
+    end_x: float | np.ndarray
+    end_y: float | np.ndarray
+    end_yaw: float | np.ndarray
     backward: bool
 
     def __post_init__(self) -> None:
-        distance = -0.5 if self.backward else 0.5
+        distance: float | np.ndarray = -0.5 if self.backward else 0.5
         distance *= np.sqrt((self.end_x - self.start_x)**2 + (self.end_y - self.start_y)**2)
         self.a = self.start_x
         self.e = self.start_y
@@ -33,12 +33,32 @@ class Grid:
         v_size = self.bbox[3] / self.size[0]
         return (h_size + v_size) / 2.0
 
-    def to_grid(self, x: float, y: float) -> tuple[float, float]:
+    @overload
+    def to_grid(self, x: float, y: float) -> tuple[float, float]: ...
+
+    @overload
+    def to_grid(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]: ...
+
+    @overload
+    def to_grid(self, x: float | np.ndarray, y: float | np.ndarray) -> tuple[float | np.ndarray, float | np.ndarray]: ...
+
+    def to_grid(self, x: float | np.ndarray, y: float | np.ndarray) -> tuple[float | np.ndarray, float | np.ndarray]:
         row = (y - self.bbox[1]) / self.bbox[3] * self.size[0] - 0.5
         col = (x - self.bbox[0]) / self.bbox[2] * self.size[1] - 0.5
         return row, col
 
-    def to_3d_grid(self, x: float, y: float, yaw: float) -> tuple[float, float, float]:
+    @overload
+    def to_3d_grid(self, x: float, y: float, yaw: float) -> tuple[float, float, float]: ...
+
+    @overload
+    def to_3d_grid(self, x: np.ndarray, y: np.ndarray, yaw: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]: ...
+
+    @overload
+    def to_3d_grid(self, x: float | np.ndarray, y: float | np.ndarray, yaw: float | np.ndarray) \
+        -> tuple[float | np.ndarray, float | np.ndarray, float | np.ndarray]: ...
+
+    def to_3d_grid(self, x: float | np.ndarray, y: float | np.ndarray, yaw: float | np.ndarray) \
+            -> tuple[float | np.ndarray, float | np.ndarray, float | np.ndarray]:
         row = (y - self.bbox[1]) / self.bbox[3] * self.size[0] - 0.5
         col = (x - self.bbox[0]) / self.bbox[2] * self.size[1] - 0.5
         layer = (yaw / 2.0 / np.pi * self.size[2]) % self.size[2]
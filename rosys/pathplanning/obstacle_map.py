@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import ClassVar, overload
 
 import cv2
@@ -13,26 +16,76 @@ from .grid import Grid
 from .obstacle import Obstacle
 from .robot_renderer import RobotRenderer
 
+DISTANCE_RESOLUTION = 0.01
+"""Distances are stored as unsigned 16 bit multiples of this value (in meters).
+
+This results in a precision of 5 mm for distances up to 655 m; larger distances saturate.
+"""
+
+NUM_WORKERS = os.cpu_count() or 1
+"""Default number of threads building the yaw layers of an obstacle map (cv2 and scipy release the GIL)."""
+
 
 class ObstacleMap:
 
-    def __init__(self, grid, map_, robot_renderer, deadline=None) -> None:
+    def __init__(self, grid, map_, robot_renderer, deadline=None, *,
+                 areas: list[Area] | None = None, obstacles: list[Obstacle] | None = None,
+                 workers: int | None = None, layers: tuple[np.ndarray, np.ndarray] | None = None) -> None:
+        """Build the stack and distances of all yaw layers.
+
+        The layers are independent of each other and are built by ``workers`` threads in parallel (default: ``NUM_WORKERS``).
+        If the deadline is exceeded, all workers stop after their current layer and a ``TimeoutError`` is raised.
+        If ``layers`` (stack and distances) are given, they are used as they are (e.g. when loaded from a cache).
+        """
         self.grid = grid
         self.map = map_
-        self.stack = np.zeros(grid.size, dtype=bool)
-        self.dist_stack = np.zeros(self.stack.shape)
-        for layer in range(grid.size[2]):
-            _, _, yaw = grid.from_3d_grid(0, 0, layer)
-            kernel = robot_renderer.render(grid.pixel_size, yaw).astype(np.uint8)
-            self.stack[:, :, layer] = cv2.dilate(self.map.astype(np.uint8), kernel)
-            self.dist_stack[:, :, layer] = \
-                ndimage.distance_transform_edt(~self.stack[:, :, layer]) * grid.pixel_size
+        self.areas = areas
+        """areas the map has been rendered from (``None`` if it has not been created from the world)"""
+        self.obstacles = obstacles
+        """obstacles the map has been rendered from (``None`` if it has not been created from the world)"""
+        height, width, num_layers = grid.size
+        self.kernels: list[np.ndarray] = list(robot_renderer.render_kernels(grid.pixel_size, num_layers))
+        """rendered robot outline for each yaw layer"""
+        if layers is not None:
+            self.stack, self.dist_stack = layers
+            return
+        # NOTE: layers come first so that each yaw layer is contiguous in memory;
+        # an additional last layer repeats the first one so that lookups can wrap around
+        self.stack = np.empty((num_layers + 1, height, width), dtype=bool)
+        """whether the robot collides with an obstacle (layer, row, column)"""
+        self.dist_stack = np.empty((num_layers + 1, height, width), dtype=np.uint16)
+        """distance of the robot to the nearest obstacle in multiples of ``DISTANCE_RESOLUTION`` (layer, row, column)"""
+        map_uint8 = self.map.astype(np.uint8)
+        buffers = threading.local()
+        cancelled = threading.Event()
+
+        def build_layer(layer: int) -> None:
+            if cancelled.is_set():
+                return
+            if not hasattr(buffers, 'distance'):
+                buffers.distance = np.empty((height, width))
+            self.stack[layer] = cv2.dilate(map_uint8, self.kernels[layer])
+            ndimage.distance_transform_edt(~self.stack[layer], distances=buffers.distance)
+            self.dist_stack[layer] = quantize_distance(buffers.distance * grid.pixel_size)
             if deadline and time.time() > deadline:
+                cancelled.set()
                 raise TimeoutError('obstacle map creation took too long')
 
-        # NOTE: when yaw wraps around, map_coordinates should wrap around on axis 2
-        self.stack = np.dstack((self.stack, self.stack[:, :, :1]))
-        self.dist_stack = np.dstack((self.dist_stack, self.dist_stack[:, :, :1]))
+        workers = NUM_WORKERS if workers is None else workers
+        if workers <= 1:
+            for layer in range(num_layers):
+                build_layer(layer)
+        else:
+            with ThreadPoolExecutor(workers, thread_name_prefix='rosys.obstacle_map') as executor:
+                futures = [executor.submit(build_layer, layer) for layer in range(num_layers)]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    cancelled.set()
+                    raise
+        self.stack[num_layers] = self.stack[0]
+        self.dist_stack[num_layers] = self.dist_stack[0]
 
     @staticmethod
     def from_list(grid, obstacles, robot_renderer) -> ObstacleMap:
@@ -49,55 +102,222 @@ class ObstacleMap:
                    areas: list[Area],
                    obstacles: list[Obstacle],
                    grid: Grid,
-                   deadline: float | None = None) -> ObstacleMap:
-        robot_renderer = RobotRenderer(robot_outline)
-        has_areas = any(len(a.outline) > 2 for a in areas)
-        binary_renderer = BinaryRenderer(grid.size[:2], fill_value=has_areas)
-        for area in areas:
-            binary_renderer.polygon(np.array([grid.to_grid(p.x, p.y)[::-1] for p in area.outline]), False)
-            if deadline and time.time() > deadline:
-                raise TimeoutError('obstacle map creation took too long')
-        for obstacle in obstacles:
-            binary_renderer.polygon(np.array([grid.to_grid(p.x, p.y)[::-1] for p in obstacle.outline]))
+                   deadline: float | None = None, *,
+                   workers: int | None = None) -> ObstacleMap:
+        map_ = _render(grid, areas, obstacles, deadline)
+        return ObstacleMap(grid, map_, RobotRenderer(robot_outline), deadline,
+                           areas=areas, obstacles=obstacles, workers=workers)
+
+    def update(self, obstacles: list[Obstacle], deadline: float | None = None, *, padding: float | None = None) -> None:
+        """Update the map after obstacles have been added, removed or changed without rebuilding it.
+
+        Only the bounding box of the changed obstacles is rendered again.
+        The stack is dilated again within the robot radius around it
+        and distances are recomputed within another ``padding`` around that (default: robot radius).
+        Distances up to ``padding`` stay exact for added obstacles.
+        For removed obstacles distances may be underestimated (but never overestimated)
+        if the nearest remaining obstacle is outside of the recomputed region.
+        The map is left unchanged if the deadline is exceeded.
+        """
+        if self.areas is None or self.obstacles is None:
+            raise RuntimeError('only obstacle maps created from the world can be updated')
+        changed = [o for o in obstacles if o not in self.obstacles] + [o for o in self.obstacles if o not in obstacles]
+        points = np.array([self.grid.to_grid(p.x, p.y) for obstacle in changed for p in obstacle.outline]).reshape(-1, 2)
+        height, width, num_layers = self.grid.size
+        if len(points):
+            rows = slice(max(int(points[:, 0].min()), 0), min(int(points[:, 0].max()) + 2, height))
+            cols = slice(max(int(points[:, 1].min()), 0), min(int(points[:, 1].max()) + 2, width))
+        if not len(points) or rows.start >= rows.stop or cols.start >= cols.stop:
+            self.obstacles = obstacles
+            return
+
+        radius = self.kernels[0].shape[0] // 2
+        pad = radius if padding is None else int(np.ceil(padding / self.grid.pixel_size))
+        map_window = _render(self.grid, self.areas, obstacles, deadline, window=(rows, cols))
+        stack_rows, stack_cols = _pad(rows, height, radius), _pad(cols, width, radius)
+        source_rows, source_cols = _pad(stack_rows, height, radius), _pad(stack_cols, width, radius)
+        dist_rows, dist_cols = _pad(stack_rows, height, pad), _pad(stack_cols, width, pad)
+        inner = (slice(stack_rows.start - dist_rows.start, stack_rows.stop - dist_rows.start),
+                 slice(stack_cols.start - dist_cols.start, stack_cols.stop - dist_cols.start))
+        source = self.map[source_rows, source_cols].astype(np.uint8)
+        source[rows.start - source_rows.start:rows.stop - source_rows.start,
+               cols.start - source_cols.start:cols.stop - source_cols.start] = map_window
+        border_distance = _border_distance(dist_rows, dist_cols, height, width) * self.grid.pixel_size
+        stacks: list[np.ndarray] = []
+        dists: list[np.ndarray] = []
+        for layer in range(num_layers):
+            dilated = cv2.dilate(source, self.kernels[layer])
+            stack = self.stack[layer, dist_rows, dist_cols].copy()
+            stack[inner] = dilated[stack_rows.start - source_rows.start:stack_rows.stop - source_rows.start,
+                                   stack_cols.start - source_cols.start:stack_cols.stop - source_cols.start]
+            dist = ndimage.distance_transform_edt(~stack) * self.grid.pixel_size if stack.any() else np.full(stack.shape, np.inf)
+            # NOTE: beyond the distance to the window border the nearest obstacle might be outside of the window
+            uncertain = dist > border_distance
+            old_dist = self.dist_stack[layer, dist_rows, dist_cols] * DISTANCE_RESOLUTION
+            dist[uncertain] = np.minimum(dist, np.maximum(old_dist, border_distance))[uncertain]
+            stacks.append(stack)
+            dists.append(quantize_distance(dist))
             if deadline and time.time() > deadline:
-                raise TimeoutError('obstacle map creation took too long')
-        return ObstacleMap(grid, binary_renderer.map, robot_renderer, deadline)
+                raise TimeoutError('obstacle map update took too long')
+
+        self.map[rows, cols] = map_window
+        self.obstacles = obstacles
+        self.stack[:num_layers, dist_rows, dist_cols] = stacks
+        self.dist_stack[:num_layers, dist_rows, dist_cols] = dists
+        self.stack[num_layers, dist_rows, dist_cols] = self.stack[0, dist_rows, dist_cols]
+        self.dist_stack[num_layers, dist_rows, dist_cols] = self.dist_stack[0, dist_rows, dist_cols]
 
     def test(self, x, y, yaw):
-        row, col, layer = self.grid.to_3d_grid(x, y, yaw)
-        return ndimage.map_coordinates(self.stack, [[row], [col], [layer]], order=0)
+        layers, rows, cols, valid = self._lookup(x, y, yaw)
+        result = np.zeros(valid.shape, dtype=bool)
+        result[valid] = self.stack[layers[valid], rows[valid], cols[valid]]
+        return result.reshape((1, *np.shape(x)))
+
+    def test_batch(self, x, y, yaw, offsets) -> np.ndarray:
+        """Test many items (e.g. splines) which consist of a varying number of poses at once.
+
+        :param x, y, yaw: the concatenated poses of all items
+        :param offsets: start index of each item's poses followed by the total number of poses
+        :return: whether each item collides with an obstacle
+        """
+        return reduce_any(self.test(x, y, yaw).ravel(), offsets)
 
     t_lookup: ClassVar[list[np.ndarray]] = [np.linspace(0, 1, i) for i in range(360)]
 
     def _create_poses(self, spline, backward) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        @overload
-        def pose(t: float) -> tuple[float, float, float]: ...
-
-        @overload
-        def pose(t: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]: ...
-
-        def pose(t: float | np.ndarray) -> tuple[float | np.ndarray, float | np.ndarray, float | np.ndarray]:
-            return (
-                spline.x(t),
-                spline.y(t),
-                spline.yaw(t) + [0, np.pi][backward],
-            )
-
-        row0, col0, layer0 = self.grid.to_3d_grid(*pose(0.0))
-        row1, col1, layer1 = self.grid.to_3d_grid(*pose(1.0))
-        num_rows = int(abs(row1 - row0))
-        num_cols = int(abs(col1 - col0))
-        num_layers = int(abs(layer1 - layer0))
-        n = max(num_rows, num_cols, num_layers)
-        t = ObstacleMap.t_lookup[n] if n < len(ObstacleMap.t_lookup) else np.linspace(0, 1, n)
-        return pose(t)
+        return create_spline_poses(self.grid, spline, backward)
 
     def test_spline(self, spline, backward=False) -> bool:
         return self.test(*self._create_poses(spline, backward)).any()
 
+    def test_splines(self, splines, backward=False) -> np.ndarray:
+        """Test many splines at once and return whether each of them collides with an obstacle.
+
+        :param backward: whether the splines are driven backward (a single value or one per spline)
+        """
+        return self.test_batch(*concatenate_spline_poses(self.grid, splines, backward))
+
     def get_distance(self, x, y, yaw) -> np.ndarray:
-        row, col, layer = self.grid.to_3d_grid(x, y, yaw)
-        return ndimage.map_coordinates(self.dist_stack, [[row], [col], [layer]], order=0)
+        layers, rows, cols, valid = self._lookup(x, y, yaw)
+        result = np.zeros(valid.shape)
+        result[valid] = self.dist_stack[layers[valid], rows[valid], cols[valid]] * DISTANCE_RESOLUTION
+        return result.reshape((1, *np.shape(x)))
 
     def get_minimum_spline_distance(self, spline, backward=False) -> float:
         return self.get_distance(*self._create_poses(spline, backward)).min()
+
+    def blocks_all_yaws(self, rows, cols) -> np.ndarray:
+        """Whether the robot collides with an obstacle at the given pixels for every yaw angle."""
+        rows = np.round(rows).astype(int)
+        cols = np.round(cols).astype(int)
+        return self.stack[:, rows, cols].all(axis=0)
+
+    def get_map_distance(self, rows, cols) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Distance of the given pixels to the nearest obstacle (ignoring the robot outline) and its gradient along rows and columns."""
+        distance = ndimage.distance_transform_edt(1 - self.map) * self.grid.pixel_size
+        gradient_rows, gradient_cols = np.gradient(distance)
+        return (ndimage.map_coordinates(distance, [rows, cols], order=0),
+                ndimage.map_coordinates(gradient_rows, [rows, cols], order=0),
+                ndimage.map_coordinates(gradient_cols, [rows, cols], order=0))
+
+    def _lookup(self, x, y, yaw) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Indices of the given poses into the stack and whether they are within the grid."""
+        row, col, layer = self.grid.to_3d_grid(np.ravel(x), np.ravel(y), np.ravel(yaw))
+        height, width, num_layers = self.grid.size
+        rows, row_valid = lookup_indices(row, height)
+        cols, col_valid = lookup_indices(col, width)
+        layers, layer_valid = lookup_indices(layer, num_layers + 1)
+        return layers, rows, cols, row_valid & col_valid & layer_valid
+
+
+def create_spline_poses(grid: Grid, spline, backward: bool) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sample the spline densely enough to hit every pixel and yaw layer of the grid."""
+    @overload
+    def pose(t: float) -> tuple[float, float, float]: ...
+
+    @overload
+    def pose(t: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]: ...
+
+    def pose(t: float | np.ndarray) -> tuple[float | np.ndarray, float | np.ndarray, float | np.ndarray]:
+        return (
+            spline.x(t),
+            spline.y(t),
+            spline.yaw(t) + [0, np.pi][backward],
+        )
+
+    row0, col0, layer0 = grid.to_3d_grid(*pose(0.0))
+    row1, col1, layer1 = grid.to_3d_grid(*pose(1.0))
+    num_rows = int(abs(row1 - row0))
+    num_cols = int(abs(col1 - col0))
+    num_layers = int(abs(layer1 - layer0))
+    n = max(num_rows, num_cols, num_layers)
+    t = ObstacleMap.t_lookup[n] if n < len(ObstacleMap.t_lookup) else np.linspace(0, 1, n)
+    return pose(t)
+
+
+def concatenate_spline_poses(grid: Grid, splines, backward=False) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Sample many splines and return the concatenated poses with the offsets of each spline (see ``test_batch``)."""
+    backwards = np.broadcast_to(backward, (len(splines),))
+    poses = [create_spline_poses(grid, spline, bool(b)) for spline, b in zip(splines, backwards, strict=True)]
+    offsets = np.cumsum([0] + [len(x) for x, _, _ in poses])
+    if not poses:
+        return np.zeros(0), np.zeros(0), np.zeros(0), offsets
+    x, y, yaw = (np.concatenate(values) for values in zip(*poses, strict=True))
+    return x, y, yaw, offsets
+
+
+def reduce_any(values: np.ndarray, offsets) -> np.ndarray:
+    """Whether any of the values of each item is true (the values of item ``i`` are ``values[offsets[i]:offsets[i+1]]``)."""
+    offsets = np.asarray(offsets)
+    result = np.zeros(len(offsets) - 1, dtype=bool)
+    non_empty = np.flatnonzero(offsets[1:] > offsets[:-1])
+    if len(non_empty):
+        result[non_empty] = np.logical_or.reduceat(values[:offsets[-1]], offsets[non_empty])
+    return result
+
+
+def quantize_distance(distance: np.ndarray) -> np.ndarray:
+    """Convert distances in meters into multiples of ``DISTANCE_RESOLUTION`` as stored in ``ObstacleMap.dist_stack``."""
+    return np.minimum(np.rint(distance / DISTANCE_RESOLUTION), np.iinfo(np.uint16).max).astype(np.uint16)
+
+
+def lookup_indices(coordinates, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Round grid coordinates like ``ndimage.map_coordinates`` with ``order=0`` and tell which ones are within the grid."""
+    coordinates = np.asarray(coordinates, dtype=float)
+    valid = (coordinates >= 0) & (coordinates <= size - 1)
+    return np.floor(coordinates + 0.5).astype(int), valid
+
+
+def _render(grid: Grid, areas: list[Area], obstacles: list[Obstacle], deadline: float | None = None, *,
+            window: tuple[slice, slice] | None = None) -> np.ndarray:
+    has_areas = any(len(a.outline) > 2 for a in areas)
+    binary_renderer = BinaryRenderer(grid.size[:2], fill_value=has_areas, window=window)
+    for area in areas:
+        binary_renderer.polygon(np.array([grid.to_grid(p.x, p.y)[::-1] for p in area.outline]), False)
+        if deadline and time.time() > deadline:
+            raise TimeoutError('obstacle map creation took too long')
+    for obstacle in obstacles:
+        binary_renderer.polygon(np.array([grid.to_grid(p.x, p.y)[::-1] for p in obstacle.outline]))
+        if deadline and time.time() > deadline:
+            raise TimeoutError('obstacle map creation took too long')
+    return binary_renderer.map
+
+
+def _pad(window: slice, size: int, padding: int) -> slice:
+    return slice(max(window.start - padding, 0), min(window.stop + padding, size))
+
+
+def _border_distance(rows: slice, cols: slice, height: int, width: int) -> np.ndarray:
+    """Distance of each pixel of the window to the nearest pixel outside of it (the border of the map does not count)."""
+    row_indices = np.arange(rows.stop - rows.start, dtype=float)[:, None]
+    col_indices = np.arange(cols.stop - cols.start, dtype=float)[None, :]
+    distance = np.full((len(row_indices), col_indices.shape[1]), np.inf)
+    if rows.start > 0:
+        distance = np.minimum(distance, row_indices + 1)
+    if rows.stop < height:
+        distance = np.minimum(distance, rows.stop - rows.start - row_indices)
+    if cols.start > 0:
+        distance = np.minimum(distance, col_indices + 1)
+    if cols.stop < width:
+        distance = np.minimum(distance, cols.stop - cols.start - col_indices)
+    return distance
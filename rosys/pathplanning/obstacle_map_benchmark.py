@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare build time and memory usage of the obstacle map with the previous float64 implementation.
+
+Each variant is built in a fresh process, so the peak RSS of one variant does not hide the other one.
+
+Usage: ``python -m rosys.pathplanning.obstacle_map_benchmark [--size 100]``
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+from scipy import ndimage
+
+from rosys.geometry import Point
+from rosys.pathplanning.grid import Grid
+from rosys.pathplanning.obstacle import Obstacle
+from rosys.pathplanning.obstacle_map import ObstacleMap, _render
+from rosys.pathplanning.robot_renderer import RobotRenderer
+
+ROBOT_OUTLINE = [(-0.22, -0.36), (1.07, -0.36), (1.17, 0), (1.07, 0.36), (-0.22, 0.36)]
+
+
+def build_legacy(grid: Grid, map_: np.ndarray, robot_renderer: RobotRenderer) -> tuple[np.ndarray, np.ndarray]:
+    """Build stack and distances like before (float64 distances, row-major layers, wrap-around layer via ``np.dstack``)."""
+    stack = np.zeros(grid.size, dtype=bool)
+    dist_stack = np.zeros(stack.shape)
+    for layer in range(grid.size[2]):
+        _, _, yaw = grid.from_3d_grid(0, 0, layer)
+        kernel = robot_renderer.render(grid.pixel_size, yaw).astype(np.uint8)
+        stack[:, :, layer] = cv2.dilate(map_.astype(np.uint8), kernel)
+        dist_stack[:, :, layer] = ndimage.distance_transform_edt(~stack[:, :, layer]) * grid.pixel_size
+    return np.dstack((stack, stack[:, :, :1])), np.dstack((dist_stack, dist_stack[:, :, :1]))
+
+
+def measure(variant: str, size: float) -> dict[str, float]:
+    grid = Grid.from_points([Point(x=0, y=0), Point(x=size, y=size)], pixel_size=0.1, num_layers=36, padding=1.0)
+    obstacles = [
+        Obstacle(id=f'{x}-{y}', outline=[Point(x=x, y=y), Point(x=x+1, y=y), Point(x=x+1, y=y+1), Point(x=x, y=y+1)])
+        for x in np.arange(5, size - 5, 10) for y in np.arange(5, size - 5, 10)
+    ]
+    map_ = _render(grid, [], obstacles)
+    robot_renderer = RobotRenderer(ROBOT_OUTLINE)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t = time.perf_counter()
+    if variant == 'legacy':
+        stack, dist_stack = build_legacy(grid, map_, robot_renderer)
+    else:
+        obstacle_map = ObstacleMap(grid, map_, robot_renderer)
+        stack, dist_stack = obstacle_map.stack, obstacle_map.dist_stack
+    return {
+        'time': time.perf_counter() - t,
+        'rss': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024,
+        'size': (stack.nbytes + dist_stack.nbytes) / 1024**2,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=float, default=100.0, help='edge length of the square field (in meters)')
+    parser.add_argument('--variant', choices=['legacy', 'current'], help='measure a single variant in this process')
+    args = parser.parse_args()
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.size)))
+        return
+
+    print(f'{args.size:.0f} m x {args.size:.0f} m field with 0.1 m pixels and 36 yaw layers')
+    print(f'{"variant":>10} {"build time":>12} {"peak RSS":>12} {"arrays":>12}')
+    for variant in ['legacy', 'current']:
+        output = subprocess.run([sys.executable, '-m', 'rosys.pathplanning.obstacle_map_benchmark',
+                                 '--variant', variant, '--size', str(args.size)],
+                                capture_output=True, check=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f'{variant:>10} {result["time"]:>10.2f} s {result["rss"]:>9.0f} MB {result["size"]:>9.0f} MB')
+
+
+if __name__ == '__main__':
+    main()
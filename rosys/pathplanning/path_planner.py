@@ -10,6 +10,7 @@ from ..driving import PathSegment
 from ..event import Event
 from ..geometry import Point, Pose, Prism, Spline
 from .area import Area
+from .delaunay_planner import SearchMode
 from .obstacle import Obstacle
 from .planner_process import (
     PlannerCommand,
@@ -20,6 +21,7 @@ from .planner_process import (
     PlannerSearchCommand,
     PlannerTestCommand,
 )
+from .roadmap_cache import RoadmapCache
 
 
 class PathPlanner(persistence.Persistable):
@@ -27,15 +29,20 @@ class PathPlanner(persistence.Persistable):
 
     If given, the algorithm respects the given robot shape as well as a dictionary of accessible areas and a dictionary of obstacles, both of which a backed up and restored automatically.
     The path planner can search paths, check if a spline interferes with obstacles and get the distance of a pose to any obstacle.
+    The yaw layers of the obstacle map are built by ``workers`` threads in parallel (default: one per CPU core).
+    The ``search_mode`` selects how the roadmap is searched (see ``SearchMode``).
+    If a ``RoadmapCache`` is given, obstacle maps and roadmaps are stored on disk and reused after a restart.
     """
 
-    def __init__(self, robot_shape: Prism) -> None:
+    def __init__(self, robot_shape: Prism, *, workers: int | None = None, search_mode: SearchMode = 'dijkstra',
+                 cache: RoadmapCache | None = None) -> None:
         super().__init__()
 
         self.log = logging.getLogger('rosys.path_planner')
 
         self.connection, process_connection = Pipe()
-        self.process = PlannerProcess(process_connection, robot_shape.outline)
+        self.process = PlannerProcess(process_connection, robot_shape.outline,
+                                      workers=workers, search_mode=search_mode, cache=cache)
         self.responses: dict[str, Any] = {}
 
         self.obstacles: dict[str, Obstacle] = {}
@@ -120,7 +127,7 @@ class PathPlanner(persistence.Persistable):
         ))
 
     async def _call(self, command: PlannerCommand, check_interval: float = 0.1) -> Any:
-        with run.cpu():
+        with run.cpu(f'{type(self).__qualname__}.{type(command).__qualname__}', 'planning'):
             self.connection.send(command)
             while command.id not in self.responses:
                 if time.time() > command.deadline:
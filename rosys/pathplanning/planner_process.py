@@ -8,8 +8,9 @@ from typing import Any
 
 from ..geometry import Point, Pose, Spline
 from .area import Area
-from .delaunay_planner import DelaunayPlanner
+from .delaunay_planner import DelaunayPlanner, SearchMode
 from .obstacle_map import Obstacle
+from .roadmap_cache import RoadmapCache
 
 
 @dataclass
@@ -59,13 +60,17 @@ class PlannerResponse:
 
 class PlannerProcess(Process):
 
-    def __init__(self, connection: Connection, robot_outline: list[tuple[float, float]]) -> None:
+    def __init__(self, connection: Connection, robot_outline: list[tuple[float, float]], *,
+                 workers: int | None = None, search_mode: SearchMode = 'dijkstra',
+                 cache: RoadmapCache | None = None) -> None:
         super().__init__()
         self.log = logging.getLogger('rosys.pathplanning.PlannerProcess')
         self.connection = connection
-        self.planner = DelaunayPlanner(robot_outline)
+        self.planner = DelaunayPlanner(robot_outline, workers=workers, search_mode=search_mode, cache=cache)
 
     def run(self) -> None:
+        # NOTE: the kernels are cached within this process and reused by every obstacle map rebuild
+        self.planner.precompute_kernels()
         while True:
             try:
                 cmd = self.connection.recv()
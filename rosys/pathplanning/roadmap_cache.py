@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import shutil
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+CACHE_PATH = Path('~/.rosys/roadmap_cache').expanduser()
+"""Default directory of the roadmap cache."""
+
+CACHE_VERSION = 1
+"""Version of the cached arrays; entries of other versions are ignored."""
+
+
+class RoadmapCache:
+    """Stores obstacle maps and roadmaps on disk so that they don't need to be rebuilt after a restart.
+
+    Each entry is a directory of ``.npy`` files named after a hash of everything the arrays depend on.
+    The arrays are memory-mapped when loading, so loading takes milliseconds independent of the map size.
+    They are mapped copy-on-write, so modifying them (e.g. by an incremental map update) never changes the cache.
+
+    :param path: directory of the cache (default: ``CACHE_PATH``)
+    :param max_entries: number of entries to keep (the least recently used ones are removed)
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, *, max_entries: int = 3) -> None:
+        self.path = path.expanduser()
+        self.max_entries = max_entries
+        self.log = logging.getLogger('rosys.roadmap_cache')
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Create a key from the representations of the given parts."""
+        return hashlib.sha256(repr((CACHE_VERSION, *parts)).encode()).hexdigest()
+
+    def load(self, key: str) -> dict[str, np.ndarray] | None:
+        """Load the arrays stored for the given key or return ``None`` if there are none."""
+        directory = self.path / key
+        if not directory.is_dir():
+            return None
+        try:
+            arrays = {file.stem: np.load(file, mmap_mode='c') for file in directory.glob('*.npy')}
+        except (OSError, ValueError):
+            self.log.exception('could not load cache entry %s', key)
+            return None
+        directory.touch()  # NOTE: mark the entry as recently used
+        return arrays
+
+    def store(self, key: str, arrays: dict[str, np.ndarray]) -> None:
+        """Store the arrays for the given key and remove the least recently used entries."""
+        directory = self.path / key
+        if directory.exists():
+            return
+        # NOTE: the entry is written to a temporary directory first so that other processes never see a partial entry
+        temporary = self.path / f'.{key}.tmp'
+        try:
+            shutil.rmtree(temporary, ignore_errors=True)
+            temporary.mkdir(parents=True)
+            for name, array in arrays.items():
+                np.save(temporary / f'{name}.npy', array)
+            temporary.rename(directory)
+        except OSError:
+            self.log.exception('could not store cache entry %s', key)
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+        self._remove_old_entries()
+
+    def _remove_old_entries(self) -> None:
+        entries = [entry for entry in self.path.iterdir() if entry.is_dir() and not entry.name.startswith('.')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_entries:]:
+            shutil.rmtree(entry, ignore_errors=True)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 import numpy as np
 
 from .binary_renderer import BinaryRenderer
@@ -31,3 +33,22 @@ class RobotRenderer:
         renderer.map.fill(False)
         renderer.polygon(self.rendered_outline)
         return renderer.map
+
+    def render_kernels(self, pixel_size: float, num_layers: int) -> tuple[np.ndarray, ...]:
+        """Render the outline for each yaw layer as a dilation kernel (see ``render_kernels``)."""
+        return render_kernels(tuple(tuple(point) for point in self.outline), float(pixel_size), num_layers)
+
+
+@lru_cache(maxsize=16)
+def render_kernels(outline: tuple[tuple[float, float], ...], pixel_size: float, num_layers: int) -> tuple[np.ndarray, ...]:
+    """Render the robot outline for each of the evenly spaced yaw layers as uint8 dilation kernel.
+
+    The kernels only depend on the outline, pixel size and number of layers,
+    so they are cached for the lifetime of the process and shared by all obstacle maps (they are read-only).
+    """
+    renderer = RobotRenderer(outline)
+    kernels = tuple(renderer.render(pixel_size, layer / num_layers * 2.0 * np.pi).astype(np.uint8)
+                    for layer in range(num_layers))
+    for kernel in kernels:
+        kernel.flags.writeable = False
+    return kernels
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Compare the search modes of the Delaunay planner on the scenarios in ``pathplanning/demos``.
+
+For each scenario the map and roadmap are built once; then each search mode is timed on the same query.
+
+Usage: ``python -m rosys.pathplanning.search_benchmark [demo ...]``
+"""
+import argparse
+import importlib
+import time
+from pathlib import Path
+from typing import get_args
+
+from rosys.pathplanning.delaunay_planner import DelaunayPlanner, SearchMode
+
+DEMOS_PATH = Path(__file__).parent / 'demos'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('demos', nargs='*', help='names of the demos (default: all)')
+    parser.add_argument('--repetitions', type=int, default=3, help='number of searches per mode (the fastest one counts)')
+    args = parser.parse_args()
+    demos = args.demos or sorted(path.stem for path in DEMOS_PATH.glob('*.py'))
+
+    modes: tuple[SearchMode, ...] = get_args(SearchMode)
+    print(f'{"demo":>14}' + ''.join(f'{mode:>22}' for mode in modes))
+    totals = dict.fromkeys(modes, 0.0)
+    for demo in demos:
+        module = importlib.import_module(f'rosys.pathplanning.demos.{demo}')
+        cmd = module.cmd
+        planner = DelaunayPlanner(module.robot_outline)
+        planner.update_map(cmd.areas, cmd.obstacles, [cmd.start.point, cmd.goal.point], deadline=time.time() + 60)
+        row = f'{demo:>14}'
+        for mode in modes:
+            planner.search_mode = mode
+            durations = []
+            for _ in range(args.repetitions):
+                t = time.perf_counter()
+                try:
+                    path = planner.search(cmd.start, cmd.goal)
+                except RuntimeError:
+                    path = []
+                durations.append(time.perf_counter() - t)
+            totals[mode] += min(durations)
+            length = sum(segment.spline.estimated_length() for segment in path)
+            result = f'{len(path)} seg. {length:5.1f} m' if path else 'no path'
+            row += f'{min(durations):8.3f} s {result:>12}'
+        print(row)
+    print(f'{"total":>14}' + ''.join(f'{totals[mode]:8.3f} s {"":>12}' for mode in modes))
+
+
+if __name__ == '__main__':
+    main()
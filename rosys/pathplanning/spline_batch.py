@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import numpy as np
+
+from ..geometry import Point, Spline
+from ..geometry.spline import curvature_polynomial
+from .grid import Grid
+
+
+class SplineBatch:
+    """Many splines between pairs of poses (like ``Spline.from_poses``), evaluated at once.
+
+    :param starts: start poses (x, y, yaw) of the robot, one per row
+    :param ends: end poses (x, y, yaw) of the robot, one per row
+    :param backward: whether each spline is driven backward
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, backward: np.ndarray) -> None:
+        self.starts = starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        self.ends = ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        self.backward = np.broadcast_to(backward, (len(starts),)).astype(bool)
+        distance = 0.5 * np.sqrt((ends[:, 0] - starts[:, 0])**2 + (ends[:, 1] - starts[:, 1])**2)
+        distance[self.backward] *= -1
+        # NOTE: the coefficients are column vectors so that they broadcast with parameters t of shape (len(self), n)
+        self.a = starts[:, 0:1]
+        self.e = starts[:, 1:2]
+        self.b = self.a + distance[:, None] * np.cos(starts[:, 2:3])
+        self.f = self.e + distance[:, None] * np.sin(starts[:, 2:3])
+        self.d = ends[:, 0:1]
+        self.h = ends[:, 1:2]
+        self.c = self.d - distance[:, None] * np.cos(ends[:, 2:3])
+        self.g = self.h - distance[:, None] * np.sin(ends[:, 2:3])
+        self.m = self.d - 3 * self.c + 3 * self.b - self.a
+        self.n = self.c - 2 * self.b + self.a
+        self.o = self.b - self.a
+        self.p = self.h - 3 * self.g + 3 * self.f - self.e
+        self.q = self.g - 2 * self.f + self.e
+        self.r = self.f - self.e
+
+    def __len__(self) -> int:
+        return len(self.backward)
+
+    def __getitem__(self, index) -> SplineBatch:
+        """Select splines by index, slice or boolean mask."""
+        return SplineBatch(self.starts[index], self.ends[index], self.backward[index])
+
+    def spline(self, index: int) -> Spline:
+        return Spline(start=Point(x=self.a[index, 0], y=self.e[index, 0]),
+                      control1=Point(x=self.b[index, 0], y=self.f[index, 0]),
+                      control2=Point(x=self.c[index, 0], y=self.g[index, 0]),
+                      end=Point(x=self.d[index, 0], y=self.h[index, 0]))
+
+    def x(self, t: np.ndarray) -> np.ndarray:
+        return t**3 * self.d + 3 * t**2 * (1 - t) * self.c + 3 * t * (1 - t)**2 * self.b + (1 - t)**3 * self.a
+
+    def y(self, t: np.ndarray) -> np.ndarray:
+        return t**3 * self.h + 3 * t**2 * (1 - t) * self.g + 3 * t * (1 - t)**2 * self.f + (1 - t)**3 * self.e
+
+    def yaw(self, t: np.ndarray) -> np.ndarray:
+        return np.arctan2(3 * (self.p * t**2 + 2 * self.q * t + self.r), 3 * (self.m * t**2 + 2 * self.n * t + self.o))
+
+    def curvature(self, t: np.ndarray) -> np.ndarray:
+        x_ = 3 * (self.m * t**2 + 2 * self.n * t + self.o)
+        y_ = 3 * (self.p * t**2 + 2 * self.q * t + self.r)
+        x__ = 6 * (self.m * t + self.n)
+        y__ = 6 * (self.p * t + self.q)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (x_ * y__ - y_ * x__) / (x_**2 + y_**2)**(3/2)
+
+    def max_curvature(self) -> np.ndarray:
+        """Curvature with the largest magnitude of each spline (like ``Spline.max_curvature``)."""
+        coefficients = np.concatenate(curvature_polynomial(self), axis=1)
+        # NOTE: the roots are the eigenvalues of the companion matrices, which np.roots computes one by one
+        roots = np.full((len(self), 5), np.nan, dtype=complex)
+        regular = coefficients[:, 0] != 0
+        companion = np.zeros((np.count_nonzero(regular), 5, 5))
+        companion[:, 0, :] = -coefficients[regular, 1:] / coefficients[regular, :1]
+        companion[:, np.arange(1, 5), np.arange(4)] = 1
+        roots[regular] = np.linalg.eigvals(companion)
+        for i in np.flatnonzero(~regular):
+            degenerate_roots = np.roots(coefficients[i])
+            roots[i, :len(degenerate_roots)] = degenerate_roots
+        valid = (roots.imag == 0) & (roots.real > 0) & (roots.real < 1)
+        t = np.concatenate((np.where(valid, roots.real, 0.0), np.zeros((len(self), 1)), np.ones((len(self), 1))), axis=1)
+        k = self.curvature(t)
+        index = np.argmax(np.abs(k), axis=1)
+        return k[np.arange(len(self)), index]
+
+    def estimated_length(self, steps: int = 10) -> np.ndarray:
+        """Length of each spline approximated by a polyline (like ``Spline.estimated_length``)."""
+        t = np.linspace(0, 1, steps)
+        return np.sum(np.sqrt(np.diff(self.x(t), axis=1)**2 + np.diff(self.y(t), axis=1)**2), axis=1)
+
+    def poses(self, grid: Grid) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Sample all splines like ``create_spline_poses`` and return the concatenated poses with the offsets of each spline."""
+        yaw_offset = np.where(self.backward, np.pi, 0.0)[:, None]
+        ends = np.array([[0.0, 1.0]])
+        row, col, layer = grid.to_3d_grid(self.x(ends), self.y(ends), self.yaw(ends) + yaw_offset)
+        counts = np.maximum.reduce([np.abs(np.diff(row, axis=1)[:, 0]).astype(int),
+                                    np.abs(np.diff(col, axis=1)[:, 0]).astype(int),
+                                    np.abs(np.diff(layer, axis=1)[:, 0]).astype(int)])
+        t, offsets = linspaces(counts)
+        t = t[:, None]
+        # NOTE: each sample is evaluated with the coefficients of its spline
+        samples = self[np.repeat(np.arange(len(self)), counts)]
+        yaw = samples.yaw(t) + np.where(samples.backward, np.pi, 0.0)[:, None]
+        return samples.x(t)[:, 0], samples.y(t)[:, 0], yaw[:, 0], offsets
+
+
+def linspaces(counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenate ``np.linspace(0, 1, count)`` for all counts and return it with the offsets of each range."""
+    counts = np.asarray(counts, dtype=int)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    t = (np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)) * np.repeat(1 / np.maximum(counts - 1, 1), counts)
+    t[offsets[1:][counts > 1] - 1] = 1.0
+    return t, offsets
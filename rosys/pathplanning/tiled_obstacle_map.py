@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from scipy import ndimage
+
+from .area import Area
+from .grid import Grid
+from .obstacle import Obstacle
+from .obstacle_map import (
+    DISTANCE_RESOLUTION,
+    _border_distance,
+    _pad,
+    _render,
+    concatenate_spline_poses,
+    create_spline_poses,
+    lookup_indices,
+    quantize_distance,
+    reduce_any,
+)
+from .robot_renderer import RobotRenderer
+
+TILE_SIZE = 128
+"""edge length of a tile (in pixels)"""
+
+MAX_TILES = 128
+"""maximum number of tiles kept in memory (a tile with all distance layers takes about 2 MB)"""
+
+MAX_DISTANCE = 3.0
+"""distances up to this value are exact, larger distances are reported as at least this value (in meters)"""
+
+
+@dataclass(slots=True, kw_only=True)
+class _Tile:
+    rows: slice
+    cols: slice
+    stack: np.ndarray | bool
+    """stack of the tile (layer, row, column) or a single value if the whole tile is free or blocked"""
+    dists: dict[int, np.ndarray] = field(default_factory=dict)
+    """distance layers which have been computed so far (in multiples of ``DISTANCE_RESOLUTION``)"""
+
+
+class TiledObstacleMap:
+    """An obstacle map for large fields which computes stack and distances of square tiles on demand.
+
+    Only the binary map of obstacles is kept for the whole grid.
+    The stack and the distance layers are computed per tile when they are needed
+    and at most ``max_tiles`` tiles are kept in memory, dropping the least recently used ones first.
+    Tiles which are entirely free or entirely blocked do not allocate a stack at all.
+    In contrast to ``ObstacleMap`` distances are only exact up to ``max_distance``;
+    larger distances are reported as at least ``max_distance``.
+    """
+
+    def __init__(self, grid: Grid, map_: np.ndarray, robot_renderer: RobotRenderer, *,
+                 areas: list[Area] | None = None,
+                 obstacles: list[Obstacle] | None = None,
+                 tile_size: int = TILE_SIZE,
+                 max_tiles: int = MAX_TILES,
+                 max_distance: float = MAX_DISTANCE) -> None:
+        self.grid = grid
+        self.map = map_
+        self.areas = areas
+        """areas the map has been rendered from (``None`` if it has not been created from the world)"""
+        self.obstacles = obstacles
+        """obstacles the map has been rendered from (``None`` if it has not been created from the world)"""
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.max_distance = max_distance
+        self.kernels = list(robot_renderer.render_kernels(grid.pixel_size, grid.size[2]))
+        """rendered robot outline for each yaw layer"""
+        self._tiles: OrderedDict[tuple[int, int], _Tile] = OrderedDict()
+
+    @staticmethod
+    def from_world(robot_outline: list[tuple[float, float]],
+                   areas: list[Area],
+                   obstacles: list[Obstacle],
+                   grid: Grid,
+                   deadline: float | None = None, **kwargs) -> TiledObstacleMap:
+        map_ = _render(grid, areas, obstacles, deadline)
+        return TiledObstacleMap(grid, map_, RobotRenderer(robot_outline), areas=areas, obstacles=obstacles, **kwargs)
+
+    @property
+    def num_tiles(self) -> int:
+        """Number of tiles currently kept in memory."""
+        return len(self._tiles)
+
+    def update(self, obstacles: list[Obstacle], deadline: float | None = None) -> None:
+        """Update the map after obstacles have been added, removed or changed.
+
+        Only the bounding box of the changed obstacles is rendered again and the affected tiles are dropped.
+        """
+        if self.areas is None or self.obstacles is None:
+            raise RuntimeError('only obstacle maps created from the world can be updated')
+        changed = [o for o in obstacles if o not in self.obstacles] + [o for o in self.obstacles if o not in obstacles]
+        points = np.array([self.grid.to_grid(p.x, p.y) for obstacle in changed for p in obstacle.outline]).reshape(-1, 2)
+        height, width, _ = self.grid.size
+        if len(points):
+            rows = slice(max(int(points[:, 0].min()), 0), min(int(points[:, 0].max()) + 2, height))
+            cols = slice(max(int(points[:, 1].min()), 0), min(int(points[:, 1].max()) + 2, width))
+        if not len(points) or rows.start >= rows.stop or cols.start >= cols.stop:
+            self.obstacles = obstacles
+            return
+
+        self.map[rows, cols] = _render(self.grid, self.areas, obstacles, deadline, window=(rows, cols))
+        self.obstacles = obstacles
+        padding = self._radius + self._distance_padding
+        rows, cols = _pad(rows, height, padding), _pad(cols, width, padding)
+        for tile_row, tile_col in list(self._tiles):
+            if rows.start < (tile_row + 1) * self.tile_size and tile_row * self.tile_size < rows.stop and \
+                    cols.start < (tile_col + 1) * self.tile_size and tile_col * self.tile_size < cols.stop:
+                del self._tiles[tile_row, tile_col]
+
+    def test(self, x, y, yaw) -> np.ndarray:
+        row, col, layer = self.grid.to_3d_grid(x, y, yaw)
+        rows, cols, layers, valid = self._lookup(row, col, layer)
+        result = np.zeros(rows.shape, dtype=bool)
+        for tile_row, tile_col, index in self._group(rows, cols, valid):
+            tile = self._tile(tile_row, tile_col)
+            if isinstance(tile.stack, np.ndarray):
+                result[index] = tile.stack[layers[index], rows[index] - tile.rows.start, cols[index] - tile.cols.start]
+            else:
+                result[index] = tile.stack
+        return result.reshape((1, *np.shape(row)))
+
+    def test_batch(self, x, y, yaw, offsets) -> np.ndarray:
+        """Test many items (e.g. splines) which consist of a varying number of poses at once (see ``ObstacleMap.test_batch``)."""
+        return reduce_any(self.test(x, y, yaw).ravel(), offsets)
+
+    def test_spline(self, spline, backward=False) -> bool:
+        return bool(self.test(*create_spline_poses(self.grid, spline, backward)).any())
+
+    def test_splines(self, splines, backward=False) -> np.ndarray:
+        return self.test_batch(*concatenate_spline_poses(self.grid, splines, backward))
+
+    def get_distance(self, x, y, yaw) -> np.ndarray:
+        row, col, layer = self.grid.to_3d_grid(x, y, yaw)
+        rows, cols, layers, valid = self._lookup(row, col, layer)
+        result = np.zeros(rows.shape)
+        for tile_row, tile_col, index in self._group(rows, cols, valid):
+            tile = self._tile(tile_row, tile_col)
+            for layer_ in np.unique(layers[index]):
+                layer_index = index[layers[index] == layer_]
+                dist = self._distance(tile, int(layer_))
+                result[layer_index] = dist[rows[layer_index] - tile.rows.start, cols[layer_index] - tile.cols.start]
+        return result.reshape((1, *np.shape(row))) * DISTANCE_RESOLUTION
+
+    def get_minimum_spline_distance(self, spline, backward=False) -> float:
+        return self.get_distance(*create_spline_poses(self.grid, spline, backward)).min()
+
+    def blocks_all_yaws(self, rows, cols) -> np.ndarray:
+        """Whether the robot collides with an obstacle at the given pixels for every yaw angle."""
+        rows = np.round(rows).astype(int)
+        cols = np.round(cols).astype(int)
+        result = np.zeros(rows.shape, dtype=bool)
+        for tile_row, tile_col, index in self._group(rows, cols, np.ones(rows.shape, dtype=bool)):
+            tile = self._tile(tile_row, tile_col)
+            if isinstance(tile.stack, np.ndarray):
+                result[index] = tile.stack[:, rows[index] - tile.rows.start, cols[index] - tile.cols.start].all(axis=0)
+            else:
+                result[index] = tile.stack
+        return result
+
+    def get_map_distance(self, rows, cols) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Distance of the given pixels to the nearest obstacle (ignoring the robot outline) and its gradient along rows and columns.
+
+        These distances are not cached because they are only needed when building the roadmap.
+        """
+        height, width, _ = self.grid.size
+        rows, row_valid = lookup_indices(rows, height)
+        cols, col_valid = lookup_indices(cols, width)
+        result = np.zeros((3, *rows.shape))
+        for tile_row, tile_col, index in self._group(rows, cols, row_valid & col_valid):
+            tile_rows, tile_cols = self._tile_window(tile_row, tile_col)
+            dist_rows, dist_cols = _pad(tile_rows, height, self._distance_padding), _pad(tile_cols, width, self._distance_padding)
+            distance = self._window_distance(self.map[dist_rows, dist_cols], dist_rows, dist_cols)
+            for i, values in enumerate((distance, *np.gradient(distance))):
+                result[i, index] = values[rows[index] - dist_rows.start, cols[index] - dist_cols.start]
+        return result[0], result[1], result[2]
+
+    @property
+    def _radius(self) -> int:
+        return self.kernels[0].shape[0] // 2
+
+    @property
+    def _distance_padding(self) -> int:
+        return int(np.ceil(self.max_distance / self.grid.pixel_size)) + 1
+
+    def _lookup(self, row, col, layer) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        height, width, num_layers = self.grid.size
+        rows, row_valid = lookup_indices(np.ravel(row), height)
+        cols, col_valid = lookup_indices(np.ravel(col), width)
+        layers, layer_valid = lookup_indices(np.ravel(layer), num_layers + 1)
+        return rows, cols, layers % num_layers, row_valid & col_valid & layer_valid
+
+    def _group(self, rows: np.ndarray, cols: np.ndarray, valid: np.ndarray) -> Iterator[tuple[int, int, np.ndarray]]:
+        """Yield the row and column of each tile with the indices of the valid pixels which are located in it."""
+        indices = np.flatnonzero(valid)
+        if not len(indices):
+            return
+        tile_rows, tile_cols = rows[indices] // self.tile_size, cols[indices] // self.tile_size
+        if tile_rows.min() == tile_rows.max() and tile_cols.min() == tile_cols.max():
+            yield int(tile_rows[0]), int(tile_cols[0]), indices
+            return
+        keys = tile_rows * (self.grid.size[1] // self.tile_size + 1) + tile_cols
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        for i in range(len(unique_keys)):
+            yield int(tile_rows[first[i]]), int(tile_cols[first[i]]), indices[inverse == i]
+
+    def _tile(self, tile_row: int, tile_col: int) -> _Tile:
+        key = (tile_row, tile_col)
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._tiles[key] = self._create_tile(tile_row, tile_col)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def _tile_window(self, tile_row: int, tile_col: int) -> tuple[slice, slice]:
+        height, width, _ = self.grid.size
+        return (slice(tile_row * self.tile_size, min((tile_row + 1) * self.tile_size, height)),
+                slice(tile_col * self.tile_size, min((tile_col + 1) * self.tile_size, width)))
+
+    def _create_tile(self, tile_row: int, tile_col: int) -> _Tile:
+        height, width, _ = self.grid.size
+        rows, cols = self._tile_window(tile_row, tile_col)
+        source_rows, source_cols = _pad(rows, height, self._radius), _pad(cols, width, self._radius)
+        source = self.map[source_rows, source_cols]
+        if not source.any():
+            return _Tile(rows=rows, cols=cols, stack=False)
+        if self.map[rows, cols].all():
+            return _Tile(rows=rows, cols=cols, stack=True)
+        inner = (slice(rows.start - source_rows.start, rows.stop - source_rows.start),
+                 slice(cols.start - source_cols.start, cols.stop - source_cols.start))
+        source = source.astype(np.uint8)
+        return _Tile(rows=rows, cols=cols,
+                     stack=np.stack([cv2.dilate(source, kernel)[inner] for kernel in self.kernels]).astype(bool))
+
+    def _distance(self, tile: _Tile, layer: int) -> np.ndarray:
+        dist = tile.dists.get(layer)
+        if dist is not None:
+            return dist
+        if tile.stack is True:
+            dist = np.zeros((tile.rows.stop - tile.rows.start, tile.cols.stop - tile.cols.start), dtype=np.uint16)
+        else:
+            height, width, _ = self.grid.size
+            dist_rows, dist_cols = _pad(tile.rows, height, self._distance_padding), _pad(tile.cols, width, self._distance_padding)
+            source_rows, source_cols = _pad(dist_rows, height, self._radius), _pad(dist_cols, width, self._radius)
+            dilated = cv2.dilate(self.map[source_rows, source_cols].astype(np.uint8), self.kernels[layer])
+            stack = dilated[dist_rows.start - source_rows.start:dist_rows.stop - source_rows.start,
+                            dist_cols.start - source_cols.start:dist_cols.stop - source_cols.start].astype(bool)
+            dist = self._window_distance(stack, dist_rows, dist_cols)[tile.rows.start - dist_rows.start:tile.rows.stop - dist_rows.start,
+                                                                      tile.cols.start - dist_cols.start:tile.cols.stop - dist_cols.start]
+            dist = quantize_distance(dist)
+        tile.dists[layer] = dist
+        return dist
+
+    def _window_distance(self, blocked: np.ndarray, rows: slice, cols: slice) -> np.ndarray:
+        """Distance to the nearest blocked pixel within the window, limited by the distance to the window border."""
+        height, width, _ = self.grid.size
+        border_distance = _border_distance(rows, cols, height, width) * self.grid.pixel_size
+        if not blocked.any():
+            return border_distance
+        return np.minimum(ndimage.distance_transform_edt(~blocked) * self.grid.pixel_size, border_distance)
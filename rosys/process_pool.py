@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from multiprocessing import resource_tracker
+from typing import Any, TypeVar
+
+from nicegui.run import safe_callback
+
+R = TypeVar('R')
+
+MAX_CACHED_STATES = 32
+log = logging.getLogger('rosys.process_pool')
+
+_worker_cache: OrderedDict[Hashable, Any] = OrderedDict()  # NOTE: lives in the worker process
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class WorkerState:
+    """A value which is sent to a worker process only once and then kept there.
+
+    Pass it as an argument to ``ProcessPool.run``; the callback receives the plain value.
+    The key has to change whenever the value changes.
+    """
+    key: Hashable
+    value: Any
+
+
+@dataclass(slots=True, frozen=True)
+class _StateRef:
+    key: Hashable
+
+
+class MissingWorkerStateError(Exception):
+    """The worker does not know the referenced state (anymore) and needs to receive it again."""
+
+    def __init__(self, key: Hashable) -> None:
+        super().__init__(key)
+        self.key = key
+
+
+@dataclass(slots=True, kw_only=True)
+class WorkerStats:
+    submitted: int = 0
+    """number of submitted calls"""
+    completed: int = 0
+    """number of finished calls (including failed ones)"""
+    failed: int = 0
+    """number of calls which raised an exception"""
+    queue_depth: int = 0
+    """number of calls which are currently queued or running"""
+    max_queue_depth: int = 0
+    """highest number of calls which were queued or running at the same time"""
+
+
+@dataclass(slots=True, kw_only=True, eq=False)
+class _Worker:
+    executor: ProcessPoolExecutor | None = None
+    sent: OrderedDict[Hashable, None] = field(default_factory=OrderedDict)
+    stats: WorkerStats = field(default_factory=WorkerStats)
+
+    def prepare(self, arg: Any) -> Any:
+        if not isinstance(arg, WorkerState):
+            return arg
+        if arg.key in self.sent:
+            self.sent.move_to_end(arg.key)
+            return _StateRef(arg.key)
+        self.sent[arg.key] = None
+        while len(self.sent) > MAX_CACHED_STATES:
+            self.sent.popitem(last=False)
+        return arg
+
+
+class ProcessPool:
+    """A pool of worker processes which keep their state between calls.
+
+    Each worker is a separate single-process executor, so calls can be routed explicitly:
+    calls with the same affinity key always run on the same worker, all other calls go to the least busy one.
+    Arguments wrapped in a ``WorkerState`` are only transferred once per worker.
+    Values derived from them (like undistortion maps) can be kept with ``cached``.
+
+    :param num_workers: number of worker processes (default: number of CPUs)
+    :param processes: whether to use real processes (otherwise calls run in a thread pool, e.g. for tests)
+    """
+
+    def __init__(self, num_workers: int | None = None, *, processes: bool = True) -> None:
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.processes = processes
+        self.workers = [_Worker() for _ in range(self.num_workers)]
+        self._threads: ThreadPoolExecutor | None = None
+
+    @property
+    def stats(self) -> list[WorkerStats]:
+        return [worker.stats for worker in self.workers]
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(worker.stats.queue_depth for worker in self.workers)
+
+    async def run(self,
+                  callback: Callable[..., R],
+                  args: tuple = (),
+                  kwargs: dict[str, Any] | None = None, *,
+                  affinity: Hashable | None = None) -> R:
+        """Run the callback in a worker process and return its result.
+
+        :param affinity: calls with the same (hashable) affinity key are always routed to the same worker
+        """
+        result, _ = await self.run_timed(callback, args, kwargs, affinity=affinity)
+        return result
+
+    async def run_timed(self,
+                        callback: Callable[..., R],
+                        args: tuple = (),
+                        kwargs: dict[str, Any] | None = None, *,
+                        affinity: Hashable | None = None,
+                        on_finished: Callable[[], None] | None = None) -> tuple[R, float]:
+        """Like ``run`` but also return the time the worker spent executing the callback (in seconds).
+
+        :param on_finished: called on the event loop as soon as the worker is done with the call;
+            if waiting for the result is cancelled while the callback is already running, this happens only after it returned
+        """
+        kwargs = kwargs or {}
+        worker = self._select(affinity)
+        worker.stats.submitted += 1
+        worker.stats.queue_depth += 1
+        worker.stats.max_queue_depth = max(worker.stats.max_queue_depth, worker.stats.queue_depth)
+        loop = asyncio.get_running_loop()
+        future: Future | None = None
+        try:
+            while True:
+                call = partial(_call,
+                               callback,
+                               tuple(worker.prepare(arg) for arg in args),
+                               {key: worker.prepare(value) for key, value in kwargs.items()})
+                future = self._get_executor(worker).submit(call)
+                try:
+                    return await asyncio.wrap_future(future)
+                except MissingWorkerStateError as e:
+                    worker.sent.pop(e.key, None)  # NOTE: send the value again with the next attempt
+        except BrokenProcessPool:
+            log.warning('worker process died; it will be restarted with the next call')
+            worker.executor = None
+            worker.sent.clear()
+            worker.stats.failed += 1
+            raise
+        except BaseException:
+            worker.stats.failed += 1
+            raise
+        finally:
+            worker.stats.queue_depth -= 1
+            worker.stats.completed += 1
+            if on_finished is not None:
+                if future is None or future.done():
+                    on_finished()
+                else:
+                    # NOTE: the call is still running (or about to be cancelled), so wait for the executor to be done with it
+                    future.add_done_callback(lambda _: _call_soon(loop, on_finished))
+
+    async def broadcast(self, callback: Callable[..., R], args: tuple = ()) -> list[R]:
+        """Run the callback once in every worker process which has been started (nothing happens in thread mode)."""
+        loop = asyncio.get_running_loop()
+        executors = [worker.executor for worker in self.workers if worker.executor is not None]
+        return list(await asyncio.gather(*(loop.run_in_executor(executor, partial(callback, *args))
+                                           for executor in executors)))
+
+    def shutdown(self) -> None:
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        for worker in self.workers:
+            if worker.executor is not None:
+                for process in worker.executor._processes.values():  # pylint: disable=protected-access
+                    process.kill()
+                worker.executor.shutdown(wait=True, cancel_futures=True)
+            worker.executor = None
+            worker.sent.clear()
+
+    def _select(self, affinity: Hashable | None) -> _Worker:
+        if affinity is not None:
+            return self.workers[hash(affinity) % self.num_workers]
+        return min(self.workers, key=lambda worker: worker.stats.queue_depth)
+
+    def _get_executor(self, worker: _Worker) -> Executor:
+        if not self.processes:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix='rosys.process_pool')
+            return self._threads
+        if worker.executor is None:
+            # NOTE: workers have to share the resource tracker of this process;
+            # otherwise their own tracker would unlink the shared memory they attached to when they exit
+            resource_tracker.ensure_running()
+            worker.executor = ProcessPoolExecutor(max_workers=1)
+        return worker.executor
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[[], None]) -> None:
+    if not loop.is_closed():
+        loop.call_soon_threadsafe(callback)
+
+
+def cached(key: Hashable, factory: Callable[[], R]) -> R:
+    """Return the value stored under the key in the current worker process or create and store it."""
+    if key in _worker_cache:
+        _worker_cache.move_to_end(key)
+        return _worker_cache[key]
+    value = _worker_cache[key] = factory()
+    while len(_worker_cache) > MAX_CACHED_STATES:
+        _worker_cache.popitem(last=False)
+    return value
+
+
+def _resolve(arg: Any) -> Any:
+    if isinstance(arg, WorkerState):
+        return cached(arg.key, lambda: arg.value)
+    if isinstance(arg, _StateRef):
+        if arg.key not in _worker_cache:
+            raise MissingWorkerStateError(arg.key)
+        _worker_cache.move_to_end(arg.key)
+        return _worker_cache[arg.key]
+    return arg
+
+
+def _call(callback: Callable[..., R], args: tuple, kwargs: dict[str, Any]) -> tuple[R, float]:
+    args = tuple(_resolve(arg) for arg in args)
+    kwargs = {key: _resolve(value) for key, value in kwargs.items()}
+    start = time.perf_counter()
+    result = safe_callback(callback, *args, **kwargs)
+    return result, time.perf_counter() - start
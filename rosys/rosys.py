@@ -11,20 +11,24 @@ from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from typing import Any, ClassVar, Literal
 
-import numpy as np
-import psutil
 from nicegui import Client, app, background_tasks, ui
 
 from . import core, event, helpers, run
+from .clock import Clock
 from .config import Config
+from .gc_controller import GcController
 from .geometry.frame3d_registry import frame_registry
 from .helpers import invoke, is_stopping
 from .persistence import Persistable
+from .scheduler import RepeaterStats, Scheduler
 
 warnings.filterwarnings('once', category=DeprecationWarning, module='rosys')
 
 log = logging.getLogger('rosys.core')
 
+GC_INTERVAL = 0.1
+"""interval in which the gc_controller looks for garbage to collect (in seconds)"""
+
 translator: Any | None = None
 
 core.is_test = is_test = helpers.is_test()
@@ -100,27 +104,23 @@ def time() -> float:
 def set_time(value: float) -> None:
     assert is_test, 'only tests can change the time'
     _state.time = value
+    clock.update()
 
 
 def uptime() -> float:
     return time() - _state.start_time
 
 
+clock = Clock(manual_time=time if is_test else None)
+scheduler = Scheduler(clock)
+gc_controller = GcController(scheduler)
+
+
 async def sleep(seconds: float) -> None:
-    if is_test:
-        sleep_end_time = time() + seconds
-        while time() <= sleep_end_time:
-            await asyncio.sleep(0)
-    else:
-        if config.simulation_speed <= 0:
-            config.simulation_speed = 0.01
-        scaled_seconds = seconds / config.simulation_speed
-        count = int(np.ceil(scaled_seconds))
-        if count > 0:
-            for _ in range(count):
-                await asyncio.sleep(scaled_seconds / count)
-        else:
-            await asyncio.sleep(0)
+    if seconds <= 0 and not is_test:
+        await asyncio.sleep(0)
+        return
+    await clock.sleep(seconds)
 
 
 def _run_handler(handler: Callable) -> None:
@@ -137,63 +137,117 @@ class Repeater:
 
     def __init__(self, handler: Callable, interval: float) -> None:
         self.handler = handler
-        self.interval = interval
+        self._interval = interval
         self._task: asyncio.Task | None = None
+        self._running = False
+        self.not_before = 0.0
+        self.stats = RepeaterStats()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: float) -> None:
+        if value == self._interval:
+            return
+        if self._running:
+            scheduler.remove(self)
+            self._interval = value
+            scheduler.add(self)
+        else:
+            self._interval = value
 
     def start(self) -> None:
         if self.running:
             return
         if _state.startup_finished:
-            self._task = background_tasks.create(self._repeat())
-            self.tasks.add(self._task)
+            self._running = True
+            scheduler.add(self)  # NOTE: the first execution is delayed by one interval
         elif self.start not in startup_handlers:
             startup_handlers.append(self.start)
 
-    async def _repeat(self) -> None:
-        await sleep(self.interval)  # NOTE delaying first execution so not all actors rush in at the same time
-        while True:
-            start = time()
-            try:
-                if is_stopping():
-                    log.info('%s must be stopped', self.handler)
-                    break
-                await invoke(self.handler)
-                dt = time() - start
-            except (asyncio.CancelledError, GeneratorExit):
-                return
-            except Exception:
-                dt = time() - start
-                log.exception('error in "%s"', self.handler.__qualname__)
-                if self.interval == 0 and dt < 0.1:
-                    delay = 0.1 - dt
-                    log.warning(
-                        f'"{self.handler.__qualname__}" would be called to frequently ' +
-                        f'because it only took {dt*1000:.0f} ms; ' +
-                        f'delaying this step for {delay*1000:.0f} ms')
-                    await sleep(delay)
-            try:
-                await sleep(self.interval - dt)
-            except (asyncio.CancelledError, GeneratorExit):
-                return
+    @property
+    def busy(self) -> bool:
+        """Whether an async handler call is still in progress."""
+        return self._task is not None
+
+    def fire(self, deadline: float, now: float) -> None:
+        """Call the handler (invoked by the scheduler when the deadline is due)."""
+        if is_stopping():
+            log.info('%s must be stopped', self.handler)
+            self.stop()
+            return
+        self.stats.record_start(max(now - deadline, 0.0))
+        start = pytime.perf_counter()
+        try:
+            result = self.handler()
+        except Exception:
+            self._handle_error(pytime.perf_counter() - start)
+            return
+        if not isinstance(result, Awaitable):
+            self.stats.record_duration(pytime.perf_counter() - start)
+            return
+        task = result if isinstance(result, asyncio.Task) else asyncio.ensure_future(result)
+        self._task = task
+        self.tasks.add(task)
+        task.add_done_callback(lambda t: self._finish(t, start))
+
+    def skip(self) -> None:
+        """Count a deadline which was missed because the previous call is still running."""
+        self.stats.overruns += 1
+
+    def _finish(self, task: asyncio.Task, start: float) -> None:
+        self.tasks.discard(task)
+        if self._task is task:
+            self._task = None
+        if task.cancelled():
+            return
+        dt = pytime.perf_counter() - start
+        exception = task.exception()
+        if exception is not None:
+            self._handle_error(dt, exception)
+        else:
+            self.stats.record_duration(dt)
+        if self._running:
+            scheduler.notify_idle(self)
+
+    def _handle_error(self, dt: float, exception: BaseException | bool = True) -> None:
+        self.stats.errors += 1
+        self.stats.record_duration(dt)
+        log.exception('error in "%s"', self.handler.__qualname__, exc_info=exception)
+        if self.interval == 0 and dt < 0.1:
+            delay = 0.1 - dt
+            log.warning(
+                f'"{self.handler.__qualname__}" would be called to frequently ' +
+                f'because it only took {dt*1000:.0f} ms; ' +
+                f'delaying this step for {delay*1000:.0f} ms')
+            self.not_before = clock.now() + delay
 
     def stop(self) -> None:
-        if not self._task:
+        if not self._running:
             return
-
-        if not self._task.done():
-            self._task.cancel()
-
-        self.tasks.remove(self._task)
-        self._task = None
+        self._running = False
+        scheduler.remove(self)
+        if self._task is not None:
+            if not self._task.done():
+                self._task.cancel()
+            self.tasks.discard(self._task)
+            self._task = None
 
     @property
     def running(self) -> bool:
-        return self._task is not None and not self._task.done()
+        return self._running
 
     @staticmethod
     def stop_all() -> None:
-        for repeater in Repeater.tasks:
-            repeater.cancel()
+        for job in scheduler.jobs:
+            if isinstance(job, Repeater):
+                job.stop()
+        for task in list(Repeater.tasks):
+            task.cancel()
+        Repeater.tasks.clear()
+        scheduler.stop()
 
 
 def on_repeat(handler: Callable, interval: float) -> Repeater:
@@ -229,24 +283,12 @@ async def startup() -> None:
         await coroutine
 
 
-async def _garbage_collection() -> None:
-    if psutil.virtual_memory().free < config.garbage_collection_mbyte_limit * 1_000_000:
-        log.warning('less than %s mb of memory remaining -> start garbage collection',
-                    config.garbage_collection_mbyte_limit)
-        gc.collect()
-        await sleep(1)  # NOTE ensure all warnings appear before sending "finished" message
-        log.warning('finished garbage collection')
+def _collect_garbage() -> None:
+    gc_controller.step(memory_limit_mbyte=config.garbage_collection_mbyte_limit)
 
 
-async def _watch_emitted_events() -> None:
-    try:
-        for task in event.tasks:
-            if task.done() and task.exception():
-                _state.exception = task.exception()
-                log.exception('task failed to execute', exc_info=task.exception())
-        event.tasks = [t for t in event.tasks if not t.done()]
-    except Exception:
-        log.exception('failed to watch emitted events')
+def _handle_emitted_exception(exception: BaseException) -> None:
+    _state.exception = exception
 
 
 async def shutdown() -> None:
@@ -280,23 +322,25 @@ def reset_before_test() -> None:
 
 def reset_after_test() -> None:
     assert is_test
+    clock.clear()
     startup_handlers.clear()
     tasks.clear()
     _state.startup_finished = False
     shutdown_handlers.clear()
     event.reset()
     frame_registry.clear()
+    gc_controller.clear()
 
     Persistable.instances.clear()
     register_base_startup_handlers()
 
 
 def register_base_startup_handlers() -> None:
-    on_repeat(_garbage_collection, 60)
-    on_repeat(_watch_emitted_events, 0.1)
+    on_repeat(_collect_garbage, GC_INTERVAL)
 
 
-gc.disable()  # NOTE disable automatic garbage collection to optimize performance
+event.exception_handlers.append(_handle_emitted_exception)
+gc.disable()  # NOTE: automatic garbage collection is replaced by the gc_controller which uses idle slots
 register_base_startup_handlers()
 
 app.on_startup(startup)
@@ -307,3 +351,5 @@ core.on_startup = on_startup
 core.on_shutdown = on_shutdown
 
 config = Config().persistent()
+clock.set_speed(config.simulation_speed)
+config.SIMULATION_SPEED_CHANGED.register(clock.set_speed)
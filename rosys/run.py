@@ -1,11 +1,12 @@
 import asyncio
 import logging
 import os
+import re
 import shlex
 import signal
-import subprocess
-import uuid
-from collections.abc import Callable, Generator
+import time
+import warnings
+from collections.abc import AsyncGenerator, Callable, Generator, Hashable
 from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import wraps
@@ -13,18 +14,48 @@ from inspect import signature
 from pathlib import Path
 from typing import Any, ParamSpec, TypeVar
 
+import numpy as np
 from nicegui import run
 
-from .helpers import is_stopping
+from .cpu_accounting import CpuAccounting
+from .helpers import is_stopping, is_test
+from .process_pool import ProcessPool
+from .shared_ring_buffer import SharedRingBuffer, SharedSlot
 
 P = ParamSpec('P')
 R = TypeVar('R')
 
-running_cpu_bound_processes: list[str] = []  # NOTE is used in tests to advance time slower until computation is done
-running_sh_processes: list[subprocess.Popen] = []
+running_sh_processes: list[asyncio.subprocess.Process] = []
+MAX_SH_PROCESSES = 8
+SH_CHUNK_SIZE = 65536
+LINE_BREAK = re.compile(rb'\r\n|\r|\n')
 log = logging.getLogger('rosys.run')
 
 
+class _state:
+    sh_limit: int = MAX_SH_PROCESSES
+    sh_semaphore: asyncio.Semaphore | None = None
+    sh_loop: asyncio.AbstractEventLoop | None = None
+
+
+process_pool = ProcessPool(processes=not is_test())
+"""the pool of worker processes used by ``cpu_bound`` (in tests the calls run in threads)"""
+
+shared_buffer = SharedRingBuffer()
+"""the shared memory used by ``cpu_bound_shared`` to exchange data with the worker processes"""
+
+cpu_accounting = CpuAccounting()
+"""counts, times and limits CPU-bound calls (the in-flight counter is used in tests to advance time slower)"""
+
+
+def __getattr__(name: str) -> Any:
+    if name == 'running_cpu_bound_processes':
+        warnings.warn('"run.running_cpu_bound_processes" is deprecated and will be removed in a future version; '
+                      'use "run.cpu_accounting.in_flight" instead.', category=DeprecationWarning, stacklevel=2)
+        return ['cpu_bound'] * cpu_accounting.in_flight
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 async def io_bound(callback: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R | None:
     if is_stopping():
         return None
@@ -47,27 +78,131 @@ def awaitable(func: Callable) -> Callable:
 
 
 async def cpu_bound(callback: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R | None:
-    if is_stopping():
+    """Run a CPU-bound function in a worker process of the RoSys process pool."""
+    return await _cpu_bound(callback, args, kwargs, affinity=None, category='default', callsite=_callsite(callback))
+
+
+async def cpu_bound_with_affinity(affinity: Hashable,
+                                  callback: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R | None:
+    """Run a CPU-bound function on the worker process which is assigned to the affinity key (e.g. a camera ID).
+
+    This way the worker can reuse its cached state (see ``rosys.process_pool.WorkerState``) for subsequent calls.
+    """
+    return await _cpu_bound(callback, args, kwargs,
+                            affinity=affinity, category='default', callsite=_callsite(callback))
+
+
+async def cpu_bound_shared(affinity: Hashable | None,
+                           callback: Callable[..., bytes | None],
+                           data: bytes | np.ndarray,
+                           *args: Any,
+                           category: str = 'default') -> bytes | None:
+    """Run a CPU-bound function which turns data into bytes (like encoding an image) in a worker process.
+
+    The data and the result are exchanged via the ``shared_buffer`` instead of being pickled.
+    The callback receives a ``memoryview`` of the bytes (or an array of the same shape and dtype) as first argument.
+    If the data does not fit or all slots are in use, the data is passed as usual.
+
+    :param category: category for limiting the number of concurrent calls (see ``cpu_accounting.set_limit``)
+    """
+    callsite = _callsite(callback)
+    if isinstance(data, np.ndarray):
+        data = np.ascontiguousarray(data)
+    source = shared_buffer.write(data)
+    target = shared_buffer.acquire() if source is not None else None
+    if source is None or target is None:
+        if source is not None:
+            shared_buffer.release(source)
+        return await _cpu_bound(callback, (data, *args), {}, affinity=affinity, category=category, callsite=callsite)
+    shape, dtype = (data.shape, data.dtype.str) if isinstance(data, np.ndarray) else (None, None)
+    worker_done = abandoned = False
+
+    def release() -> None:
+        shared_buffer.release(source)
+        shared_buffer.release(target)
+
+    def on_finished() -> None:
+        nonlocal worker_done
+        worker_done = True
+        if abandoned:
+            release()
+
+    try:
+        result = await _cpu_bound(_call_with_shared_memory, (callback, source, target, shape, dtype, *args), {},
+                                  affinity=affinity, category=category, callsite=callsite, on_finished=on_finished)
+        return result.to_bytes() if isinstance(result, SharedSlot) else result
+    finally:
+        if worker_done:
+            release()
+        else:
+            abandoned = True  # NOTE: the cancelled call is still running in the worker, which releases the slots when done
+
+
+def _call_with_shared_memory(callback: Callable[..., bytes | None],
+                             source: SharedSlot,
+                             target: SharedSlot,
+                             shape: tuple[int, ...] | None,
+                             dtype: str | None,
+                             *args: Any) -> SharedSlot | bytes | None:
+    data: memoryview | np.ndarray = source.view()
+    if shape is not None:
+        data = np.frombuffer(data, dtype=dtype).reshape(shape)
+    result = callback(data, *args)
+    if result is None or len(result) > target.capacity:
+        return result
+    return target.write(result)
+
+
+async def _cpu_bound(callback: Callable[..., R], args: tuple, kwargs: dict, *,
+                     affinity: Hashable | None,
+                     category: str,
+                     callsite: str,
+                     on_finished: Callable[[], None] | None = None) -> R | None:
+    """Run the callback in the process pool (see ``ProcessPool.run_timed`` for ``on_finished``)."""
+    handed_over = False
+    try:
+        if is_stopping():
+            return None
+        with cpu():
+            try:
+                submitted = time.perf_counter()
+                async with cpu_accounting.limit(category):
+                    handed_over = True
+                    result, execution = await process_pool.run_timed(callback, args, kwargs,
+                                                                     affinity=affinity, on_finished=on_finished)
+                cpu_accounting.record(callsite, category,
+                                      queue_wait=max(time.perf_counter() - submitted - execution, 0.0),
+                                      execution=execution)
+                return result
+            except RuntimeError as e:
+                if 'cannot schedule new futures after shutdown' not in str(e):
+                    raise
+            except asyncio.exceptions.CancelledError:
+                pass
         return None
-    with cpu():
-        try:
-            return await run.cpu_bound(callback, *args, **kwargs)
-        except RuntimeError as e:
-            if 'cannot schedule new futures after shutdown' not in str(e):
-                raise
-        except asyncio.exceptions.CancelledError:
-            pass
-    return None
+    finally:
+        if not handed_over and on_finished is not None:
+            on_finished()  # NOTE: the call never reached the pool
+
+
+def _callsite(callback: Callable) -> str:
+    return f'{getattr(callback, "__module__", None)}.{getattr(callback, "__qualname__", repr(callback))}'
 
 
 @contextmanager
-def cpu() -> Generator[None, None, None]:
-    id_ = str(uuid.uuid4())
-    running_cpu_bound_processes.append(id_)
+def cpu(callsite: str | None = None, category: str = 'default') -> Generator[None, None, None]:
+    """Mark CPU-bound work which is done outside of the process pool (e.g. in a dedicated process).
+
+    If a callsite is given, the duration is recorded as its execution time.
+    """
+    cpu_accounting.in_flight += 1
+    start = time.perf_counter()
     try:
         yield
     finally:
-        running_cpu_bound_processes.remove(id_)
+        cpu_accounting.in_flight -= 1
+        if callsite is not None:
+            cpu_accounting.record(callsite, category, queue_wait=0.0, execution=time.perf_counter() - start)
 
 
 async def sh(command: list[str] | str, *,
@@ -78,72 +213,152 @@ async def sh(command: list[str] | str, *,
 
     Args:
         command: a sequence of program arguments as subprocess.Popen requires or full string
+        timeout: maximum time in seconds after which the command's process group is killed (default is 1 s, `None` for no limit)
         shell: whether a subshell should be launched (default is `False`, for speed, use `True` if you need file globbing or other features)
+        working_dir: the working directory of the command
 
     Returns:
-        stdout
+        stdout (or stderr if the command failed; empty if it could not be executed or timed out)
     """
-    def popen() -> str:
-        cmd_list = command if isinstance(command, list) else shlex.split(command)
-        if timeout is not None:
-            cmd_list = ['timeout', '--signal=SIGTERM', str(timeout), *cmd_list]
-        cmd = ' '.join(cmd_list) if shell else cmd_list
+    if is_stopping():
+        return ''
+    async with _sh_semaphore():
         try:
-            with subprocess.Popen(
-                cmd,
-                cwd=working_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                shell=shell,
-                start_new_session=True,
-            ) as proc:
-                running_sh_processes.append(proc)
-                stdout, stderr = proc.communicate()
-                assert proc.stdout is not None
-                assert proc.stderr is not None
-                proc.stdout.close()
-                proc.stderr.close()
-                _kill(proc)
-                running_sh_processes.remove(proc)
-                return stdout.decode('utf-8') if proc.returncode == 0 else stderr.decode('utf-8')
+            proc = await _create_process(command, shell=shell, working_dir=working_dir, stderr=asyncio.subprocess.PIPE)
         except Exception:
-            log.exception('failed to run command "%s"', cmd)
-            if 'proc' in locals() and proc:
-                _kill(proc)
+            log.exception('failed to run command "%s"', command)
             return ''
+        running_sh_processes.append(proc)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except TimeoutError:
+            log.warning('Command "%s" timed out after %s seconds.', command, timeout)
+            await _kill(proc)
+            return ''
+        except BaseException:
+            await _kill(proc)
+            raise
+        finally:
+            running_sh_processes.remove(proc)
+        _signal_group(proc, signal.SIGTERM)  # NOTE: stop children which might have been left behind
+        return stdout.decode('utf-8') if proc.returncode == 0 else stderr.decode('utf-8')
+
 
+async def sh_lines(command: list[str] | str, *,
+                   timeout: float | None = None,
+                   shell: bool = False,
+                   working_dir: Path | None = None) -> AsyncGenerator[str, None]:
+    """executes a shell command and yields its output line by line while it is running
+
+    Stdout and stderr are combined.
+    Lines may end with "\\n", "\\r\\n" or "\\r" (like the progress output of ffmpeg) and may be arbitrarily long.
+    When the iteration is stopped early or the timeout (default is `None`, i.e. no limit) is exceeded,
+    the command's process group is killed.
+    Use `contextlib.aclosing` when breaking out of the loop to kill it right away instead of on garbage collection.
+    """
     if is_stopping():
-        return ''
+        return
+    deadline = None if timeout is None else time.monotonic() + timeout
+    async with _sh_semaphore():
+        try:
+            proc = await _create_process(command, shell=shell, working_dir=working_dir, stderr=asyncio.subprocess.STDOUT)
+        except Exception:
+            log.exception('failed to run command "%s"', command)
+            return
+        assert proc.stdout is not None
+        running_sh_processes.append(proc)
+        buffer = b''
+        try:
+            while True:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    chunk = await asyncio.wait_for(proc.stdout.read(SH_CHUNK_SIZE), remaining)
+                except TimeoutError:
+                    log.warning('Command "%s" timed out after %s seconds.', command, timeout)
+                    break
+                if not chunk:
+                    if buffer.rstrip(b'\r'):
+                        yield buffer.rstrip(b'\r').decode('utf-8', errors='replace')
+                    break
+                buffer += chunk
+                # NOTE: a trailing "\r" stays in the buffer because it might be the first half of "\r\n"
+                pending = b'\r' if buffer.endswith(b'\r') else b''
+                *lines, buffer = LINE_BREAK.split(buffer[:len(buffer) - len(pending)])
+                buffer += pending
+                for line in lines:
+                    yield line.decode('utf-8', errors='replace')
+        finally:
+            await _kill(proc)
+            running_sh_processes.remove(proc)
+
+
+async def _create_process(command: list[str] | str, *,
+                          shell: bool,
+                          working_dir: Path | None,
+                          stderr: int) -> asyncio.subprocess.Process:
+    if shell:
+        cmd = command if isinstance(command, str) else ' '.join(command)
+        return await asyncio.create_subprocess_shell(cmd,
+                                                     cwd=working_dir,
+                                                     stdout=asyncio.subprocess.PIPE,
+                                                     stderr=stderr,
+                                                     start_new_session=True)
+    cmd_list = command if isinstance(command, list) else shlex.split(command)
+    return await asyncio.create_subprocess_exec(*cmd_list,
+                                                cwd=working_dir,
+                                                stdout=asyncio.subprocess.PIPE,
+                                                stderr=stderr,
+                                                start_new_session=True)
+
+
+def set_sh_limit(limit: int) -> None:
+    """Set the maximum number of shell commands which are executed at the same time."""
+    _state.sh_limit = limit
+    _state.sh_semaphore = None
+
+
+def _sh_semaphore() -> asyncio.Semaphore:
+    # NOTE: semaphores are bound to the loop they are first used on, so a new one is created for each new loop
+    loop = asyncio.get_running_loop()
+    if _state.sh_semaphore is None or _state.sh_loop is not loop:
+        _state.sh_semaphore = asyncio.Semaphore(_state.sh_limit)
+        _state.sh_loop = loop
+    return _state.sh_semaphore
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is not None:
+        _signal_group(proc, signal.SIGTERM)
+        return
+    if not _signal_group(proc, signal.SIGTERM):
+        return
+    log.info('sent SIGTERM to %s', proc.pid)
     try:
-        async def popen_coro() -> str:
-            return await io_bound(popen) or ''
-        return await asyncio.wait_for(popen_coro(), timeout)
+        await asyncio.wait_for(proc.wait(), 5)
     except TimeoutError:
-        log.warning('Command "%s" timed out after %s seconds.', command, timeout)
-        return ''
+        _signal_group(proc, signal.SIGKILL)  # force kill if process didn't terminate
+        log.info('sent SIGKILL to %s', proc.pid)
+        await proc.wait()  # ensure the process is reaped
 
 
-def _kill(proc: subprocess.Popen) -> None:
+def _signal_group(proc: asyncio.subprocess.Process, sig: signal.Signals) -> bool:
     try:
-        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-        log.info('sent SIGTERM to %s', proc.pid)
-        try:
-            proc.wait(timeout=5)  # wait for 5 seconds
-        except subprocess.TimeoutExpired:
-            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)  # force kill if process didn't terminate
-            log.info('sent SIGKILL to %s', proc.pid)
-            proc.wait()  # ensure the process is reaped
+        os.killpg(proc.pid, sig)  # NOTE: the process is the leader of its own session and therefore of its group
+        return True
     except ProcessLookupError:
-        pass
+        return False
     except Exception:
-        log.exception('Failed to kill and/or wait for process %s', proc.pid)
+        log.exception('Failed to send %s to process group %s', sig.name, proc.pid)
+        return False
 
 
 def tear_down() -> None:
     log.info('teardown shell processes...')
     for process in running_sh_processes:
-        _kill(process)
+        _signal_group(process, signal.SIGKILL)
     running_sh_processes.clear()
+    process_pool.shutdown()
+    shared_buffer.close()
     log.info('teardown complete.')
 
 
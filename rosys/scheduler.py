@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    from .clock import Clock
+
+log = logging.getLogger('rosys.scheduler')
+
+
+class Job(Protocol):
+    interval: float
+    not_before: float
+
+    @property
+    def busy(self) -> bool: ...
+
+    def fire(self, deadline: float, now: float) -> None: ...
+
+    def skip(self) -> None: ...
+
+
+@dataclass(slots=True, kw_only=True)
+class RepeaterStats:
+    calls: int = 0
+    """number of completed handler calls"""
+    errors: int = 0
+    """number of handler calls which raised an exception"""
+    overruns: int = 0
+    """number of deadlines which were skipped because the previous call was still running"""
+    last_duration: float = 0.0
+    """duration of the last handler call (in seconds)"""
+    max_duration: float = 0.0
+    """longest duration of a handler call (in seconds)"""
+    last_jitter: float = 0.0
+    """delay between the deadline and the actual start of the last call (in seconds)"""
+    max_jitter: float = 0.0
+    """largest delay between a deadline and the actual start of a call (in seconds)"""
+
+    def record_start(self, jitter: float) -> None:
+        self.last_jitter = jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+
+    def record_duration(self, duration: float) -> None:
+        self.calls += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+
+
+@dataclass(slots=True, eq=False)
+class _Group:
+    interval: float
+    deadline: float = math.inf
+    jobs: list[Job] = field(default_factory=list)
+    scheduled: bool = False
+
+
+class TimerWheel:
+    """A hashed timer wheel which sorts groups into slots according to the tick of their deadline.
+
+    Adding and removing is O(1); finding due groups only touches the slots of ticks which have passed.
+    Groups with deadlines beyond one revolution share slots with earlier ones and are skipped until their time has come.
+    """
+
+    def __init__(self, *, resolution: float = 0.01, size: int = 256) -> None:
+        self.resolution = resolution
+        self.slots: list[list[_Group]] = [[] for _ in range(size)]
+        self.count = 0
+        self._tick = 0
+
+    def add(self, group: _Group) -> None:
+        tick = max(self._to_tick(group.deadline), self._tick)  # NOTE: overdue groups go into the current slot
+        self.slots[tick % len(self.slots)].append(group)
+        self.count += 1
+
+    def remove(self, group: _Group) -> None:
+        tick = max(self._to_tick(group.deadline), self._tick)
+        slot = self.slots[tick % len(self.slots)]
+        if group in slot:
+            slot.remove(group)
+        else:  # NOTE: the group might have been added while its deadline was overdue
+            for slot in self.slots:
+                if group in slot:
+                    slot.remove(group)
+                    break
+            else:
+                return
+        self.count -= 1
+
+    def pop_due(self, now: float) -> list[_Group]:
+        """Remove and return all groups with a deadline up to ``now``, ordered by deadline."""
+        now_tick = self._to_tick(now)
+        first_tick = min(self._tick, now_tick)
+        due: list[_Group] = []
+        if self.count:
+            for tick in range(first_tick, min(now_tick, first_tick + len(self.slots) - 1) + 1):
+                slot = self.slots[tick % len(self.slots)]
+                if not slot:
+                    continue
+                remaining = [group for group in slot if group.deadline > now]
+                if len(remaining) < len(slot):
+                    due.extend(group for group in slot if group.deadline <= now)
+                    slot[:] = remaining
+        self.count -= len(due)
+        self._tick = now_tick
+        due.sort(key=lambda group: group.deadline)
+        return due
+
+    def next_deadline(self) -> float | None:
+        """Return the earliest deadline of all groups in the wheel or ``None`` if the wheel is empty."""
+        if not self.count:
+            return None
+        horizon = (self._tick + len(self.slots)) * self.resolution
+        for tick in range(self._tick, self._tick + len(self.slots)):
+            deadlines = [group.deadline for group in self.slots[tick % len(self.slots)] if group.deadline < horizon]
+            if deadlines:
+                return min(deadlines)
+        return min(group.deadline for slot in self.slots for group in slot)
+
+    def clear(self) -> None:
+        for slot in self.slots:
+            slot.clear()
+        self.count = 0
+        self._tick = 0
+
+    def _to_tick(self, t: float) -> int:
+        return int(t // self.resolution) if math.isfinite(t) else 0
+
+
+class Scheduler:
+    """Drives all repeaters from a single task.
+
+    Repeaters with the same interval are coalesced into one group which is woken up together.
+    Deadlines advance by the interval (instead of "now + interval") so that there is no drift over time.
+
+    The scheduler sleeps on the given clock until the earliest deadline of all groups.
+    """
+
+    def __init__(self, clock: Clock) -> None:
+        self.clock = clock
+        self.wheel = TimerWheel()
+        self.groups: dict[float, _Group] = {}
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Future | None = None
+        self._wakeup_deadline = math.inf
+        self._pending = 0
+
+    @property
+    def jobs(self) -> list[Job]:
+        return [job for group in self.groups.values() for job in group.jobs]
+
+    def add(self, job: Job) -> None:
+        """Add a job which will be fired for the first time after one interval."""
+        group = self.groups.get(job.interval)
+        if group is None:
+            group = self.groups[job.interval] = _Group(job.interval)
+        job.not_before = self.clock.now() + job.interval
+        group.jobs.append(job)
+        if not group.scheduled:
+            self._schedule(group, job.not_before)
+        self._ensure_running()
+
+    def remove(self, job: Job) -> None:
+        group = self.groups.get(job.interval)
+        if group is None or job not in group.jobs:
+            return
+        group.jobs.remove(job)
+        if not group.jobs:
+            if group.scheduled:
+                self.wheel.remove(group)
+            del self.groups[group.interval]
+
+    def slack(self) -> float:
+        """Time until the next deadline (in seconds); zero while due groups are still waiting to be fired."""
+        if self._pending:
+            return 0.0
+        deadline = self.wheel.next_deadline()
+        return math.inf if deadline is None else max(deadline - self.clock.now(), 0.0)
+
+    def notify_idle(self, job: Job) -> None:
+        """Wake up the group of a job which was parked because all its jobs were busy."""
+        group = self.groups.get(job.interval)
+        if group is not None and not group.scheduled:
+            self._schedule(group, max(self.clock.now(), job.not_before))
+
+    def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._wakeup = None
+        self.wheel.clear()
+        self.groups.clear()
+        self._pending = 0
+
+    def _schedule(self, group: _Group, deadline: float) -> None:
+        group.deadline = deadline
+        group.scheduled = True
+        self.wheel.add(group)
+        if self._wakeup is not None and not self._wakeup.done() and deadline < self._wakeup_deadline:
+            self._wakeup.set_result(None)  # NOTE: the scheduler is sleeping until a later deadline
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name='rosys.scheduler')
+
+    async def _run(self) -> None:
+        while True:
+            now = self.clock.now()
+            due = self.wheel.pop_due(now)
+            self._pending = len(due)
+            for group in due:
+                self._pending -= 1
+                group.scheduled = False
+                self._fire(group, now)
+            try:
+                await self._wait(self.wheel.next_deadline())
+            except asyncio.CancelledError:
+                return
+
+    def _fire(self, group: _Group, now: float) -> None:
+        for job in list(group.jobs):
+            if job.busy:
+                if group.interval > 0:
+                    job.skip()
+                continue
+            if now < job.not_before:
+                continue
+            try:
+                job.fire(group.deadline, now)
+            except Exception:
+                log.exception('failed to fire %s', job)
+        if not group.jobs or self.groups.get(group.interval) is not group:
+            return
+        if group.interval > 0:
+            deadline = group.deadline + group.interval
+            if deadline <= now:  # NOTE: skip missed deadlines instead of firing them in a burst
+                deadline += math.ceil((now - deadline) / group.interval) * group.interval
+            self._schedule(group, deadline)
+        else:
+            idle_jobs = [job for job in group.jobs if not job.busy]
+            if idle_jobs:  # NOTE: otherwise the group is parked until a job becomes idle
+                self._schedule(group, max(now, min(job.not_before for job in idle_jobs)))
+
+    async def _wait(self, deadline: float | None) -> None:
+        self._wakeup = asyncio.get_running_loop().create_future()
+        self._wakeup_deadline = math.inf if deadline is None else deadline
+        if deadline is not None:
+            self.clock.wake_at(deadline, self._wakeup)
+        try:
+            await self._wakeup
+        finally:
+            self._wakeup = None
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from dataclasses import dataclass, replace
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+log = logging.getLogger('rosys.shared_ring_buffer')
+
+_attached: dict[str, SharedMemory] = {}  # NOTE: shared memory blocks opened by this process (kept open for reuse)
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class SharedSlot:
+    """Handle to a slot of a ``SharedRingBuffer``.
+
+    It can be passed to worker processes instead of the data itself.
+    """
+    buffer_name: str
+    index: int
+    capacity: int
+    length: int = 0
+
+    def view(self) -> memoryview:
+        """Return a zero-copy view of the data in the slot (valid until the slot is released)."""
+        start = self.index * self.capacity
+        return _attach(self.buffer_name)[start:start + self.length]
+
+    def write(self, data: Any) -> SharedSlot:
+        """Copy bytes-like data (or a contiguous array) into the slot and return a handle with the new length."""
+        source = memoryview(data).cast('B')
+        if source.nbytes > self.capacity:
+            raise ValueError(f'{source.nbytes} bytes do not fit into a slot of {self.capacity} bytes')
+        start = self.index * self.capacity
+        _attach(self.buffer_name)[start:start + source.nbytes] = source
+        return replace(self, length=source.nbytes)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.view())
+
+
+class SharedRingBuffer:
+    """A block of shared memory divided into fixed-size slots which are handed out in turn.
+
+    A slot stays reserved until it is released, so data cannot be overwritten while a worker is still reading it.
+    The shared memory is only allocated when the first slot is acquired.
+
+    :param num_slots: number of slots
+    :param slot_size: capacity of each slot in bytes
+    """
+
+    def __init__(self, *, num_slots: int = 16, slot_size: int = 4_000_000) -> None:
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self._memory: SharedMemory | None = None
+        self._free: deque[int] = deque(range(num_slots))
+
+    @property
+    def num_free_slots(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> SharedSlot | None:
+        """Reserve an empty slot or return ``None`` if all slots are in use."""
+        if not self._free:
+            return None
+        if self._memory is None:
+            self._memory = SharedMemory(create=True, size=self.num_slots * self.slot_size)
+            _attached[self._memory.name] = self._memory
+        return SharedSlot(buffer_name=self._memory.name, index=self._free.popleft(), capacity=self.slot_size)
+
+    def write(self, data: Any) -> SharedSlot | None:
+        """Copy the data into a reserved slot or return ``None`` if it does not fit or all slots are in use."""
+        if memoryview(data).nbytes > self.slot_size:
+            return None
+        slot = self.acquire()
+        return None if slot is None else slot.write(data)
+
+    def release(self, slot: SharedSlot) -> None:
+        if self._memory is not None and slot.buffer_name == self._memory.name and slot.index not in self._free:
+            self._free.append(slot.index)
+
+    def close(self) -> None:
+        """Free the shared memory; all slots become invalid."""
+        if self._memory is None:
+            return
+        _attached.pop(self._memory.name, None)
+        try:
+            self._memory.close()
+        except BufferError:
+            log.warning('shared memory is still referenced and will be freed on exit')
+        self._memory.unlink()
+        self._memory = None
+        self._free = deque(range(self.num_slots))
+
+
+def _attach(name: str) -> memoryview:
+    """Return the buffer of the shared memory block with the given name (opening it on first use)."""
+    memory = _attached.get(name)
+    if memory is None:
+        memory = _attached[name] = SharedMemory(name=name)
+    assert memory.buf is not None, f'shared memory {name} has been closed'
+    return memory.buf
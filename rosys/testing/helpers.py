@@ -63,7 +63,7 @@ async def forward(seconds: float | None = None,
     while not condition():
         if rosys.time() > start_time + timeout:
             raise TimeoutError(f'condition took more than {timeout} s')
-        if not run.running_cpu_bound_processes:
+        if not run.cpu_accounting.in_flight:
             rosys.set_time(rosys.time() + dt)
             await asyncio.sleep(0)
         else:
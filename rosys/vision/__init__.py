@@ -1,21 +1,63 @@
-from .calibratable_camera_provider import CalibratableCameraProvider
-from .calibration import Calibration, Intrinsics
-from .camera import CalibratableCamera, Camera, ConfigurableCamera, TransformableCamera
-from .camera_objects_ import CameraObjects as camera_objects
-from .camera_projector import CameraProjector
-from .camera_provider import CameraProvider
-from .camera_scene_object import CameraSceneObject
-from .detections import BoxDetection, Detection, Detections, PointDetection
-from .detector import Autoupload, Detector
-from .detector_hardware import DetectorHardware
-from .detector_simulation import DetectorSimulation, SimulatedObject
-from .image import Image, ImageSize
-from .mjpeg_camera import MjpegCamera, MjpegCameraProvider
-from .multi_camera_provider import MultiCameraProvider
-from .rtsp_camera import RtspCamera, RtspCameraProvider
-from .simulated_camera import SimulatedCalibratableCamera, SimulatedCamera, SimulatedCameraProvider
-from .spatial_resection import SpatialResection, SpatialResectionResult
-from .usb_camera import UsbCamera, UsbCameraProvider
+from typing import TYPE_CHECKING
+
+from ..helpers.lazy_import import lazy_attributes
+
+if TYPE_CHECKING:
+    from .calibratable_camera_provider import CalibratableCameraProvider
+    from .calibration import Calibration, Intrinsics
+    from .camera import CalibratableCamera, Camera, ConfigurableCamera, TransformableCamera
+    from .camera_objects_ import CameraObjects as camera_objects
+    from .camera_projector import CameraProjector
+    from .camera_provider import CameraProvider
+    from .camera_scene_object import CameraSceneObject
+    from .detections import BoxDetection, Detection, Detections, PointDetection
+    from .detector import Autoupload, Detector
+    from .detector_hardware import DetectorHardware
+    from .detector_simulation import DetectorSimulation, SimulatedObject
+    from .image import Image, ImageSize
+    from .mjpeg_camera import MjpegCamera, MjpegCameraProvider
+    from .multi_camera_provider import MultiCameraProvider
+    from .rtsp_camera import RtspCamera, RtspCameraProvider
+    from .simulated_camera import SimulatedCalibratableCamera, SimulatedCamera, SimulatedCameraProvider
+    from .spatial_resection import SpatialResection, SpatialResectionResult
+    from .usb_camera import UsbCamera, UsbCameraProvider
+
+__getattr__, __dir__ = lazy_attributes(__name__, {
+    'Autoupload': '.detector',
+    'BoxDetection': '.detections',
+    'CalibratableCamera': '.camera',
+    'CalibratableCameraProvider': '.calibratable_camera_provider',
+    'Calibration': '.calibration',
+    'Camera': '.camera',
+    'CameraProjector': '.camera_projector',
+    'CameraProvider': '.camera_provider',
+    'CameraSceneObject': '.camera_scene_object',
+    'ConfigurableCamera': '.camera',
+    'Detection': '.detections',
+    'Detections': '.detections',
+    'Detector': '.detector',
+    'DetectorHardware': '.detector_hardware',
+    'DetectorSimulation': '.detector_simulation',
+    'Image': '.image',
+    'ImageSize': '.image',
+    'Intrinsics': '.calibration',
+    'MjpegCamera': '.mjpeg_camera',
+    'MjpegCameraProvider': '.mjpeg_camera',
+    'MultiCameraProvider': '.multi_camera_provider',
+    'PointDetection': '.detections',
+    'RtspCamera': '.rtsp_camera',
+    'RtspCameraProvider': '.rtsp_camera',
+    'SimulatedCalibratableCamera': '.simulated_camera',
+    'SimulatedCamera': '.simulated_camera',
+    'SimulatedCameraProvider': '.simulated_camera',
+    'SimulatedObject': '.detector_simulation',
+    'SpatialResection': '.spatial_resection',
+    'SpatialResectionResult': '.spatial_resection',
+    'TransformableCamera': '.camera',
+    'UsbCamera': '.usb_camera',
+    'UsbCameraProvider': '.usb_camera',
+    'camera_objects': '.camera_objects_:CameraObjects',
+})
 
 __all__ = [
     'Autoupload',
@@ -563,6 +563,31 @@ class Calibration:
 
         return dst
 
+    def get_undistortion_maps(self, *, crop: bool = False) -> tuple[NDArray, NDArray, tuple[int, int, int, int] | None]:
+        """Compute the pixel maps for undistorting images of this camera with ``cv2.remap``.
+
+        Computing the maps is expensive, so they should be reused when undistorting many images.
+        Only pinhole and fisheye cameras are supported.
+
+        :param crop: Whether cropping is applied to the image during undistortion.
+
+        :return: The two maps and the region of interest ``(x, y, width, height)`` to crop the remapped image to (if any).
+        """
+        K = np.array(self.intrinsics.matrix)
+        D = np.array(self.intrinsics.distortion)
+        w, h = self.intrinsics.size.width, self.intrinsics.size.height
+        if self.intrinsics.model == CameraModel.PINHOLE:
+            new_K, roi = cv2.getOptimalNewCameraMatrix(K, D, (w, h), 1, (w, h), centerPrincipalPoint=True)
+            map1, map2 = cv2.initUndistortRectifyMap(K, D, np.eye(3), new_K, (w, h), cv2.CV_16SC2)
+            x, y, roi_width, roi_height = roi
+            return map1, map2, (x, y, roi_width, roi_height) if crop else None
+        if self.intrinsics.model == CameraModel.FISHEYE:
+            new_K = self.get_undistorted_camera_matrix(crop=crop)
+            map1, map2 = cv2.fisheye.initUndistortRectifyMap(  # pylint: disable=unpacking-non-sequence
+                K, D, np.eye(3), new_K, (w, h), cv2.CV_16SC2)
+            return map1, map2, None
+        raise ValueError(f'Undistortion maps are not supported for camera model "{self.intrinsics.model}"')
+
     def get_undistorted_size(self) -> ImageSize:
         """Compute the size of the undistorted image after cropping.
 
@@ -6,7 +6,7 @@ import socketio
 import socketio.exceptions
 
 from .. import persistence, rosys
-from ..helpers import LazyWorker
+from ..helpers import CoalescingExecutor, SupersededError
 from .detections import (
     BoxDetection,
     Category,
@@ -26,6 +26,9 @@ class DetectorHardware(Detector):
     that should be uploaded to the [Zauberzeug Learning Loop](https://zauberzeug.com/products/learning-loop).
 
     Note: Images must be smaller than ``MAX_IMAGE_SIZE`` bytes (default: 10 MB).
+
+    With ``concurrency`` greater than one, multiple detections run at the same time (e.g. for multiple detector replicas).
+    While all of them are busy, only the newest image waits; older ones are dropped and their detection returns ``None``.
     """
     MAX_IMAGE_SIZE = 10 * 1024 * 1024
 
@@ -34,14 +37,15 @@ class DetectorHardware(Detector):
                  host: str = 'localhost',
                  port: int = 8004,
                  name: str | None = None,
-                 auto_disconnect: bool = True) -> None:
+                 auto_disconnect: bool = True,
+                 concurrency: int = 1) -> None:
         super().__init__(name=name)
 
         websocket_options = {
             'max_msg_size': self.MAX_IMAGE_SIZE + 1000,
         }
         self.sio = socketio.AsyncClient(websocket_extra_options=websocket_options)
-        self.lazy_worker = LazyWorker()
+        self.executor = CoalescingExecutor(concurrency)
         self.host = host
         self.port = port
         self.auto_disconnect = auto_disconnect
@@ -138,13 +142,14 @@ class DetectorHardware(Detector):
         assert len(image.data or []) < self.MAX_IMAGE_SIZE, f'image too large: {len(image.data or [])}'
         tags = tags or []
         try:
-            detections = await self.lazy_worker.run(self._detect(image, autoupload, tags, source, creation_date))
-            if detections is not None:
-                image.set_detections(self.name, detections)
-                self.NEW_DETECTIONS.emit(image)
-            return detections
+            detections = await self.executor.run(self._detect(image, autoupload, tags, source, creation_date))
+        except SupersededError:
+            return None
         except asyncio.exceptions.CancelledError:
             raise DetectorException('Detection cancelled') from None
+        image.set_detections(self.name, detections)
+        self.NEW_DETECTIONS.emit(image)
+        return detections
 
     async def _detect(self,
                       image: Image,
@@ -32,10 +32,10 @@ def encode_image_as_jpeg(image: np.ndarray) -> bytes:
     return cv2.imencode('.jpg', image)[1].tobytes()
 
 
-def process_jpeg_image(data: bytes, rotation: ImageRotation, crop: Rectangle | None = None) -> bytes | None:
+def process_jpeg_image(data: bytes | memoryview, rotation: ImageRotation, crop: Rectangle | None = None) -> bytes | None:
     """Rotate and crop a JPEG image."""
     if crop is None and rotation == ImageRotation.NONE:
-        return data
+        return bytes(data)  # NOTE: no copy if data already is a bytes object
     array = np.frombuffer(data, dtype=np.uint8)
     decoded = cv2.imdecode(array, cv2.IMREAD_COLOR)
     if decoded is None:
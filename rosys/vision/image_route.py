@@ -11,7 +11,8 @@ from fastapi import Response
 from nicegui import app
 
 from .. import run
-from .calibration import Calibration
+from ..process_pool import WorkerState, cached
+from .calibration import Calibration, CameraModel
 from .image import Image
 
 if TYPE_CHECKING:
@@ -112,13 +113,18 @@ async def _try_get_jpeg(camera: Camera,
             if shrink == 1 and not undistort and compression == 60:
                 return image.data
 
-            calibration = camera.calibration if undistort else None  # type: ignore
-            return await run.cpu_bound(_process, image.data, calibration, shrink, undistort, fast, compression)
+            calibration: Calibration | None = camera.calibration if undistort else None  # type: ignore
+            calibration_state = None if calibration is None else WorkerState(
+                key=('intrinsics', repr(calibration.intrinsics)),
+                value=Calibration(intrinsics=calibration.intrinsics),
+            )  # NOTE: only the intrinsics are needed, so changing extrinsics do not invalidate the worker's state
+            return await run.cpu_bound_shared(camera.id, _process, image.data, calibration_state,
+                                              shrink, undistort, fast, compression, category='camera')
 
     return None
 
 
-def _process(data: bytes,
+def _process(data: bytes | memoryview,
              calibration: Calibration | None,
              shrink: float,
              undistort: bool,
@@ -131,7 +137,7 @@ def _process(data: bytes,
 
     if undistort:
         assert calibration is not None
-        image_array = calibration.undistort_image(image_array, crop=True)
+        image_array = _undistort(calibration, image_array)
         if image_array is None or image_array.size == 0:
             logging.warning('undistort_array returned an empty image')
             return None
@@ -148,3 +154,16 @@ def _process(data: bytes,
 
     _, encoded_image = cv2.imencode('.jpg', image_array, [int(cv2.IMWRITE_JPEG_QUALITY), compression])
     return encoded_image.tobytes()
+
+
+def _undistort(calibration: Calibration, image_array: np.ndarray) -> np.ndarray:
+    size = calibration.intrinsics.size
+    if calibration.intrinsics.model == CameraModel.OMNIDIRECTIONAL or image_array.shape[:2] != (size.height, size.width):
+        return calibration.undistort_image(image_array, crop=True)
+    map1, map2, roi = cached(('undistortion_maps', repr(calibration.intrinsics)),
+                             lambda: calibration.get_undistortion_maps(crop=True))
+    image_array = cv2.remap(image_array, map1, map2, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+    if roi is not None:
+        x, y, w, h = roi
+        image_array = image_array[y:y+h, x:x+w]
+    return image_array
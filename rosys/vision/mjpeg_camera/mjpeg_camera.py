@@ -85,7 +85,8 @@ class MjpegCamera(TransformableCamera, ConfigurableCamera):
 
     async def _handle_new_image_data(self, image: bytes, timestamp: float) -> None:
         if self.crop or self.rotation != ImageRotation.NONE:
-            image_ = await rosys.run.cpu_bound(process_jpeg_image, image, self.rotation, self.crop)
+            image_ = await rosys.run.cpu_bound_shared(self.id, process_jpeg_image, image, self.rotation, self.crop,
+                                                      category='camera')
             if image_ is None:
                 return
             image = image_
@@ -6,6 +6,7 @@ from ..camera.configurable_camera import ConfigurableCamera
 from ..camera.transformable_camera import TransformableCamera
 from ..image import Image
 from ..image_processing import get_image_size_from_bytes, process_jpeg_image
+from ..image_rotation import ImageRotation
 from .rtsp_device import RtspDevice
 
 
@@ -92,7 +93,11 @@ class RtspCamera(ConfigurableCamera, TransformableCamera):
     async def _handle_new_image_data(self, image_bytes: bytes, timestamp: float) -> None:
         if not image_bytes:
             return
-        transformed_image_bytes = await rosys.run.cpu_bound(process_jpeg_image, image_bytes, self.rotation, self.crop)
+        transformed_image_bytes: bytes | None = image_bytes
+        if self.crop or self.rotation != ImageRotation.NONE:
+            transformed_image_bytes = await rosys.run.cpu_bound_shared(self.id, process_jpeg_image,
+                                                                       image_bytes, self.rotation, self.crop,
+                                                                       category='camera')
         if transformed_image_bytes is None:
             return
 
@@ -1,7 +1,6 @@
 from dataclasses import dataclass
 
 import numpy as np
-from scipy.optimize import least_squares
 
 from rosys.geometry import Point3d, Pose3d, Rotation
 from rosys.vision.calibration import Calibration, Intrinsics
@@ -135,6 +134,7 @@ class SpatialResection:
             np.subtract(image_points_projected, all_image_points, out=residuals)
             return residuals.flatten()
 
+        from scipy.optimize import least_squares  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
         res = least_squares(f, x_0, **ls_args)
 
         return SpatialResectionResult(
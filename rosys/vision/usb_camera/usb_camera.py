@@ -80,11 +80,13 @@ class UsbCamera(ConfigurableCamera, TransformableCamera):
 
         bytes_: bytes | None
         if isinstance(image_data, np.ndarray):
-            bytes_ = await rosys.run.cpu_bound(process_ndarray_image, image_data, self.rotation, self.crop)
+            bytes_ = await rosys.run.cpu_bound_shared(self.id, process_ndarray_image,
+                                                      image_data, self.rotation, self.crop, category='camera')
         else:
             bytes_ = image_data
             if self.crop or self.rotation != ImageRotation.NONE:
-                bytes_ = await rosys.run.cpu_bound(process_jpeg_image, bytes_, self.rotation, self.crop)
+                bytes_ = await rosys.run.cpu_bound_shared(self.id, process_jpeg_image,
+                                                          bytes_, self.rotation, self.crop, category='camera')
         if bytes_ is None:
             return
 
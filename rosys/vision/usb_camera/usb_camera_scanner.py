@@ -1,4 +1,9 @@
-import pyudev
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pyudev
 
 
 def uid_from_device(device: pyudev.Device) -> str | None:
@@ -11,12 +16,14 @@ def uid_from_device(device: pyudev.Device) -> str | None:
 
 
 def scan_for_connected_devices() -> set[str]:
+    import pyudev  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
     devices = pyudev.Context().list_devices()
     video_device_ids = {uid_from_device(device) for device in devices if device.subsystem == 'video4linux'}
     return {uid for uid in video_device_ids if uid is not None}
 
 
 def device_nodes_from_uid(uid: str) -> set[str]:
+    import pyudev  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
     devices = pyudev.Context().list_devices()
     matching_devices = [device for device in devices if uid_from_device(device) == uid]
     return {device.device_node for device in matching_devices if device.device_node is not None}
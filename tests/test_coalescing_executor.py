@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from rosys.helpers import CoalescingExecutor, LazyWorker, SupersededError
+
+
+async def work(value: int, duration: float = 0.01) -> int:
+    await asyncio.sleep(duration)
+    return value
+
+
+async def test_newest_pending_coroutine_wins():
+    executor = CoalescingExecutor()
+    futures = [executor.submit(work(i)) for i in range(4)]
+    assert await futures[0] == 0
+    assert await futures[3] == 3
+    for future in futures[1:3]:
+        with pytest.raises(SupersededError):
+            await future
+    assert executor.stats.submitted == 4
+    assert executor.stats.executed == 2
+    assert executor.stats.dropped == 2
+    assert executor.stats.latency.count == 2
+
+
+async def test_oldest_pending_coroutine_wins():
+    executor = CoalescingExecutor(policy='oldest')
+    futures = [executor.submit(work(i)) for i in range(4)]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    assert results[:2] == [0, 1]
+    assert all(isinstance(result, SupersededError) for result in results[2:])
+
+
+async def test_concurrency():
+    executor = CoalescingExecutor(3, max_pending=0)
+    results = await asyncio.gather(*(executor.run(work(i)) for i in range(4)), return_exceptions=True)
+    assert results[:3] == [0, 1, 2]
+    assert isinstance(results[3], SupersededError)
+
+
+async def test_cancelling_the_caller_cancels_the_coroutine():
+    executor = CoalescingExecutor()
+    task = asyncio.create_task(executor.run(work(1, duration=10)))
+    await asyncio.sleep(0.01)
+    assert executor.num_running == 1
+    task.cancel()
+    await asyncio.sleep(0.01)
+    assert executor.num_running == 0
+
+
+async def test_exceptions_are_passed_to_the_caller():
+    async def fail() -> None:
+        raise ValueError('failed')
+
+    executor = CoalescingExecutor()
+    with pytest.raises(ValueError):
+        await executor.run(fail())
+    assert executor.stats.failed == 1
+
+
+async def test_lazy_worker():
+    worker = LazyWorker()
+    results = await asyncio.gather(*(worker.run(work(i)) for i in range(3)))
+    assert results == [0, None, 2]
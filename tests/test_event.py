@@ -1,7 +1,8 @@
 import pytest
 
 import rosys
-from rosys.event import Event
+from rosys import event
+from rosys.event import Event, OverflowPolicy
 from rosys.testing import forward
 
 TEST_EVENT = Event[int]()
@@ -68,3 +69,134 @@ async def test_fire_and_forget_with_emit():
         await forward(1.0)
     assert ex_info.value.__cause__ is not None
     assert 'some failure' in str(ex_info.value.__cause__)
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_emit_with_sync_and_async_listeners():
+    test_event = Event[int]()
+    calls: list[str] = []
+
+    async def async_handler(number: int) -> None:
+        calls.append(f'async {number}')
+
+    test_event.register(lambda number: calls.append(f'sync {number}'))
+    test_event.register(async_handler)
+    test_event.emit(1)
+    assert calls == ['sync 1']
+    await forward(0.1)
+    assert calls == ['sync 1', 'async 1']
+    assert not event.tasks, 'finished tasks should be removed'
+
+
+async def test_listener_can_unregister_itself_during_emit():
+    test_event = Event[int]()
+    calls: list[int] = []
+
+    def handler(number: int) -> None:
+        calls.append(number)
+        test_event.unregister(handler)
+
+    test_event.register(handler)
+    test_event.register(lambda number: calls.append(-number))
+    test_event.emit(1)
+    test_event.emit(2)
+    assert calls == [1, -1, -2]
+
+
+def test_emit_calls_listeners_in_registration_order():
+    test_event = Event[int]()
+    calls: list[tuple[int, int]] = []
+    for i in range(100):
+        test_event.register(lambda number, i=i: calls.append((i, number)))
+    test_event.emit(1)
+    test_event.emit(2)
+    assert calls == [(i, 1) for i in range(100)] + [(i, 2) for i in range(100)]
+
+
+def test_listeners_registered_during_emit_are_called_from_the_next_emit():
+    test_event = Event[int]()
+    calls: list[str] = []
+
+    def late_handler(number: int) -> None:
+        calls.append(f'late {number}')
+
+    def handler(number: int) -> None:
+        calls.append(f'handler {number}')
+        test_event.register(late_handler)
+
+    test_event.register(handler)
+    test_event.emit(1)
+    assert calls == ['handler 1']
+    test_event.emit(2)
+    assert calls == ['handler 1', 'handler 2', 'late 2']
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_instrumentation():
+    test_event = Event[int]()
+
+    async def async_handler(_: int) -> None:
+        await rosys.sleep(0.5)
+
+    test_event.register(lambda _: None)
+    test_event.register(async_handler)
+    test_event.emit(1)
+    assert not event.get_listener_stats(), 'instrumentation is opt-in'
+
+    event.enable_instrumentation()
+    test_event.emit(1)
+    test_event.emit(2)
+    sync_stats, async_stats = sorted(event.get_listener_stats(), key=lambda stats: stats.callback)
+    assert sync_stats.callback == 'test_instrumentation.<locals>.<lambda>'
+    assert sync_stats.calls == 2
+    assert sync_stats.tasks == 0
+    assert async_stats.calls == 2
+    assert async_stats.pending_tasks == 2
+
+    await forward(1.0)
+    assert async_stats.tasks == 2
+    assert async_stats.pending_tasks == 0
+    assert async_stats.p99_task_time > 0
+
+
+@pytest.mark.parametrize('policy, expected', [
+    ('drop_oldest', [3, 4]),
+    ('drop_newest', [0, 1]),
+    ('latest', [4]),
+])
+async def test_stream_overflow_policies(policy: OverflowPolicy, expected: list[int]):
+    test_event = Event[int]()
+    stream = test_event.stream(maxsize=2, policy=policy)
+    for i in range(5):
+        test_event.emit(i)
+    stream.close()
+    assert [number async for number in stream] == expected
+    assert stream.dropped == 5 - len(expected)
+    assert not test_event.listeners
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_consuming_a_stream():
+    test_event = Event[int]()
+    numbers: list[int] = []
+
+    async def consume() -> None:
+        async for number in test_event.stream(maxsize=2):
+            await rosys.sleep(0.1)
+            numbers.append(number)
+            if number == 9:
+                break
+
+    rosys.background_tasks.create(consume())
+    await forward(0.05)
+    for i in range(10):
+        test_event.emit(i)
+        await forward(0.03)
+    await forward(0.5)
+    assert numbers[0] == 0
+    assert numbers[-1] == 9
+    assert len(numbers) < 10, 'a slow consumer misses values instead of piling them up'
+    assert len(test_event.listeners) == 1
+
+    test_event.emit(10)
+    assert not test_event.listeners, 'the stream has been garbage collected and unregisters itself'
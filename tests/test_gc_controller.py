@@ -0,0 +1,117 @@
+import asyncio
+import gc
+from collections.abc import Generator
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import numpy as np
+import psutil
+import pytest
+
+from rosys.gc_controller import GcController
+
+
+@dataclass
+class FakeClock:
+    t: float = 0.0
+    speed: float = 1.0
+
+    def now(self) -> float:
+        return self.t
+
+
+@dataclass
+class FakeScheduler:
+    clock: FakeClock = field(default_factory=FakeClock)
+    idle_time: float = 1.0
+
+    def slack(self) -> float:
+        return self.idle_time
+
+
+@pytest.fixture
+def controller() -> Generator[GcController, None, None]:
+    controller = GcController(FakeScheduler(), max_skips=3)  # type: ignore[arg-type]
+    yield controller
+    gc.callbacks.remove(controller._measure)  # pylint: disable=protected-access
+
+
+async def step(controller: GcController, *, memory_limit_mbyte: float = 0) -> None:
+    controller.step(memory_limit_mbyte=memory_limit_mbyte)
+    await asyncio.sleep(0)
+
+
+def make_garbage() -> None:
+    for _ in range(2 * gc.get_threshold()[0]):
+        a: list = []
+        a.append(a)
+
+
+async def test_young_generations_are_collected_in_idle_slots(controller: GcController):
+    make_garbage()
+    await step(controller)
+    assert controller.stats[0].pauses.count + controller.stats[1].pauses.count == 1
+    assert controller.stats[0].collected + controller.stats[1].collected > 0
+
+
+async def test_collections_are_postponed_without_idle_slot(controller: GcController):
+    controller.stats[0].pauses.record(0.01)
+    controller.stats[1].pauses.record(0.01)
+    controller.scheduler.idle_time = 0.0  # type: ignore[misc]
+    make_garbage()
+    for _ in range(3):
+        await step(controller)
+    assert controller.skipped == 3
+    await step(controller)
+    assert controller.stats[0].pauses.count + controller.stats[1].pauses.count == 3, 'collected after max_skips'
+
+
+async def test_full_collections_are_deferred_while_busy(controller: GcController):
+    busy = True
+    controller.defer_full_collections_while(lambda: busy)
+    controller.scheduler.clock.t = controller.full_interval  # type: ignore[attr-defined]
+    await step(controller)
+    assert controller.deferred_full_collections == 1
+    assert controller.stats[2].pauses.count == 0
+
+    busy = False
+    await step(controller)
+    assert controller.stats[2].pauses.count == 1
+
+
+async def test_low_memory_overrides_busy_checks(controller: GcController):
+    controller.defer_full_collections_while(lambda: True)
+    await step(controller, memory_limit_mbyte=1e12)
+    assert controller.deferred_full_collections == 0
+    assert controller.stats[2].pauses.count == 1
+
+
+async def test_slack_is_compared_in_real_time(controller: GcController):
+    controller.stats[0].pauses.record(0.01)
+    controller.stats[1].pauses.record(0.01)
+    controller.scheduler.idle_time = 0.05  # type: ignore[misc]
+    controller.scheduler.clock.speed = 10  # type: ignore[attr-defined]
+    make_garbage()
+    await step(controller)
+    assert controller.skipped == 1, '0.05 s on a clock running 10 times faster leave only 5 ms for a 10 ms pause'
+
+
+async def test_low_memory_collections_are_rate_limited(controller: GcController, monkeypatch: pytest.MonkeyPatch):
+    checks: list[float] = []
+
+    def virtual_memory() -> SimpleNamespace:
+        checks.append(controller.scheduler.clock.now())
+        return SimpleNamespace(free=0)
+    monkeypatch.setattr(psutil, 'virtual_memory', virtual_memory)
+
+    for t in np.arange(0, 120, 0.1):
+        controller.scheduler.clock.t = t  # type: ignore[attr-defined]
+        await step(controller, memory_limit_mbyte=100)
+    assert controller.stats[2].pauses.count == 2, 'one low-memory collection per minute'
+    assert len(checks) == 2, 'memory is only checked when a low-memory collection would be allowed'
+
+    controller.low_memory_interval = 0
+    for t in np.arange(120, 125, 0.1):
+        controller.scheduler.clock.t = t  # type: ignore[attr-defined]
+        await step(controller, memory_limit_mbyte=100)
+    assert len(checks) == 7, 'memory is checked once per second'
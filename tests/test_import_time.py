@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = {'cairosvg', 'cv2', 'imgsize', 'line_profiler', 'networkx', 'pyudev', 'scipy', 'suntime'}
+LAZY_SUBPACKAGES = {'rosys.pathplanning', 'rosys.vision'}
+
+SCRIPT = '''
+import json, sys
+import rosys
+print(json.dumps(sorted(sys.modules)))
+'''
+
+
+def _cold_import() -> set[str]:
+    result = subprocess.run([sys.executable, '-c', SCRIPT], capture_output=True, text=True, check=True, timeout=60)
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+def test_cold_import_does_not_load_heavy_modules():
+    modules = _cold_import()
+    loaded = HEAVY_MODULES.intersection(module.split('.')[0] for module in modules)
+    assert not loaded, f'"import rosys" should not import {sorted(loaded)}'
+    loaded = {module for module in modules if module.startswith(tuple(LAZY_SUBPACKAGES))}
+    assert not loaded, f'"import rosys" should not import {sorted(loaded)}'
+
+
+def test_lazy_subsystems_are_importable():
+    import rosys  # pylint: disable=import-outside-toplevel  # noqa: PLC0415
+    assert rosys.vision.Camera.__name__ == 'Camera'
+    assert rosys.pathplanning.PathPlanner.__name__ == 'PathPlanner'
+    assert rosys.analysis.events_page.__name__ == 'EventsPage'
+    assert 'vision' in dir(rosys)
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from rosys.analysis import LoopLagMonitor
+from rosys.analysis.stack_sampling import build_tree
+
+
+def block_the_event_loop() -> None:
+    time.sleep(0.3)
+
+
+async def test_stalls_are_attributed_to_the_blocking_code():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_event_loop()
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+    assert len(monitor.stalls) == 1
+    assert monitor.stalls[0].duration >= 0.2
+    assert 'block_the_event_loop' in monitor.stalls[0].frame
+    assert monitor.lags.count > 1
+    assert sum(monitor.stacks.values()) > 5
+
+
+def test_build_tree():
+    root = build_tree({'main;a;b': 3, 'main;a;c': 1, 'main;d': 2})
+    assert root.count == 6
+    main = root.children['main']
+    assert main.children['a'].count == 4
+    assert main.children['a'].children['b'].count == 3
+    assert main.children['d'].count == 2
@@ -1,16 +1,34 @@
 import asyncio
+import importlib
+import itertools
 import time
 import uuid
+from pathlib import Path
+from typing import get_args
 
 import numpy as np
 import pytest
+from scipy import ndimage
+from scipy.sparse import csgraph
 
 from rosys.automation import Automator
-from rosys.driving import Driver
+from rosys.driving import Driver, PathSegment
 from rosys.geometry import Point, Pose, Prism, Spline
 from rosys.hardware import Robot
-from rosys.pathplanning import Obstacle, PathPlanner
-from rosys.pathplanning.delaunay_planner import DelaunayPlanner
+from rosys.pathplanning import Area, Obstacle, PathPlanner
+from rosys.pathplanning.delaunay_planner import (
+    CURVATURE_LIMIT,
+    DelaunayPlanner,
+    SearchMode,
+    _astar,
+    _find_grid_passages,
+)
+from rosys.pathplanning.grid import Grid
+from rosys.pathplanning.obstacle_map import DISTANCE_RESOLUTION, ObstacleMap, concatenate_spline_poses
+from rosys.pathplanning.roadmap_cache import RoadmapCache
+from rosys.pathplanning.robot_renderer import RobotRenderer
+from rosys.pathplanning.spline_batch import SplineBatch
+from rosys.pathplanning.tiled_obstacle_map import TiledObstacleMap
 from rosys.testing import assert_point, forward
 
 
@@ -68,6 +86,110 @@ async def test_test_spline(path_planner: PathPlanner) -> None:
     assert await path_planner.test_spline(spline) is True
 
 
+def test_roadmap(shape: Prism) -> None:
+    planner = DelaunayPlanner(shape.outline)
+    planner.update_map([], [create_obstacle(x=0, y=0)], [Point(x=-5, y=-5), Point(x=5, y=5)], deadline=time.time() + 10)
+    assert planner.graph is not None and planner.node_poses is not None and planner.edge_backward is not None
+    assert planner.graph.shape == (len(planner.node_poses), len(planner.node_poses))
+    graph = planner.graph.tocoo()
+    assert planner.edge_backward.any() and not planner.edge_backward.all()
+    for source, target, weight, backward in zip(graph.row, graph.col, graph.data, planner.edge_backward, strict=True):
+        if backward:
+            assert weight == pytest.approx(1.2 * planner.graph[target, source])
+            continue
+        dx, dy = planner.node_poses[target, :2] - planner.node_poses[source, :2]
+        assert np.cos(np.arctan2(dy, dx) - planner.node_poses[source, 2]) == pytest.approx(1.0)
+        assert weight >= np.hypot(dx, dy) - 1e-9
+
+
+def test_grid_passages(shape: Prism) -> None:
+    planner = DelaunayPlanner(shape.outline)
+    planner.update_map([], [create_obstacle(x=0, y=0)], [Point(x=-5, y=-5), Point(x=5, y=5)], deadline=time.time() + 10)
+    assert planner.obstacle_map is not None and planner.tri_points is not None and planner.tri_tree is not None
+    pose = Pose(x=-3, y=0.5, yaw=0.3)
+    passages = _find_grid_passages(planner.obstacle_map, planner.tri_tree, planner.node_offsets, planner.node_poses,
+                                   pose, entering=True)
+    assert len(passages) == 3
+    nearest = np.argsort(np.hypot(*(planner.tri_points - [pose.x, pose.y]).T))[:10]
+    lengths = [passage.segment.spline.estimated_length() for passage in passages]
+    assert lengths == sorted(lengths)
+    for passage in passages:
+        assert np.searchsorted(planner.node_offsets, passage.node, side='right') - 1 in nearest
+        assert passage.segment.spline.start == pose.point
+        assert not planner.obstacle_map.test_spline(passage.segment.spline, passage.segment.backward)
+
+
+@pytest.mark.parametrize('search_mode', ['dijkstra', 'astar', 'multi'])
+def test_search_modes(shape: Prism, search_mode: SearchMode) -> None:
+    planner = DelaunayPlanner(shape.outline, search_mode=search_mode)
+    obstacles = [Obstacle(id='wall', outline=[Point(x=2, y=-4), Point(x=3, y=-4), Point(x=3, y=4), Point(x=2, y=4)])]
+    start, goal = Pose(x=0, y=0), Pose(x=5, y=0)
+    planner.update_map([], obstacles, [start.point, goal.point, Point(x=-2, y=-6), Point(x=7, y=6)],
+                       deadline=time.time() + 10)
+    path = planner.search(start, goal)
+    assert_point(path[0].spline.start, start.point)
+    assert_point(path[-1].spline.end, goal.point)
+    assert not any(planner.obstacle_map.test_spline(segment.spline, segment.backward) for segment in path)
+
+
+
+def test_multi_search_mode_trades_path_length_for_speed() -> None:
+    demo = importlib.import_module('rosys.pathplanning.demos.20220825-1')
+    planner = DelaunayPlanner(demo.robot_outline)
+    planner.update_map(demo.cmd.areas, demo.cmd.obstacles, [demo.cmd.start.point, demo.cmd.goal.point],
+                       deadline=time.time() + 10)
+    lengths: dict[SearchMode, float] = {}
+    for search_mode in get_args(SearchMode):
+        planner.search_mode = search_mode
+        path = planner.search(demo.cmd.start, demo.cmd.goal)
+        assert not any(planner.obstacle_map.test_spline(segment.spline, segment.backward) for segment in path)
+        lengths[search_mode] = sum(segment.spline.estimated_length() for segment in path)
+    assert lengths['astar'] == pytest.approx(lengths['dijkstra'])
+    assert lengths['dijkstra'] < lengths['multi'] < 1.1 * lengths['dijkstra'], \
+        'only the shortest roadmap path is smoothed, which is not the shortest path after smoothing in this scenario'
+
+def test_astar(shape: Prism) -> None:
+    planner = DelaunayPlanner(shape.outline)
+    planner.update_map([], [create_obstacle(x=0, y=0)], [Point(x=-5, y=-5), Point(x=5, y=5)], deadline=time.time() + 10)
+    assert planner.graph is not None and planner.node_poses is not None
+    rng = np.random.default_rng(0)
+    sources, targets = rng.integers(0, len(planner.node_poses), (2, 10))
+    costs = csgraph.dijkstra(planner.graph, indices=sources)
+    for i, (source, target) in enumerate(zip(sources.tolist(), targets.tolist(), strict=True)):
+        nodes = _astar(planner.graph, planner.node_poses, {source: 0.0}, {target: 0.0})
+        assert nodes is not None and nodes[0] == source and nodes[-1] == target
+        assert sum(planner.graph[a, b] for a, b in itertools.pairwise(nodes)) == pytest.approx(costs[i, target])
+
+    nodes = _astar(planner.graph, planner.node_poses, {sources[0]: 0.0, sources[1]: 100.0}, {targets[0]: 0.0})
+    assert nodes is not None and nodes[0] == sources[0]
+
+
+def test_roadmap_cache(shape: Prism, tmp_path: Path) -> None:
+    cache = RoadmapCache(tmp_path, max_entries=2)
+    obstacles = [create_obstacle(x=0, y=0)]
+    points = [Point(x=-5, y=-5), Point(x=5, y=5)]
+    start, goal = Pose(x=-3, y=0), Pose(x=3, y=0, yaw=np.pi)
+    planner = DelaunayPlanner(shape.outline, cache=cache)
+    planner.update_map([], obstacles, points, deadline=time.time() + 10)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    restarted = DelaunayPlanner(shape.outline, cache=cache)
+    restarted.update_map([], obstacles, points, deadline=time.time() + 10)
+    assert isinstance(restarted.obstacle_map.stack, np.memmap)
+    assert np.array_equal(restarted.obstacle_map.stack, planner.obstacle_map.stack)
+    assert np.array_equal(restarted.obstacle_map.dist_stack, planner.obstacle_map.dist_stack)
+    assert (restarted.graph != planner.graph).nnz == 0
+    assert restarted.search(start, goal) == planner.search(start, goal)
+
+    restarted.update_map([], [*obstacles, create_obstacle(x=2, y=2)], points, deadline=time.time() + 10)
+    assert cache.load(next(tmp_path.iterdir()).name)['stack'].sum() == planner.obstacle_map.stack.sum()
+
+    for x in [1, 2]:
+        DelaunayPlanner(shape.outline, cache=cache).update_map([], [create_obstacle(x=x, y=0)], points,
+                                                               deadline=time.time() + 10)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
 def test_grow_map(shape: Prism) -> None:
     planner = DelaunayPlanner(shape.outline)
     assert planner.obstacle_map is None
@@ -96,3 +218,173 @@ async def test_overlapping_commands(path_planner: PathPlanner) -> None:
     path, test = await asyncio.gather(task1, task2)
     assert isinstance(path, list)
     assert isinstance(test, bool)
+
+
+def test_incremental_obstacle_map_update(shape: Prism) -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=10, y=8)], pixel_size=0.1, num_layers=36, padding=1.0)
+    areas = [Area(id='field', outline=[Point(x=-4, y=-4), Point(x=9, y=-4), Point(x=9, y=7), Point(x=-4, y=7)])]
+    obstacle1 = create_obstacle(x=0, y=0)
+    obstacle2 = create_obstacle(x=5, y=3, radius=0.3)
+    obstacle3 = create_obstacle(x=2, y=5)
+    padding = 0.5
+
+    obstacle_map = ObstacleMap.from_world(shape.outline, areas, [obstacle1, obstacle2], grid)
+    obstacle_map.update([obstacle1, obstacle2, obstacle3], padding=padding)
+    expected = ObstacleMap.from_world(shape.outline, areas, [obstacle1, obstacle2, obstacle3], grid)
+    assert np.array_equal(obstacle_map.map, expected.map)
+    assert np.array_equal(obstacle_map.stack, expected.stack)
+    close = expected.dist_stack * DISTANCE_RESOLUTION <= padding
+    assert np.array_equal(obstacle_map.dist_stack[close], expected.dist_stack[close])
+
+    obstacle_map = ObstacleMap.from_world(shape.outline, areas, [obstacle1, obstacle2, obstacle3], grid)
+    obstacle_map.update([obstacle1, obstacle3], padding=padding)
+    expected = ObstacleMap.from_world(shape.outline, areas, [obstacle1, obstacle3], grid)
+    assert np.array_equal(obstacle_map.map, expected.map)
+    assert np.array_equal(obstacle_map.stack, expected.stack)
+    assert np.all(obstacle_map.dist_stack <= expected.dist_stack)
+
+
+def test_updating_obstacles_incrementally(shape: Prism) -> None:
+    planner = DelaunayPlanner(shape.outline)
+    start = Pose(x=0, y=0)
+    goal = Pose(x=6, y=0)
+    planner.update_map([], [create_obstacle(x=3, y=3)], [start.point, goal.point], time.time() + 3.0)
+    obstacle_map = planner.obstacle_map
+    assert planner.search(start, goal)[0].spline.end == goal.point
+
+    obstacle = create_obstacle(x=3, y=0.3, radius=0.3)
+    planner.update_map([], [*planner.obstacles, obstacle], [start.point, goal.point], time.time() + 3.0)
+    assert planner.obstacle_map is obstacle_map
+    assert obstacle_map.test(3, 0, 0)
+    path = planner.search(start, goal)
+    assert not any(obstacle_map.test_spline(segment.spline, segment.backward) for segment in path)
+
+
+def test_tiled_obstacle_map(shape: Prism) -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=10, y=8)], pixel_size=0.1, num_layers=36, padding=1.0)
+    areas = [Area(id='field', outline=[Point(x=-4, y=-4), Point(x=9, y=-4), Point(x=9, y=7), Point(x=-4, y=7)])]
+    obstacles = [create_obstacle(x=0, y=0), create_obstacle(x=5, y=3, radius=0.3)]
+    dense = ObstacleMap.from_world(shape.outline, areas, obstacles, grid)
+    tiled = TiledObstacleMap.from_world(shape.outline, areas, obstacles, grid, tile_size=32, max_tiles=4, max_distance=1.0)
+
+    rng = np.random.default_rng(42)
+    x = rng.uniform(-7, 12, 5000)
+    y = rng.uniform(-7, 10, 5000)
+    yaw = rng.uniform(-np.pi, np.pi, 5000)
+    assert np.array_equal(tiled.test(x, y, yaw), dense.test(x, y, yaw))
+    assert tiled.num_tiles == 4
+    expected_distance = dense.get_distance(x, y, yaw)
+    distance = tiled.get_distance(x, y, yaw)
+    close = expected_distance <= 1.0
+    assert np.allclose(distance[close], expected_distance[close])
+    assert np.all(distance[~close] >= 1.0)
+
+    inside = (-5 < x) & (x < 10) & (-5 < y) & (y < 8)
+    rows, cols = grid.to_grid(x[inside], y[inside])
+    assert np.array_equal(tiled.blocks_all_yaws(rows, cols), dense.blocks_all_yaws(rows, cols))
+
+    obstacles = [obstacles[0], create_obstacle(x=2, y=5)]
+    dense = ObstacleMap.from_world(shape.outline, areas, obstacles, grid)
+    tiled.update(obstacles)
+    assert np.array_equal(tiled.map, dense.map)
+    assert np.array_equal(tiled.test(x, y, yaw), dense.test(x, y, yaw))
+
+
+def test_obstacle_distance(shape: Prism) -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=5, y=5)], pixel_size=0.1, num_layers=36, padding=1.0)
+    obstacle_map = ObstacleMap.from_world(shape.outline, [], [create_obstacle(x=0, y=0)], grid)
+    assert obstacle_map.dist_stack.dtype == np.uint16
+    assert obstacle_map.stack.shape == obstacle_map.dist_stack.shape == (37, *grid.size[:2])
+    exact = ndimage.distance_transform_edt(~obstacle_map.stack[9]) * grid.pixel_size
+    assert np.abs(obstacle_map.dist_stack[9] * DISTANCE_RESOLUTION - exact).max() <= DISTANCE_RESOLUTION / 2
+    assert np.array_equal(obstacle_map.dist_stack[36], obstacle_map.dist_stack[0])
+
+
+def test_parallel_obstacle_map_creation(shape: Prism) -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=5, y=5)], pixel_size=0.1, num_layers=36, padding=1.0)
+    obstacles = [create_obstacle(x=0, y=0), create_obstacle(x=3, y=-2)]
+    sequential = ObstacleMap.from_world(shape.outline, [], obstacles, grid, workers=1)
+    parallel = ObstacleMap.from_world(shape.outline, [], obstacles, grid, workers=4)
+    assert np.array_equal(parallel.stack, sequential.stack)
+    assert np.array_equal(parallel.dist_stack, sequential.dist_stack)
+
+    with pytest.raises(TimeoutError):
+        ObstacleMap(grid, sequential.map, RobotRenderer(shape.outline), time.time() - 1, workers=4)
+
+
+def test_kernel_cache(shape: Prism) -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=5, y=5)], pixel_size=0.1, num_layers=36, padding=1.0)
+    robot_renderer = RobotRenderer(shape.outline)
+    map1 = ObstacleMap.from_world(shape.outline, [], [create_obstacle(x=0, y=0)], grid)
+    map2 = ObstacleMap.from_world(shape.outline, [], [create_obstacle(x=1, y=0)], grid)
+    assert all(kernel1 is kernel2 for kernel1, kernel2 in zip(map1.kernels, map2.kernels, strict=True))
+    for layer, kernel in enumerate(map1.kernels):
+        assert np.array_equal(kernel, robot_renderer.render(grid.pixel_size, grid.from_3d_grid(0, 0, layer)[2]))
+
+
+def test_batch_collision_queries(shape: Prism) -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=5, y=5)], pixel_size=0.1, num_layers=36, padding=1.0)
+    obstacles = [create_obstacle(x=0, y=0), create_obstacle(x=3, y=-2)]
+    dense = ObstacleMap.from_world(shape.outline, [], obstacles, grid)
+    tiled = TiledObstacleMap.from_world(shape.outline, [], obstacles, grid, tile_size=32)
+
+    rng = np.random.default_rng(0)
+    splines = [Spline.from_poses(Pose(x=rng.uniform(-4, 4), y=rng.uniform(-4, 4), yaw=rng.uniform(-np.pi, np.pi)),
+                                 Pose(x=rng.uniform(-4, 4), y=rng.uniform(-4, 4), yaw=rng.uniform(-np.pi, np.pi)))
+               for _ in range(50)]
+    backward = (rng.uniform(size=50) < 0.5).tolist()
+    expected = [dense.test_spline(spline, b) for spline, b in zip(splines, backward, strict=True)]
+    assert any(expected) and not all(expected)
+    assert dense.test_splines(splines, backward).tolist() == expected
+    assert tiled.test_splines(splines, backward).tolist() == expected
+    assert dense.test_splines([]).tolist() == []
+
+    x = np.array([0.0, 3.0, -3.0, 3.0])
+    y = np.array([0.0, 3.0, 3.0, -2.0])
+    yaw = np.zeros(4)
+    assert dense.test_batch(x, y, yaw, [0, 1, 1, 3, 4]).tolist() == [True, False, False, True]
+
+
+def test_spline_batch() -> None:
+    grid = Grid.from_points([Point(x=-5, y=-5), Point(x=5, y=5)], pixel_size=0.1, num_layers=36, padding=1.0)
+    rng = np.random.default_rng(0)
+    starts = rng.uniform([-4, -4, -np.pi], [4, 4, np.pi], (20, 3))
+    ends = rng.uniform([-4, -4, -np.pi], [4, 4, np.pi], (20, 3))
+    backward = rng.uniform(size=20) < 0.5
+    batch = SplineBatch(starts, ends, backward)
+    splines = [Spline.from_poses(Pose(x=s[0], y=s[1], yaw=s[2]), Pose(x=e[0], y=e[1], yaw=e[2]), backward=b)
+               for s, e, b in zip(starts, ends, backward, strict=True)]
+    for i, spline in enumerate(splines):
+        assert batch.spline(i) == spline
+    assert batch.max_curvature() == pytest.approx([spline.max_curvature() for spline in splines], rel=1e-9)
+    assert batch.estimated_length() == pytest.approx([spline.estimated_length() for spline in splines])
+    for actual, expected in zip(batch.poses(grid), concatenate_spline_poses(grid, splines, backward.tolist()), strict=True):
+        assert np.allclose(actual, expected)
+    assert len(batch[backward]) == np.count_nonzero(backward)
+
+
+@pytest.mark.parametrize('demo_name', ['20220725-1', '20220825-1', '20221121-1'])
+def test_smoothing(demo_name: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    demo = importlib.import_module(f'rosys.pathplanning.demos.{demo_name}')
+    planner = DelaunayPlanner(demo.robot_outline)
+    planner.update_map(demo.cmd.areas, demo.cmd.obstacles, [demo.cmd.start.point, demo.cmd.goal.point],
+                       deadline=time.time() + 10)
+    raw_paths: list[list[PathSegment]] = []
+    monkeypatch.setattr(DelaunayPlanner, '_smooth', lambda _, path: raw_paths.append(path) or path)
+    planner.search(demo.cmd.start, demo.cmd.goal)
+    monkeypatch.undo()
+
+    for raw_path in raw_paths:
+        path = planner._smooth(list(raw_path))  # pylint: disable=protected-access
+        assert len(path) < len(raw_path)
+        assert path[0].spline.start == raw_path[0].spline.start
+        assert path[-1].spline.end == raw_path[-1].spline.end
+        for segment, next_segment in itertools.pairwise(path):
+            assert segment.spline.end == next_segment.spline.start
+        for segment in path:
+            if segment not in raw_path:
+                assert abs(segment.spline.max_curvature()) < CURVATURE_LIMIT, 'shortcuts have to be healthy'
+            assert not planner.obstacle_map.test_spline(segment.spline, segment.backward)
+        length = sum(segment.spline.estimated_length() for segment in path)
+        raw_length = sum(segment.spline.estimated_length() for segment in raw_path)
+        assert length <= raw_length / 0.9, 'each shortcut is at most 1/0.9 times as long as the segments it replaces'
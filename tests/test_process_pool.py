@@ -0,0 +1,93 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+from rosys import process_pool, run
+from rosys.process_pool import ProcessPool, WorkerState
+from rosys.shared_ring_buffer import SharedRingBuffer
+from rosys.vision.image_processing import process_ndarray_image
+from rosys.vision.image_rotation import ImageRotation
+
+
+async def test_affinity_and_worker_state():
+    pool = ProcessPool(2)
+    try:
+        pids = {await pool.run(os.getpid, affinity='camera') for _ in range(3)}
+        assert len(pids) == 1, 'calls with the same affinity run on the same worker'
+
+        state = WorkerState(key='numbers', value=list(range(1000)))
+        ids = {await pool.run(id, (state,), affinity='camera') for _ in range(3)}
+        assert len(ids) == 1, 'the state is kept in the worker instead of being sent again'
+        assert pool.queue_depth == 0
+        assert sum(stats.completed for stats in pool.stats) == 6
+    finally:
+        pool.shutdown()
+
+
+def test_pool_mode():
+    assert run.process_pool.processes is False, 'in tests cpu_bound calls run in threads'
+    script = 'import sys; import rosys.run; assert "pytest" not in sys.modules; print(rosys.run.process_pool.processes)'
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, timeout=60)
+    assert result.stdout.strip() == 'True', 'outside of tests cpu_bound calls run in worker processes'
+
+
+async def test_state_is_sent_again_if_the_worker_lost_it():
+    pool = ProcessPool(1, processes=False)
+    state = WorkerState(key='numbers', value=[1, 2, 3])
+    assert await pool.run(sum, (state,)) == 6
+    process_pool._worker_cache.clear()  # pylint: disable=protected-access
+    assert await pool.run(sum, (state,)) == 6
+    assert pool.stats[0].failed == 0
+
+
+def test_shared_ring_buffer():
+    buffer = SharedRingBuffer(num_slots=2, slot_size=10)
+    try:
+        slot = buffer.write(b'hello')
+        assert slot is not None
+        assert slot.to_bytes() == b'hello'
+        assert buffer.write(b'too large for a slot') is None
+        assert buffer.acquire() is not None
+        assert buffer.acquire() is None, 'all slots are in use'
+        buffer.release(slot)
+        assert buffer.num_free_slots == 1
+    finally:
+        buffer.close()
+
+
+async def test_cpu_bound_shared():
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    jpeg = await run.cpu_bound_shared('camera', process_ndarray_image, image, ImageRotation.LEFT)
+    assert jpeg is not None
+    assert cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR).shape == (30, 20, 3)
+    assert run.shared_buffer.num_free_slots == run.shared_buffer.num_slots
+
+
+async def test_cancelled_cpu_bound_shared_keeps_slots_until_the_worker_is_done():
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def slow_copy(data: memoryview) -> bytes:
+        started.set()
+        proceed.wait(5)
+        return bytes(data)
+
+    task = asyncio.create_task(run.cpu_bound_shared(None, slow_copy, b'data'))
+    while not started.is_set():
+        await asyncio.sleep(0.01)
+    task.cancel()
+    assert await task is None
+    assert run.shared_buffer.num_free_slots == run.shared_buffer.num_slots - 2, 'the worker still uses both slots'
+
+    proceed.set()
+    for _ in range(100):
+        if run.shared_buffer.num_free_slots == run.shared_buffer.num_slots:
+            break
+        await asyncio.sleep(0.01)
+    assert run.shared_buffer.num_free_slots == run.shared_buffer.num_slots
+    assert await run.cpu_bound_shared(None, bytes, b'more data') == b'more data'
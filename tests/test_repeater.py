@@ -0,0 +1,76 @@
+import pytest
+
+import rosys
+from rosys.rosys import scheduler
+from rosys.scheduler import TimerWheel, _Group
+from rosys.testing import forward
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_repeater_is_called_in_interval():
+    calls: list[float] = []
+    rosys.on_repeat(lambda: calls.append(rosys.time()), 0.5)
+    await forward(2.2)
+    assert calls == pytest.approx([0.5, 1.0, 1.5, 2.0], abs=0.02)
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_repeaters_with_same_interval_share_a_group():
+    repeater1 = rosys.on_repeat(lambda: None, 0.3)
+    repeater2 = rosys.on_repeat(lambda: None, 0.3)
+    await forward(1.0)
+    assert repeater1.stats.calls == repeater2.stats.calls == 3
+    assert len(scheduler.groups[0.3].jobs) == 2
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_stopping_a_repeater():
+    calls: list[float] = []
+    repeater = rosys.on_repeat(lambda: calls.append(rosys.time()), 0.1)
+    await forward(0.55)
+    repeater.stop()
+    await forward(0.5)
+    assert len(calls) == 5
+    assert not repeater.running
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_slow_async_handler_is_not_called_concurrently():
+    running = 0
+    max_running = 0
+
+    async def handler() -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await rosys.sleep(0.25)
+        running -= 1
+
+    repeater = rosys.on_repeat(handler, 0.1)
+    await forward(1.0)
+    assert max_running == 1
+    assert repeater.stats.overruns > 0
+    assert repeater.stats.last_duration > 0
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_changing_the_interval():
+    calls: list[float] = []
+    repeater = rosys.on_repeat(lambda: calls.append(rosys.time()), 1.0)
+    await forward(1.05)
+    repeater.interval = 0.1
+    await forward(0.5)
+    assert len(calls) > 3
+
+
+def test_timer_wheel():
+    wheel = TimerWheel(resolution=0.1, size=8)
+    groups = [_Group(interval, deadline=deadline) for interval, deadline in [(1, 0.35), (2, 0.05), (3, 2.0)]]
+    for group in groups:
+        wheel.add(group)
+    assert wheel.next_deadline() == 0.05
+    assert wheel.pop_due(0.4) == [groups[1], groups[0]]
+    assert wheel.next_deadline() == 2.0
+    assert wheel.pop_due(1.2) == []
+    assert wheel.pop_due(2.0) == [groups[2]]
+    assert wheel.next_deadline() is None
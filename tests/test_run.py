@@ -1,6 +1,11 @@
+import asyncio
+import time
+from contextlib import aclosing
+
 import pytest
 
 from rosys import run
+from rosys.cpu_accounting import CpuAccounting, Histogram
 
 
 @pytest.mark.asyncio
@@ -51,3 +56,107 @@ async def test_retry_failed_with_on_failed_and_args():
     assert events == ['call', 'failed 0/3',
                       'call', 'failed 1/3',
                       'call', 'failed 2/3']
+
+
+async def test_cpu_bound_calls_are_recorded_per_callsite():
+    run.cpu_accounting.clear()
+    assert await run.cpu_bound(sum, [1, 2, 3]) == 6
+    stats = run.cpu_accounting.callsites['builtins.sum']
+    assert stats.category == 'default'
+    assert stats.execution.count == stats.queue_wait.count == 1
+    assert run.cpu_accounting.in_flight == 0
+
+
+async def test_limiting_concurrent_calls_per_category():
+    accounting = CpuAccounting()
+    accounting.set_limit('camera', 2)
+    running = max_running = 0
+
+    async def work(category: str) -> None:
+        nonlocal running, max_running
+        async with accounting.limit(category):
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(work('camera') for _ in range(5)))
+    assert max_running == 2
+    max_running = 0
+    await asyncio.gather(*(work('planning') for _ in range(5)))
+    assert max_running == 5
+
+
+def test_histogram():
+    histogram = Histogram()
+    for value in [0.0005] * 98 + [0.3, 20.0]:
+        histogram.record(value)
+    assert histogram.count == 100
+    assert histogram.percentile(0.5) == 0.001
+    assert histogram.percentile(0.99) == 0.5
+    assert histogram.percentile(1.0) == float('inf')
+
+
+async def test_sh():
+    assert await run.sh(['echo', 'hello']) == 'hello\n'
+    assert await run.sh('echo hello | tr a-z A-Z', shell=True) == 'HELLO\n'
+    assert 'No such file' in await run.sh(['ls', '/does/not/exist'])
+    assert await run.sh(['does-not-exist']) == ''
+
+
+async def test_sh_timeout_kills_the_process_group():
+    t = time.monotonic()
+    assert await run.sh('sleep 10 & sleep 10', shell=True, timeout=0.2) == ''
+    assert time.monotonic() - t < 5
+    assert not run.running_sh_processes
+
+
+async def test_sh_lines():
+    lines = [line async for line in run.sh_lines('for i in 1 2 3; do echo $i; done; echo error >&2', shell=True)]
+    assert lines == ['1', '2', '3', 'error']
+
+    script = 'printf "a\\r\\nb\\rc"; sleep 0.1; printf "\\nd\\r"; sleep 0.1; printf "\\ne\\n\\nf"'
+    assert [line async for line in run.sh_lines(script, shell=True)] == ['a', 'b', 'c', 'd', 'e', '', 'f']
+
+    long_lines = [line async for line in run.sh_lines('head -c 200000 /dev/zero | tr "\\0" x; echo', shell=True)]
+    assert long_lines == ['x' * 200_000], 'lines may exceed the buffer limit of the stream reader'
+
+    async with aclosing(run.sh_lines(['yes'])) as lines:
+        async for line in lines:
+            assert line == 'y'
+            break
+    assert not run.running_sh_processes
+
+
+async def test_sh_concurrency_limit():
+    run.set_sh_limit(2)
+    try:
+        t = time.monotonic()
+        await asyncio.gather(*(run.sh(['sleep', '0.2']) for _ in range(4)))
+        assert time.monotonic() - t >= 0.4
+    finally:
+        run.set_sh_limit(run.MAX_SH_PROCESSES)
+
+
+def test_limits_work_across_event_loops():
+    accounting = CpuAccounting()
+    accounting.set_limit('camera', 1)
+    run.set_sh_limit(1)
+
+    async def work() -> None:
+        async def limited() -> None:
+            async with accounting.limit('camera'):
+                await asyncio.sleep(0.01)
+        await asyncio.gather(limited(), limited())
+        await asyncio.gather(run.sh(['true']), run.sh(['true']))
+
+    try:
+        asyncio.run(work())
+        asyncio.run(work())  # NOTE: the semaphores of the first loop must not be reused
+    finally:
+        run.set_sh_limit(run.MAX_SH_PROCESSES)
+
+
+def test_running_cpu_bound_processes_is_deprecated():
+    with pytest.warns(DeprecationWarning):
+        assert run.running_cpu_bound_processes == []
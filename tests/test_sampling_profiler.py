@@ -0,0 +1,30 @@
+import time
+
+from rosys import run
+from rosys.analysis import SamplingProfiler
+
+
+def busy_wait(duration: float) -> None:
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def test_sampling_the_event_loop_and_threads():
+    profiler = SamplingProfiler(route=None)
+    await profiler.start(frequency=200)
+    busy_wait(0.2)
+    await run.io_bound(busy_wait, 0.2)
+    await profiler.stop()
+    assert not profiler.is_running
+
+    lines = profiler.collapsed().splitlines()
+    assert any(line.startswith('MainThread;') and 'busy_wait' in line for line in lines)
+    assert any(not line.startswith('MainThread;') and 'busy_wait' in line for line in lines)
+
+    speedscope = profiler.speedscope()
+    frames = speedscope['shared']['frames']
+    assert any('busy_wait' in frame['name'] for frame in frames)
+    for profile in speedscope['profiles']:
+        assert len(profile['samples']) == len(profile['weights'])
+        assert all(0 <= index < len(frames) for sample in profile['samples'] for index in sample)
@@ -1,6 +1,10 @@
+import asyncio
+import time
+
 import pytest
 
 import rosys
+from rosys.clock import Clock
 from rosys.testing import forward
 
 
@@ -30,3 +34,31 @@ async def test_sleep():
     await forward(1.0)
     assert sleep.done()
     assert rosys.time() == pytest.approx(1.5)
+
+
+@pytest.mark.usefixtures('rosys_integration')
+async def test_sleepers_wake_up_in_order_of_their_deadlines():
+    woken: list[str] = []
+
+    async def sleeper(name: str, seconds: float) -> None:
+        await rosys.sleep(seconds)
+        woken.append(name)
+
+    for name, seconds in [('late', 0.3), ('early', 0.1), ('middle', 0.2)]:
+        rosys.background_tasks.create(sleeper(name, seconds))
+    await forward(0.15)
+    assert woken == ['early']
+    await forward(0.2)
+    assert woken == ['early', 'middle', 'late']
+
+
+async def test_changing_the_speed_of_a_real_time_clock():
+    clock = Clock()
+    clock.set_speed(10.0)
+    t = time.monotonic()
+    sleep = asyncio.create_task(clock.sleep(1.0))
+    await asyncio.sleep(0.01)
+    clock.set_speed(100.0)
+    await sleep
+    assert time.monotonic() - t == pytest.approx(0.01 + 0.9 / 100, abs=0.01)
+    assert clock.num_sleepers == 0